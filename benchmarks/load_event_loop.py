@@ -0,0 +1,109 @@
+"""Teste de carga: latência do event loop com várias sessões gravando ao mesmo tempo.
+
+Cada sessão tem seu próprio usuário (partição) com um ledger sintético e
+alterna perguntas (contexto com pandas) e gravações. Um "heartbeat" mede o
+atraso do event loop, que é o que as demais sessões sentem no websocket.
+
+    python benchmarks/load_event_loop.py --sessions 8 --rows 50000
+    python benchmarks/load_event_loop.py --sessions 8 --rows 50000 --sync   # modo antigo, bloqueante
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from modules.tenants import TenantRegistry  # noqa: E402
+from synthetic import gerar_base  # noqa: E402
+
+PERGUNTAS = ["quanto gastei este mês por categoria?", "mostre minhas últimas transações",
+             "como estão minhas metas?", "gastos do trimestre com transporte"]
+
+
+async def heartbeat(intervalo, atrasos, parar):
+    loop = asyncio.get_running_loop()
+    while not parar.is_set():
+        inicio = loop.time()
+        await asyncio.sleep(intervalo)
+        atrasos.append((loop.time() - inicio - intervalo) * 1000)
+
+
+async def sessao(tenant, operacoes, sync, latencias):
+    retriever = await tenant.open() if not sync else tenant.retriever
+    for i in range(operacoes):
+        inicio = time.perf_counter()
+        async with tenant.lock:
+            if i % 2 == 0:
+                pergunta = PERGUNTAS[i // 2 % len(PERGUNTAS)]
+                if sync:
+                    retriever.get_relevant_context(pergunta)
+                else:
+                    await retriever.aget_relevant_context(pergunta)
+            elif sync:
+                retriever.add_transaction(f"Carga {i}", -12.5, "Lazer")
+            else:
+                await retriever.aadd_transaction(f"Carga {i}", -12.5, "Lazer")
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+def _pct(valores, p):
+    return float(np.percentile(valores, p)) if valores else 0.0
+
+
+async def executar(args):
+    base = tempfile.mkdtemp(prefix="finassist-carga-")
+    registry = TenantRegistry(base, max_tenants=args.sessions)
+    tenants = [registry.acquire(f"usuario{i}") for i in range(args.sessions)]
+    for i, tenant in enumerate(tenants):
+        gerar_base(tenant.data_path, args.rows, seed=i, metas=1, produtos=0)
+    if args.sync:
+        for tenant in tenants:
+            tenant.retriever
+
+    atrasos, latencias, parar = [], [], asyncio.Event()
+    batida = asyncio.create_task(heartbeat(args.interval / 1000, atrasos, parar))
+    inicio = time.perf_counter()
+    await asyncio.gather(*[sessao(t, args.ops, args.sync, latencias) for t in tenants])
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    await batida
+    registry.close_all()
+
+    return {
+        "modo": "sync" if args.sync else "async",
+        "sessoes": args.sessions,
+        "linhas_por_usuario": args.rows,
+        "operacoes": len(latencias),
+        "duracao_s": round(duracao, 3),
+        "ops_por_s": round(len(latencias) / duracao, 1),
+        "loop_lag_ms": {"p50": round(_pct(atrasos, 50), 2), "p99": round(_pct(atrasos, 99), 2),
+                        "max": round(max(atrasos, default=0.0), 2)},
+        "operacao_ms": {"p50": round(_pct(latencias, 50), 2), "p95": round(_pct(latencias, 95), 2)},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=8, help="sessões (usuários) concorrentes")
+    parser.add_argument("--rows", type=int, default=50000, help="transações por usuário")
+    parser.add_argument("--ops", type=int, default=20, help="operações por sessão")
+    parser.add_argument("--interval", type=float, default=5.0, help="intervalo do heartbeat (ms)")
+    parser.add_argument("--sync", action="store_true", help="chama o retriever direto no event loop")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args()
+    resultado = asyncio.run(executar(args))
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False))
+        return
+    for chave, valor in resultado.items():
+        print(f"{chave:>20}: {valor}")
+
+
+if __name__ == "__main__":
+    main()
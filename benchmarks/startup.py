@@ -0,0 +1,122 @@
+"""Benchmark de partida a frio: tempo de import e memória residente por modo.
+
+Cada cenário roda num interpretador novo com `python -X importtime`; o
+relatório traz o tempo total, o pico de RSS e os pacotes que mais pesam.
+Com `--baseline`, falha (código 1) se algum cenário piorar além da tolerância.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --json > startup.json
+    python benchmarks/startup.py --baseline startup.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+# O que cada cenário executa no processo filho (src já está no sys.path)
+CENARIOS = {
+    # O que o app importa no boot do Chainlit, antes da primeira sessão
+    "boot": "import modules.workers, modules.providers",
+    "local": "from modules.orchestrator import FinAssistOrchestrator; "
+             "from modules.provider_registry import provider_registry; provider_registry.for_settings('local')",
+    "gemini": "from modules.orchestrator import FinAssistOrchestrator; "
+              "from modules.provider_registry import provider_registry; provider_registry.for_settings('gemini', 'bench')",
+    "openai": "from modules.orchestrator import FinAssistOrchestrator; "
+              "from modules.provider_registry import provider_registry; provider_registry.for_settings('openai', 'bench')",
+    "auto": "from modules.orchestrator import FinAssistOrchestrator; "
+            "from modules.provider_registry import provider_registry; "
+            "provider_registry.for_settings('auto', api_keys={'gemini': 'bench', 'openai': 'bench'})",
+    # O módulo do Chainlit inteiro (requer chainlit instalado)
+    "app": "import app",
+}
+
+FILHO = """
+import sys, time, json, resource
+inicio = time.perf_counter()
+sys.path.insert(0, {src!r})
+{codigo}
+print(json.dumps({{"seconds": time.perf_counter() - inicio,
+                   "rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}}))
+"""
+
+
+def parse_importtime(stderr, top=8):
+    """Pacotes com maior tempo cumulativo de import (ms), onde quer que tenham sido importados."""
+    pacotes = {}
+    for linha in stderr.splitlines():
+        if not linha.startswith("import time:") or "cumulative" in linha:
+            continue
+        _, cumulativo, nome = linha[len("import time:"):].split("|")
+        raiz = nome.strip().split(".")[0]
+        if raiz in ("site", "encodings"):
+            continue
+        # O primeiro import de um pacote é a linha de maior cumulativo com a sua raiz
+        pacotes[raiz] = max(pacotes.get(raiz, 0), int(cumulativo) / 1000)
+    return dict(sorted(pacotes.items(), key=lambda kv: -kv[1])[:top])
+
+
+def run_scenario(nome, repeticoes=3):
+    medidas, pacotes = [], {}
+    for _ in range(repeticoes):
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", FILHO.format(src=SRC, codigo=CENARIOS[nome])],
+                              capture_output=True, text=True, cwd=SRC)
+        if proc.returncode != 0:
+            erro = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"código {proc.returncode}"
+            return {"error": erro}
+        medidas.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        pacotes = parse_importtime(proc.stderr)
+    return {
+        "seconds": round(statistics.median(m["seconds"] for m in medidas), 4),
+        "rss_mb": round(statistics.median(m["rss_kb"] for m in medidas) / 1024, 1),
+        "top_imports_ms": {k: round(v, 1) for k, v in pacotes.items()},
+    }
+
+
+def compare(resultado, baseline, tolerancia):
+    """Lista de regressões (cenário, métrica, antes, depois) acima da tolerância."""
+    regressoes = []
+    for nome, atual in resultado.items():
+        antes = baseline.get(nome)
+        if not antes or "error" in atual or "error" in antes:
+            continue
+        for metrica in ("seconds", "rss_mb"):
+            if atual[metrica] > antes[metrica] * (1 + tolerancia):
+                regressoes.append((nome, metrica, antes[metrica], atual[metrica]))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", default=list(CENARIOS), help=f"cenários ({', '.join(CENARIOS)})")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por cenário (vale a mediana)")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="piora aceita em relação ao baseline")
+    args = parser.parse_args()
+
+    resultado = {nome: run_scenario(nome, args.repeat) for nome in args.scenarios}
+    if args.json:
+        print(json.dumps(resultado, ensure_ascii=False, indent=2))
+    else:
+        for nome, r in resultado.items():
+            if "error" in r:
+                print(f"{nome:>8}: indisponível ({r['error']})")
+                continue
+            top = ", ".join(f"{k} {v:.0f}ms" for k, v in list(r["top_imports_ms"].items())[:4])
+            print(f"{nome:>8}: {r['seconds'] * 1000:7.0f} ms  {r['rss_mb']:6.1f} MB  | {top}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressoes = compare(resultado, json.load(f), args.tolerance)
+        for nome, metrica, antes, depois in regressoes:
+            print(f"REGRESSÃO {nome}.{metrica}: {antes} -> {depois}", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,305 @@
+"""Suíte de benchmarks: retriever, contexto, CRUD e orquestrador de ponta a ponta.
+
+Cada cenário roda num processo novo sobre uma cópia de uma base sintética
+(`benchmarks/synthetic.py`) e com um LLM simulado em processo, então o
+resultado mede só o código do FinAssist. O relatório traz vazão, latência
+p50/p99 e pico de RSS por cenário e tamanho de ledger; com `--baseline`,
+falha (código 1) se algo piorar além da tolerância.
+
+    python benchmarks/suite.py
+    python benchmarks/suite.py context crud --rows 1000,100000,1000000
+    python benchmarks/suite.py --json > bench.json
+    python benchmarks/suite.py --baseline bench.json --tolerance 0.25
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import contextlib
+import asyncio
+import argparse
+import platform
+import tempfile
+import subprocess
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from synthetic import gerar_base, StubProvider, StubRegistry  # noqa: E402
+
+PERGUNTAS = ["quanto gastei este mês por categoria?", "mostre minhas últimas transações",
+             "como estão minhas metas?", "gastos do trimestre com transporte",
+             "qual investimento combina com meu perfil?", "qual meu saldo atual?"]
+# Pedidos que o atalho (modules.fast_path) executa sem o modelo
+ATALHOS = ["gastei 32,50 no almoço", "paguei 18 de uber", "recebi 250 de venda"]
+
+# Métricas comparadas com o baseline: True = maior é melhor
+METRICAS = {"ops_per_s": True, "p50_ms": False, "p99_ms": False, "rss_mb": False}
+
+
+def _pct(valores, p):
+    return round(float(np.percentile(valores, p)), 3) if valores else None
+
+
+def _resumo(latencias, duracao, **extra):
+    return {"ops": len(latencias), "ops_per_s": round(len(latencias) / duracao, 1) if duracao else None,
+            "p50_ms": _pct(latencias, 50), "p99_ms": _pct(latencias, 99), **extra}
+
+
+def _medir(func, repeticoes):
+    latencias = []
+    inicio = time.perf_counter()
+    for i in range(repeticoes):
+        t = time.perf_counter()
+        func(i)
+        latencias.append((time.perf_counter() - t) * 1000)
+    return latencias, time.perf_counter() - inicio
+
+
+# --- CENÁRIOS (rodam no processo filho, sobre uma cópia da base) ---
+
+
+def cenario_load(path, args):
+    """Abertura a frio do retriever (o que cada usuário paga na primeira sessão)."""
+    from modules.retriever import FinancialRetriever
+    retrievers = []
+
+    def abrir(_):
+        r = FinancialRetriever(data_path=path)
+        r.store.frame()
+        retrievers.append(r)
+
+    latencias, duracao = _medir(abrir, args.repeat)
+    for r in retrievers:
+        r.backend.close()
+    return _resumo(latencias, duracao)
+
+
+def cenario_context(path, args):
+    """get_relevant_context para perguntas variadas (leitura + montagem do contexto)."""
+    from modules.retriever import FinancialRetriever
+    r = FinancialRetriever(data_path=path)
+    tamanhos = []
+    latencias, duracao = _medir(lambda i: tamanhos.append(len(r.get_relevant_context(PERGUNTAS[i % len(PERGUNTAS)]))),
+                                args.ops)
+    r.backend.close()
+    return _resumo(latencias, duracao, context_chars=int(np.mean(tamanhos)))
+
+
+def cenario_crud(path, args):
+    """Gravações intercaladas: inclui, edita e apaga transações e atualiza metas."""
+    from modules.retriever import FinancialRetriever
+    r = FinancialRetriever(data_path=path)
+    rng = np.random.default_rng(args.seed)
+    ids = rng.permutation(max(args.rows, 1))
+    metas = len(r.data.get("objetivos_financeiros", []))
+
+    def operar(i):
+        etapa = i % 4
+        if etapa == 0:
+            r.add_transaction(f"Bench {i}", -12.5, "Lazer")
+        elif etapa == 1:
+            r.update_transaction(int(ids[i % len(ids)]), valor=-20.0)
+        elif etapa == 2:
+            r.delete_transaction(int(ids[(i + len(ids) // 2) % len(ids)]))
+        elif metas:
+            r.update_goal(i % metas, valor_guardado=float(i))
+
+    latencias, duracao = _medir(operar, args.ops)
+    r.flush()
+    divergencia = r.verify_balance()
+    r.backend.close()
+    return _resumo(latencias, duracao, balance_drift=round(divergencia, 6))
+
+
+async def _sessao(orquestrador, perguntas, latencias):
+    for pergunta in perguntas:
+        inicio = time.perf_counter()
+        await orquestrador.run(pergunta)
+        latencias.append((time.perf_counter() - inicio) * 1000)
+
+
+def _perguntas(args, semente):
+    rng = np.random.default_rng(semente)
+    # Um quarto dos turnos são atalhos; o resto vai ao modelo simulado
+    return [ATALHOS[i % len(ATALHOS)] if rng.random() < 0.25 else f"{PERGUNTAS[i % len(PERGUNTAS)]} ({semente}.{i})"
+            for i in range(args.ops)]
+
+
+async def _orquestrar(base, args, sessoes):
+    from modules.tenants import TenantRegistry
+    from modules.orchestrator import FinAssistOrchestrator
+    stub = StubProvider(first_token=args.llm_latency / 1000, chunk_delay=args.chunk_delay / 1000)
+    registry = StubRegistry(stub)
+    tenants = TenantRegistry(base, max_tenants=max(sessoes, 1))
+    usuarios = [tenants.acquire(None if sessoes == 1 else f"usuario{i}") for i in range(sessoes)]
+    for tenant in usuarios:
+        await tenant.open()
+    orquestradores = [FinAssistOrchestrator(mode=args.mode, cache=None, tenant=t, registry=registry) for t in usuarios]
+
+    atrasos, parar = [], asyncio.Event()
+
+    async def heartbeat():
+        loop = asyncio.get_running_loop()
+        while not parar.is_set():
+            t = loop.time()
+            await asyncio.sleep(0.005)
+            atrasos.append((loop.time() - t - 0.005) * 1000)
+
+    batida = asyncio.create_task(heartbeat())
+    latencias = []
+    inicio = time.perf_counter()
+    await asyncio.gather(*[_sessao(o, _perguntas(args, args.seed + i), latencias) for i, o in enumerate(orquestradores)])
+    duracao = time.perf_counter() - inicio
+    parar.set()
+    await batida
+    tenants.close_all()
+    return _resumo(latencias, duracao, sessions=sessoes, llm_calls=stub.calls,
+                   prompt_chars=int(stub.prompt_chars / stub.calls) if stub.calls else 0,
+                   loop_lag_p99_ms=_pct(atrasos, 99))
+
+
+def cenario_orchestrator(path, args):
+    """FinAssistOrchestrator.run de ponta a ponta, uma sessão."""
+    return asyncio.run(_orquestrar(path, args, 1))
+
+
+def cenario_sessions(path, args):
+    """N sessões Chainlit simuladas (usuários distintos) ao mesmo tempo."""
+    from modules.tenants import TenantRegistry, tenant_key
+    registry = TenantRegistry(path)
+    for i in range(args.sessions):
+        shutil.copytree(path, registry.path_for(tenant_key(f"usuario{i}")), ignore=shutil.ignore_patterns("usuarios"))
+    return asyncio.run(_orquestrar(path, args, args.sessions))
+
+
+CENARIOS = {
+    "load": cenario_load,
+    "context": cenario_context,
+    "crud": cenario_crud,
+    "orchestrator": cenario_orchestrator,
+    "sessions": cenario_sessions,
+}
+
+
+def run_child(args):
+    import resource
+    destino = tempfile.mkdtemp(prefix="finassist-bench-")
+    path = os.path.join(destino, "data")
+    shutil.copytree(args.child_data, path)
+    try:
+        resultado = CENARIOS[args.child](path, args)
+    finally:
+        shutil.rmtree(destino, ignore_errors=True)
+    resultado["rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    print(json.dumps(resultado))
+
+
+# --- PROCESSO PRINCIPAL ---
+
+
+def metadata(args):
+    raiz = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=raiz).stdout.strip() or None
+    except OSError:
+        commit = None
+    import pandas as pd
+    return {"commit": commit, "python": platform.python_version(), "pandas": pd.__version__,
+            "numpy": np.__version__, "machine": platform.machine(), "storage": args.storage,
+            "seed": args.seed, "telemetry": args.telemetry, "ops": args.ops, "sessions": args.sessions, "llm_latency_ms": args.llm_latency}
+
+
+def run_scenario(nome, template, args):
+    comando = [sys.executable, os.path.abspath(__file__), "--child", nome, "--child-data", template,
+               "--rows", str(args.rows_atual), "--ops", str(args.ops), "--repeat", str(args.repeat),
+               "--sessions", str(args.sessions), "--seed", str(args.seed), "--mode", args.mode,
+               "--llm-latency", str(args.llm_latency), "--chunk-delay", str(args.chunk_delay)]
+    env = dict(os.environ, FINASSIST_STORAGE=args.storage, FINASSIST_TELEMETRY=args.telemetry)
+    proc = subprocess.run(comando, capture_output=True, text=True, env=env)
+    if proc.returncode != 0:
+        erro = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"código {proc.returncode}"
+        return {"error": erro}
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def compare(resultado, baseline, tolerancia):
+    """Lista de regressões (cenário, métrica, antes, depois) acima da tolerância."""
+    regressoes = []
+    for nome, atual in resultado.items():
+        antes = baseline.get(nome)
+        if not antes or "error" in atual or "error" in antes:
+            continue
+        for metrica, maior_melhor in METRICAS.items():
+            a, d = antes.get(metrica), atual.get(metrica)
+            if a is None or d is None:
+                continue
+            if (d < a * (1 - tolerancia)) if maior_melhor else (d > a * (1 + tolerancia)):
+                regressoes.append((nome, metrica, a, d))
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", default=list(CENARIOS), help=f"cenários ({', '.join(CENARIOS)})")
+    parser.add_argument("--rows", default="1000,10000,100000", help="tamanhos do ledger, separados por vírgula")
+    parser.add_argument("--ops", type=int, default=200, help="operações por cenário (por sessão)")
+    parser.add_argument("--repeat", type=int, default=5, help="aberturas no cenário load")
+    parser.add_argument("--sessions", type=int, default=8, help="sessões concorrentes no cenário sessions")
+    parser.add_argument("--storage", choices=["csv", "sqlite"], default="csv", help="backend de armazenamento")
+    parser.add_argument("--mode", default="local", help="modo do orquestrador (local, auto...)")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="latência simulada até o 1º pedaço (ms)")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="intervalo simulado entre pedaços (ms)")
+    parser.add_argument("--telemetry", default="", help="exportadores ligados nos cenários (ex.: prometheus)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    parser.add_argument("--baseline", help="JSON de uma execução anterior para comparar")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="piora aceita em relação ao baseline")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    parser.add_argument("--child-data", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        args.rows = int(args.rows)
+        run_child(args)
+        return
+
+    desconhecidos = set(args.scenarios) - set(CENARIOS)
+    if desconhecidos:
+        parser.error(f"cenários desconhecidos: {', '.join(sorted(desconhecidos))}")
+    resultado = {}
+    templates = tempfile.mkdtemp(prefix="finassist-bench-base-")
+    try:
+        for linhas in (int(n) for n in args.rows.split(",")):
+            # A base é gerada uma vez por tamanho; cada cenário trabalha numa cópia
+            with contextlib.redirect_stdout(sys.stderr):
+                template = gerar_base(os.path.join(templates, str(linhas)), linhas, seed=args.seed, storage=args.storage)
+            args.rows_atual = linhas
+            for nome in args.scenarios:
+                resultado[f"{nome}/{linhas}"] = r = run_scenario(nome, template, args)
+                if not args.json:
+                    if "error" in r:
+                        print(f"{nome + '/' + str(linhas):>22}: indisponível ({r['error']})")
+                    else:
+                        print(f"{nome + '/' + str(linhas):>22}: {r['ops_per_s']:9.1f} ops/s  p50 {r['p50_ms']:8.2f} ms  "
+                              f"p99 {r['p99_ms']:8.2f} ms  {r['rss_mb']:6.1f} MB")
+    finally:
+        shutil.rmtree(templates, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({"meta": metadata(args), "results": resultado}, ensure_ascii=False, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressoes = compare(resultado, baseline.get("results", baseline), args.tolerance)
+        for nome, metrica, antes, depois in regressoes:
+            print(f"REGRESSÃO {nome}.{metrica}: {antes} -> {depois}", file=sys.stderr)
+        if regressoes:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Dados sintéticos e provedor de LLM simulado para os benchmarks.
+
+Tudo é determinístico a partir da `seed` (as datas são contadas a partir do
+dia da execução): a mesma chamada gera os mesmos dados e as mesmas
+respostas, para que execuções em commits diferentes sejam comparáveis.
+"""
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from modules.providers import LLMProvider  # noqa: E402
+from modules.provider_registry import ProviderRegistry  # noqa: E402
+
+CATEGORIAS = ["Alimentação", "Transporte", "Moradia", "Lazer", "Saúde", "Educação", "Salário"]
+PRIORIDADES = ["Essencial", "Média", "Supérfluo"]
+PERFIS = ["Conservador", "Moderado", "Arrojado"]
+TIPOS_PRODUTO = [("CDB", "Baixo"), ("Tesouro Selic", "Baixo"), ("Tesouro IPCA+", "Médio"), ("LCI", "Baixo"),
+                 ("Fundo Multimercado", "Médio"), ("Fundo de Ações", "Alto"), ("ETF", "Alto")]
+
+
+def gerar_ledger(linhas, seed=0, dias=730):
+    """DataFrame de transações no formato do transacoes.csv (datas dd/mm/aaaa).
+
+    As datas são relativas a hoje, para que perguntas de período ("este mês")
+    encontrem lançamentos como num ledger real.
+    """
+    rng = np.random.default_rng(seed)
+    hoje = pd.Timestamp.now().normalize()
+    datas = hoje - pd.to_timedelta(rng.integers(0, dias, linhas), unit="D")
+    valores = np.round(rng.normal(-80, 120, linhas), 2)
+    return pd.DataFrame({
+        "data": datas.strftime("%d/%m/%Y"),
+        "descricao": [f"Lançamento {i}" for i in range(linhas)],
+        "valor": valores,
+        "categoria": rng.choice(CATEGORIAS, linhas),
+        "prioridade": rng.choice(PRIORIDADES, linhas),
+    })
+
+
+def gerar_metas(quantidade, seed=0):
+    rng = np.random.default_rng(seed + 1)
+    alvos = np.round(rng.uniform(1000, 200000, quantidade), 2)
+    return [{
+        "descricao": f"Meta {i}",
+        "valor_alvo": float(alvo),
+        "valor_guardado": float(np.round(alvo * rng.uniform(0, 0.9), 2)),
+        "data_criacao": "01/01/2025",
+        "data_limite": f"{rng.integers(1, 29):02d}/{rng.integers(1, 13):02d}/{rng.integers(2026, 2036)}",
+        "status": "Em andamento",
+    } for i, alvo in enumerate(alvos)]
+
+
+def gerar_produtos(quantidade, seed=0):
+    rng = np.random.default_rng(seed + 2)
+    produtos = []
+    for i in range(quantidade):
+        tipo, risco = TIPOS_PRODUTO[i % len(TIPOS_PRODUTO)]
+        produtos.append({
+            "nome": f"{tipo} {i}",
+            "tipo": tipo,
+            "rentabilidade": f"{rng.uniform(80, 130):.0f}% do CDI" if risco == "Baixo" else f"{rng.uniform(6, 18):.1f}% a.a.",
+            "risco": risco,
+            "liquidez": "Diária" if i % 3 == 0 else "No vencimento",
+        })
+    return produtos
+
+
+def gerar_base(path, linhas, seed=0, metas=20, produtos=30, storage=None):
+    """Pasta `data/` completa: perfil, transações, metas e catálogo de produtos.
+
+    Com `storage="sqlite"` os dados são migrados para o banco depois de gerados.
+    """
+    os.makedirs(path, exist_ok=True)
+    df = gerar_ledger(linhas, seed)
+    df.to_csv(os.path.join(path, "transacoes.csv"), index=False)
+    rng = np.random.default_rng(seed + 3)
+    perfil = {
+        "nome": f"Usuário {seed}",
+        "idade": int(rng.integers(20, 70)),
+        "perfil": PERFIS[seed % len(PERFIS)],
+        "renda_mensal": float(np.round(rng.uniform(2000, 30000), 2)),
+        "saldo_atual": round(1000.0 + float(df["valor"].sum()), 2),
+        "saldo_inicial": 1000.0,
+    }
+    with open(os.path.join(path, "perfil_investidor.json"), "w", encoding="utf-8") as f:
+        json.dump(perfil, f, ensure_ascii=False)
+    with open(os.path.join(path, "objetivos_financeiros.json"), "w", encoding="utf-8") as f:
+        json.dump(gerar_metas(metas, seed), f, ensure_ascii=False)
+    with open(os.path.join(path, "produtos_financeiros.json"), "w", encoding="utf-8") as f:
+        json.dump(gerar_produtos(produtos, seed), f, ensure_ascii=False)
+    if storage and storage != "csv":
+        from modules.storage import migrate
+        migrate(path, storage).close()
+    return path
+
+
+class StubProvider(LLMProvider):
+    """LLM determinístico em processo: a resposta depende só da pergunta.
+
+    `first_token` e `chunk_delay` simulam a latência do modelo (segundos);
+    a cada `command_every` respostas uma traz um #SAVE_TRANSACAO#, para
+    exercitar o caminho de gravação do orquestrador.
+    """
+    model_name = "stub"
+    local = True
+    max_concurrency = 256
+    max_queue = 4096
+
+    def __init__(self, first_token=0.0, chunk_delay=0.0, chunks=24, command_every=4):
+        self.first_token = first_token
+        self.chunk_delay = chunk_delay
+        self.chunks = chunks
+        self.command_every = command_every
+        self.calls = 0
+        self.prompt_chars = 0
+
+    @property
+    def backend_key(self):
+        return f"stub:{id(self)}"
+
+    def reply(self, user_query):
+        semente = int(hashlib.sha256(user_query.encode("utf-8")).hexdigest()[:8], 16)
+        partes = [f"Parte {i} da análise ({semente % 97}). " for i in range(self.chunks)]
+        if self.command_every and semente % self.command_every == 0:
+            valor = -(semente % 500 + 1) / 10
+            comando = json.dumps({"descricao": "Bench", "valor": valor, "categoria": "Lazer"})
+            partes.insert(len(partes) // 2, f"#SAVE_TRANSACAO#{comando}#SAVE_TRANSACAO#")
+        return partes
+
+    async def generate_response(self, system_prompt, user_query):
+        return "".join([chunk async for chunk in self.stream_response(system_prompt, user_query)])
+
+    async def stream_response(self, system_prompt, user_query):
+        self.calls += 1
+        self.prompt_chars += len(system_prompt) + len(user_query)
+        await asyncio.sleep(self.first_token)
+        for parte in self.reply(user_query):
+            yield parte
+            await asyncio.sleep(self.chunk_delay)
+
+
+class StubRegistry(ProviderRegistry):
+    """Registro de provedores em que todo modo usa o mesmo StubProvider.
+
+    O middleware (limites, coalescência) e a rota automática continuam os
+    reais; só a chamada ao modelo é simulada.
+    """
+
+    def __init__(self, stub):
+        super().__init__()
+        self.stub = stub
+
+    def _build(self, mode, api_key, model):
+        return self.stub
@@ -1,57 +1,75 @@
 import os
-import json
-import pandas as pd
 import chainlit as cl
-from chainlit.input_widget import Select, TextInput
-from modules.orchestrator import FinAssistOrchestrator
+from chainlit.input_widget import Select, Switch, TextInput
+from modules.workers import io_pool
+from modules.telemetry import telemetry, PrometheusExporter
 
 # CONFIGURAÇÕES DE CAMINHOS
 current_dir = os.path.dirname(os.path.abspath(__file__))
 DATA_PATH = os.path.abspath(os.path.join(current_dir, "..", "data"))
 
+# Uma partição de dados por usuário (data/usuarios/<id>); sem login usa data/.
+# Criada em load_runtime(), junto com o import do pandas, na primeira sessão.
+tenants = None
+
 # FUNÇÕES AUXILIARES
 
 
+def load_runtime():
+    """Importa a pilha de dados (pandas, orquestrador) só quando a primeira sessão começa.
+
+    Mantém o boot do Chainlit leve; roda no pool de threads para não travar o event loop.
+    """
+    global tenants
+    from modules.orchestrator import FinAssistOrchestrator
+    if tenants is None:
+        from modules.tenants import TenantRegistry
+        tenants = TenantRegistry(DATA_PATH, max_tenants=int(os.getenv("FINASSIST_MAX_TENANTS", "64")))
+    return FinAssistOrchestrator
+
+
+def mount_metrics_endpoint(path="/metrics"):
+    """Expõe as métricas (formato texto do Prometheus) no próprio servidor do Chainlit."""
+    from chainlit.server import app as server
+    from starlette.responses import PlainTextResponse
+
+    async def metrics():
+        return PlainTextResponse(telemetry.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+    server.add_api_route(path, metrics, methods=["GET"], include_in_schema=False)
+    # A rota precisa vir antes da rota "catch-all" do frontend do Chainlit
+    server.router.routes.insert(0, server.router.routes.pop())
+
+
+# Com FINASSIST_TELEMETRY=prometheus, o endpoint /metrics fica disponível
+if telemetry.exporter(PrometheusExporter):
+    mount_metrics_endpoint()
+
+
 async def ensure_data_directory():
     """Garante que a pasta de dados exista na raiz do projeto."""
     if not os.path.exists(DATA_PATH):
         os.makedirs(DATA_PATH)
 
 
-def load_json(filename):
-    path = os.path.join(DATA_PATH, filename)
-    try:
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        return None
-    except Exception as e:
-        print(f"Erro ao carregar JSON {filename}: {e}")
-        return None
-
-
-def load_csv(filename):
-    path = os.path.join(DATA_PATH, filename)
-    try:
-        if os.path.exists(path):
-            return pd.read_csv(path)
-        return None
-    except Exception as e:
-        print(f"Erro ao carregar CSV {filename}: {e}")
-        return None
+def current_tenant():
+    """Partição do usuário autenticado (ou a padrão, sem login)."""
+    user = cl.user_session.get("user")
+    return tenants.acquire(user.identifier if user else None)
 
 
-async def load_all_financial_data():
+async def load_all_financial_data(tenant):
     """Consolida o carregamento dos dados para a sessão."""
+    retriever = await tenant.open()
+    data = retriever.data
     return {
-        "perfil_investidor": load_json("perfil_investidor.json"),
-        "produtos_financeiros": load_json("produtos_financeiros.json") or [],
-        "transacoes": load_csv("transacoes.csv"),
-        "objetivos_financeiros": load_json("objetivos_financeiros.json") or []
+        "perfil_investidor": data.get("perfil_investidor"),
+        "produtos_financeiros": data.get("produtos_financeiros"),
+        "objetivos_financeiros": data.get("objetivos_financeiros") or []
     }
 
 
-async def run_onboarding():
+async def run_onboarding(tenant):
     """Fluxo de configuração inicial."""
     await cl.Message(content="👋 Olá! Sou o FinAssist Pro. Vamos configurar sua base financeira.").send()
     res_nome = await cl.AskUserMessage(content="Qual é o seu nome?", timeout=120).send()
@@ -82,11 +100,8 @@ async def run_onboarding():
             await cl.Message(content="⚠️ Use apenas números.").send()
 
     perfil_data = {"nome": nome_usuario, "perfil": perfil_escolhido, "saldo_atual": saldo_final}
-    with open(os.path.join(DATA_PATH, "perfil_investidor.json"), "w", encoding='utf-8') as f:
-        json.dump(perfil_data, f, ensure_ascii=False, indent=4)
-    pd.DataFrame(columns=['data', 'descricao', 'valor', 'categoria', 'prioridade']).to_csv(os.path.join(DATA_PATH, "transacoes.csv"), index=False)
-    with open(os.path.join(DATA_PATH, "objetivos_financeiros.json"), "w", encoding='utf-8') as f:
-        json.dump([], f, ensure_ascii=False, indent=4)
+    async with tenant.lock:
+        await io_pool.run(tenant.setup, perfil_data)
     await cl.Message(content=f"✅ Tudo pronto, **{nome_usuario}**!").send()
 
 
@@ -98,19 +113,24 @@ async def start():
     await ensure_data_directory()
     # Renderiza Widgets (Engrenagem)
     settings = await cl.ChatSettings([
-        Select(id="ModelMode", label="🤖 Modo do Modelo", values=["local", "gemini", "openai"], initial_index=0),
+        Select(id="ModelMode", label="🤖 Modo do Modelo", values=["local", "gemini", "openai", "auto"], initial_index=0),
+        Switch(id="LocalOnly", label="🔒 Privacidade: usar somente o modelo local", initial=False),
         TextInput(id="GeminiKey", label="Gemini API Key", placeholder="Insira aqui..."),
         TextInput(id="OpenAIKey", label="OpenAI API Key", placeholder="Insira aqui...")
     ]).send()
 
-    perfil_path = os.path.join(DATA_PATH, "perfil_investidor.json")
-    if not os.path.exists(perfil_path):
-        await run_onboarding()
+    FinAssistOrchestrator = await io_pool.run(load_runtime)
+    tenant = current_tenant()
+    cl.user_session.set("tenant", tenant)
+    # Uma única carga por usuário: sessões seguintes reaproveitam o retriever já aberto
+    await tenant.open()
+    if not tenant.exists():
+        await run_onboarding(tenant)
 
     # Carrega dados e Orquestrador
-    data = await load_all_financial_data()
+    data = await load_all_financial_data(tenant)
     cl.user_session.set("financial_data", data)
-    orchestrator = FinAssistOrchestrator(mode=settings["ModelMode"])
+    orchestrator = FinAssistOrchestrator(mode=settings["ModelMode"], tenant=tenant, local_only=settings["LocalOnly"])
     cl.user_session.set("orchestrator", orchestrator)
     nome = data.get("perfil_investidor", {}).get("nome", "Usuário")
     await cl.Message(content=f"Bem-vindo de volta, **{nome}**! Como posso ajudar hoje?").send()
@@ -120,13 +140,33 @@ async def start():
 async def setup_agent(settings):
     mode = settings["ModelMode"]
     api_key = settings["GeminiKey"] if mode == "gemini" else settings["OpenAIKey"]
-    cl.user_session.set("orchestrator", FinAssistOrchestrator(mode=mode, api_key=api_key))
-    await cl.Message(content=f"⚙️ Modo **{mode.upper()}** ativado.").send()
+    api_keys = {"gemini": settings["GeminiKey"], "openai": settings["OpenAIKey"]}
+    orchestrator = cl.user_session.get("orchestrator")
+    if orchestrator:
+        # Só troca o provedor (reaproveitado do registro); dados e lock continuam os da sessão
+        orchestrator.configure(mode=mode, api_key=api_key, api_keys=api_keys, local_only=settings["LocalOnly"])
+    else:
+        FinAssistOrchestrator = await io_pool.run(load_runtime)
+        tenant = cl.user_session.get("tenant")
+        cl.user_session.set("orchestrator", FinAssistOrchestrator(mode=mode, api_key=api_key, tenant=tenant,
+                                                                  api_keys=api_keys, local_only=settings["LocalOnly"]))
+    aviso = " (somente modelo local)" if settings["LocalOnly"] else ""
+    await cl.Message(content=f"⚙️ Modo **{mode.upper()}** ativado{aviso}.").send()
+
+
+@cl.on_chat_end
+async def end():
+    tenant = cl.user_session.get("tenant")
+    if tenant and tenants is not None:
+        await io_pool.run(tenants.release, tenant)
 
 
 @cl.on_message
 async def main(message: cl.Message):
     orchestrator = cl.user_session.get("orchestrator")
     if orchestrator:
-        response = await orchestrator.run(message.content)
-        await cl.Message(content=response).send()
+        # Repassa os tokens à medida que chegam (tags de comando já filtradas)
+        msg = cl.Message(content="")
+        async for token in orchestrator.run_stream(message.content):
+            await msg.stream_token(token)
+        await msg.send()
@@ -0,0 +1,89 @@
+import time
+import atexit
+
+# Tolerância para diferenças de arredondamento (centavos)
+TOLERANCIA_SALDO = 0.01
+
+# Saldos com alterações ainda não gravadas. Referência forte de propósito: um
+# retriever descartado sem flush ainda tem o saldo gravado aqui ou na saída
+_pendentes = set()
+
+
+class RunningBalance:
+    """Saldo mantido em memória e gravado em lote no perfil (via `save`).
+
+    O perfil guarda também o `saldo_inicial`, de modo que o saldo sempre pode ser
+    reconstruído como `saldo_inicial + soma das transações` e a divergência detectada.
+    """
+
+    def __init__(self, perfil, save, flush_every=20, flush_interval=5.0):
+        self.perfil = perfil
+        self.save = save
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.pending = 0
+        self._last_flush = time.monotonic()
+
+    @property
+    def saldo(self):
+        return self.perfil.get("saldo_atual", 0.0) if self.perfil is not None else 0.0
+
+    def attach(self, total_transacoes):
+        """Associa o saldo à soma atual do ledger; corrige a divergência se houver."""
+        if self.perfil is None:
+            return 0.0
+        if "saldo_inicial" not in self.perfil:
+            # Primeira execução: assume que o saldo gravado está em dia com o CSV
+            self.perfil["saldo_inicial"] = self.saldo - total_transacoes
+            self._mark_pending()
+            self.flush()
+        drift = self.verify(total_transacoes)
+        if abs(drift) > TOLERANCIA_SALDO:
+            print(f"Aviso: saldo divergente em R$ {drift:.2f}; reconstruindo a partir das transações.")
+            self.rebuild(total_transacoes)
+        return drift
+
+    def apply(self, valor_delta):
+        if self.perfil is None:
+            return
+        self.perfil["saldo_atual"] = self.saldo + valor_delta
+        self._mark_pending()
+        if self.pending >= self.flush_every or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def expected(self, total_transacoes):
+        return self.perfil.get("saldo_inicial", 0.0) + total_transacoes
+
+    def verify(self, total_transacoes):
+        """Diferença entre o saldo corrente e o reconstruído pelo ledger."""
+        if self.perfil is None:
+            return 0.0
+        return self.saldo - self.expected(total_transacoes)
+
+    def rebuild(self, total_transacoes):
+        if self.perfil is None:
+            return
+        self.perfil["saldo_atual"] = round(self.expected(total_transacoes), 2)
+        self._mark_pending()
+        self.flush()
+
+    def _mark_pending(self):
+        self.pending += 1
+        _pendentes.add(self)
+
+    def flush(self):
+        if self.perfil is None or not self.pending:
+            return
+        self.save(self.perfil)
+        self.pending = 0
+        self._last_flush = time.monotonic()
+        _pendentes.discard(self)
+
+
+@atexit.register
+def _flush_all():
+    for saldo in list(_pendentes):
+        try:
+            saldo.flush()
+        except Exception as e:
+            print(f"Erro ao gravar saldo: {e}")
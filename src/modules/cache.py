@@ -0,0 +1,43 @@
+import os
+import time
+
+
+def file_signature(path):
+    """Assinatura barata de um arquivo: (mtime_ns, tamanho), ou None se não existir."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+class FileWatcher:
+    """Detecta mudanças em arquivos pela assinatura mtime/tamanho.
+
+    As próprias escritas do processo são registradas com `mark`, para não
+    serem confundidas com alterações externas. As verificações (os.stat) são
+    limitadas a uma a cada `check_interval` segundos.
+    """
+
+    def __init__(self, check_interval=1.0):
+        self.check_interval = check_interval
+        self._signatures = {}
+        self._last_check = time.monotonic()
+
+    def mark(self, *paths):
+        for path in paths:
+            self._signatures[path] = file_signature(path)
+
+    def changed(self, path):
+        sig = file_signature(path)
+        if path in self._signatures and self._signatures[path] == sig:
+            return False
+        self._signatures[path] = sig
+        return True
+
+    def due(self):
+        now = time.monotonic()
+        if now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+        return True
@@ -0,0 +1,97 @@
+import json
+import time
+import threading
+from modules.cache import file_signature
+
+
+class Product:
+    """Registro compacto e imutável de um produto financeiro."""
+    __slots__ = ("nome", "tipo", "rentabilidade", "risco", "liquidez", "extras")
+
+    def __init__(self, nome, tipo=None, rentabilidade=None, risco=None, liquidez=None, extras=()):
+        for campo, valor in zip(self.__slots__, (nome, tipo, rentabilidade, risco, liquidez, tuple(extras))):
+            object.__setattr__(self, campo, valor)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Product é somente leitura")
+
+    @classmethod
+    def from_dict(cls, d):
+        extras = tuple((k, v) for k, v in d.items() if k not in cls.__slots__)
+        return cls(d.get("nome"), d.get("tipo"), d.get("rentabilidade"), d.get("risco"), d.get("liquidez"), extras)
+
+    def get(self, key, default=None):
+        # Compatível com o acesso antigo por dicionário (p.get('nome'))
+        if key in self.__slots__ and key != "extras":
+            valor = getattr(self, key)
+            return default if valor is None else valor
+        return dict(self.extras).get(key, default)
+
+    def to_dict(self):
+        d = {k: getattr(self, k) for k in self.__slots__[:-1] if getattr(self, k) is not None}
+        d.update(self.extras)
+        return d
+
+    def __repr__(self):
+        return f"Product({self.nome!r}, {self.tipo!r})"
+
+
+class ProductCatalog:
+    """Catálogo de produtos (somente leitura) com o texto do prompt já renderizado."""
+    __slots__ = ("products", "prompt_text", "signature")
+
+    def __init__(self, products, signature=None):
+        self.products = tuple(products)
+        self.signature = signature
+        self.prompt_text = self._render()
+
+    @classmethod
+    def from_file(cls, path):
+        signature = file_signature(path)
+        produtos = []
+        if signature is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    produtos = [Product.from_dict(p) for p in json.load(f)]
+            except Exception as e:
+                print(f"Erro ao ler produtos: {e}")
+        return cls(produtos, signature)
+
+    def _render(self):
+        if not self.products:
+            return ""
+        txt_prod = "PRODUTOS FINANCEIROS DISPONÍVEIS (Apenas Leitura):\n"
+        for p in self.products:
+            txt_prod += f"- {p.get('nome')} ({p.get('tipo')}): Rentabilidade {p.get('rentabilidade')} | Risco {p.get('risco')}\n"
+        return txt_prod
+
+    def __iter__(self):
+        return iter(self.products)
+
+    def __len__(self):
+        return len(self.products)
+
+    def __bool__(self):
+        return bool(self.products)
+
+
+# Um catálogo por arquivo, compartilhado por todas as sessões do processo
+_catalogos = {}
+_lock = threading.Lock()
+CHECK_INTERVAL = 2.0
+
+
+def get_catalog(path):
+    """Retorna o catálogo compartilhado, recarregando se o arquivo mudou."""
+    agora = time.monotonic()
+    entrada = _catalogos.get(path)
+    if entrada is not None and agora - entrada[1] < CHECK_INTERVAL:
+        return entrada[0]
+    with _lock:
+        entrada = _catalogos.get(path)
+        if entrada is None or entrada[0].signature != file_signature(path):
+            catalogo = ProductCatalog.from_file(path)
+        else:
+            catalogo = entrada[0]
+        _catalogos[path] = (catalogo, agora)
+        return catalogo
@@ -0,0 +1,166 @@
+import json
+
+# Tags de comando reconhecidas na resposta do modelo
+COMMAND_TAGS = (
+    "#SAVE_TRANSACAO#",
+    "#SAVE_META#",
+    "#UPDATE_TRANSACAO#",
+    "#UPDATE_META#",
+    "#DELETE_TRANSACAO#",
+    "#DELETE_META#",
+    "#SAVE#"
+)
+
+
+def clean_json_text(text):
+    return text.replace("```json", "").replace("```", "").replace("'", '"').strip()
+
+
+def _json_end(text):
+    """Índice logo após o objeto JSON que começa no primeiro '{', ou None se incompleto."""
+    inicio = text.find("{")
+    if inicio < 0:
+        return None
+    depth, aspas, escape = 0, None, False
+    for i in range(inicio, len(text)):
+        c = text[i]
+        if aspas:
+            if escape:
+                escape = False
+            elif c == "\\":
+                escape = True
+            elif c == aspas:
+                aspas = None
+        elif c in "\"'":
+            aspas = c
+        elif c == "{":
+            depth += 1
+        elif c == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    return None
+
+
+class Command:
+    __slots__ = ("tag", "data", "raw", "error")
+
+    def __init__(self, tag, raw):
+        self.tag = tag
+        self.raw = raw
+        self.data = None
+        self.error = None
+        try:
+            data = json.loads(clean_json_text(raw))
+            if isinstance(data, dict):
+                self.data = data
+            else:
+                self.error = "o comando deve ser um objeto JSON"
+        except json.JSONDecodeError as e:
+            self.error = str(e)
+
+    def __repr__(self):
+        return f"Command({self.tag!r}, {self.data!r})"
+
+
+class CommandStreamParser:
+    """Scanner incremental (máquina de estados) das tags de comando.
+
+    `feed` recebe pedaços do stream e devolve, na ordem, o texto limpo (str)
+    e cada bloco de comando completo (Command). Cada caractere é examinado
+    uma única vez; só fica retido o mínimo necessário para decidir se um '#'
+    inicia uma tag.
+    """
+
+    def __init__(self, tags=COMMAND_TAGS):
+        self.tags = tags
+        self.buffer = ""
+        self.tag = None  # tag do bloco aberto (None = fora de bloco)
+        self._scan = 0  # posição já examinada no buffer fora de bloco
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        events = []
+        while True:
+            if self.tag is None:
+                if not self._feed_text(events):
+                    break
+            elif not self._feed_block(events):
+                break
+        return events
+
+    def close(self):
+        """Fim do stream: fecha blocos sem tag final e libera o texto retido."""
+        events = []
+        if self.tag is not None:
+            fim = _json_end(self.buffer)
+            corte = fim if fim is not None else len(self.buffer)
+            events.append(Command(self.tag, self.buffer[:corte]))
+            self.buffer = self.buffer[corte:]
+            self.tag = None
+        if self.buffer:
+            events.append(self.buffer)
+        self.buffer = ""
+        self._scan = 0
+        return events
+
+    def _feed_text(self, events):
+        pos = self.buffer.find("#", self._scan)
+        if pos < 0:
+            if self.buffer:
+                events.append(self.buffer)
+            self.buffer, self._scan = "", 0
+            return False
+        resto = self.buffer[pos:]
+        for tag in self.tags:
+            if resto.startswith(tag):
+                if pos:
+                    events.append(self.buffer[:pos])
+                self.buffer = resto[len(tag):]
+                self.tag, self._scan = tag, 0
+                return True
+        if any(tag.startswith(resto) for tag in self.tags):
+            # Pode ser o começo de uma tag: libera o texto anterior e aguarda mais dados
+            if pos:
+                events.append(self.buffer[:pos])
+            self.buffer, self._scan = resto, 0
+            return False
+        self._scan = pos + 1
+        return True
+
+    def _feed_block(self, events):
+        fim_tag = self.buffer.find(self.tag)
+        if fim_tag >= 0:
+            events.append(Command(self.tag, self.buffer[:fim_tag]))
+            self.buffer = self.buffer[fim_tag + len(self.tag):]
+            self.tag = None
+            return True
+        # Outra tag de comando antes do fechamento: o bloco aberto terminou ali (sem
+        # a tag final). Se o JSON dele ficou incompleto, o Command sai com erro.
+        proxima = min((p for p in (self.buffer.find(t) for t in self.tags if t != self.tag) if p >= 0), default=-1)
+        if proxima >= 0:
+            fim = _json_end(self.buffer[:proxima])
+            corte = fim if fim is not None else proxima
+            events.append(Command(self.tag, self.buffer[:corte]))
+            if self.buffer[corte:proxima].strip(" \n`"):
+                events.append(self.buffer[corte:proxima])
+            self.buffer = self.buffer[proxima:]
+            self.tag = None
+            return True
+        # Modelo esqueceu a tag de fechamento: o JSON já terminou e veio texto depois
+        fim = _json_end(self.buffer)
+        if fim is not None:
+            depois = self.buffer[fim:].lstrip().lstrip("`").lstrip()
+            if depois and not depois.startswith("#"):
+                events.append(Command(self.tag, self.buffer[:fim]))
+                # Descarta o fechamento ``` do bloco de código, se houver
+                self.buffer = " " + depois if self.buffer[fim:].lstrip().startswith("`") else self.buffer[fim:]
+                self.tag = None
+                return True
+        return False
+
+
+def parse_commands(text):
+    """Versão não-incremental: separa um texto completo em texto e comandos."""
+    parser = CommandStreamParser()
+    return parser.feed(text) + parser.close()
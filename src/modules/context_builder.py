@@ -0,0 +1,276 @@
+import numpy as np
+import pandas as pd
+from modules.intents import tokenize
+from modules.projections import GoalProjector, goal_from_query
+
+MESES = ("janeiro", "fevereiro", "marco", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro")
+
+
+def estimate_tokens(text):
+    """Estimativa barata de tokens (~4 caracteres por token em português)."""
+    return len(text) // 4 + 1
+
+
+def parse_period(query, hoje=None):
+    """Extrai da pergunta um período (início, fim, rótulo), ou None."""
+    hoje = (hoje or pd.Timestamp.now()).normalize()
+    tokens = tokenize(query)
+    texto = " ".join(tokens)
+    inicio_mes = hoje.replace(day=1)
+    anos = [int(t) for t in tokens if len(t) == 4 and t.isdigit() and t.startswith("20")]
+    for i, nome in enumerate(MESES):
+        if nome in tokens:
+            ano = anos[0] if anos else (hoje.year if i + 1 <= hoje.month else hoje.year - 1)
+            inicio = pd.Timestamp(year=ano, month=i + 1, day=1)
+            return inicio, inicio + pd.offsets.MonthEnd(0), inicio.strftime("%m/%Y")
+    if "mes passado" in texto or "ultimo mes" in texto:
+        inicio = inicio_mes - pd.offsets.MonthBegin(1)
+        return inicio, inicio_mes - pd.Timedelta(days=1), inicio.strftime("%m/%Y")
+    if "trimestre" in tokens:
+        return inicio_mes - pd.offsets.MonthBegin(3), hoje, "últimos 3 meses"
+    if "semestre" in tokens:
+        return inicio_mes - pd.offsets.MonthBegin(6), hoje, "últimos 6 meses"
+    if "semana" in tokens:
+        return hoje - pd.Timedelta(days=7), hoje, "últimos 7 dias"
+    if "hoje" in tokens:
+        return hoje, hoje, "hoje"
+    if "ontem" in tokens:
+        ontem = hoje - pd.Timedelta(days=1)
+        return ontem, ontem, "ontem"
+    if "mes" in tokens:
+        return inicio_mes, hoje, inicio_mes.strftime("%m/%Y")
+    if "ano" in tokens or anos:
+        ano = anos[0] if anos else hoje.year
+        return pd.Timestamp(year=ano, month=1, day=1), pd.Timestamp(year=ano, month=12, day=31), str(ano)
+    return None
+
+
+def _brl(valor):
+    return f"R$ {valor:,.2f}".replace(",", "X").replace(".", ",").replace("X", ".")
+
+
+class ContextBlock:
+    __slots__ = ("name", "text", "priority", "required")
+
+    def __init__(self, name, text, priority, required=False):
+        self.name = name
+        self.text = text
+        self.priority = priority
+        self.required = required
+
+    @property
+    def tokens(self):
+        return estimate_tokens(self.text)
+
+
+class ContextBuilder:
+    """Monta o contexto do prompt dentro de um orçamento de tokens.
+
+    Cada bloco recebe uma prioridade conforme as intenções da pergunta; os
+    blocos são escolhidos por prioridade até o orçamento acabar e emitidos
+    sempre na mesma ordem, para que o prompt mude o mínimo entre turnos.
+    """
+
+    ORDEM = ("perfil", "metas", "projecoes", "categorias", "mensal", "periodo", "produtos", "transacoes")
+
+    def __init__(self, token_budget=1200, min_priority=50, max_categorias=8, max_meses=6, max_transacoes=8,
+                 max_projecoes=4, projector=None):
+        self.token_budget = token_budget
+        self.min_priority = min_priority
+        self.max_categorias = max_categorias
+        self.max_meses = max_meses
+        self.max_transacoes = max_transacoes
+        self.max_projecoes = max_projecoes
+        # Contas de metas feitas localmente; o modelo só narra o resultado
+        self.projector = projector or GoalProjector()
+        # Agregados memorizados para o último DataFrame visto (refeito só após mudanças)
+        self._memo_df = None
+        self._memo = {}
+
+    def build(self, data, transacoes, intents, ledger=None, query=""):
+        blocos = [b for b in self._blocks(data, transacoes, intents, ledger, query) if b is not None]
+        escolhidos = self.pack(blocos)
+        if not escolhidos:
+            return "Nenhum contexto financeiro disponível."
+        escolhidos.sort(key=lambda b: self.ORDEM.index(b.name) if b.name in self.ORDEM else len(self.ORDEM))
+        return "\n\n".join(b.text for b in escolhidos)
+
+    def pack(self, blocos):
+        restante = self.token_budget
+        escolhidos = []
+        for bloco in sorted(blocos, key=lambda b: (not b.required, -b.priority)):
+            if not bloco.required and bloco.priority < self.min_priority:
+                continue
+            if bloco.required or bloco.tokens <= restante:
+                escolhidos.append(bloco)
+                restante -= bloco.tokens
+        return escolhidos
+
+    def _blocks(self, data, transacoes, intents, ledger, query):
+        perfil = data.get("perfil_investidor")
+        yield self.profile_block(perfil) if perfil else None
+        yield self.goals_block(data.get("objetivos_financeiros") or [], 90 if "metas" in intents else 60)
+
+        df = transacoes if transacoes is not None and not transacoes.empty else None
+        hipotetica = goal_from_query(query) if query else None
+        if hipotetica or intents & {"metas", "investimentos"}:
+            yield self.projections_block(data, df, hipotetica, 93 if hipotetica or "metas" in intents else 70)
+        if df is not None:
+            foco_gastos = bool(intents & {"categorias", "transacoes"})
+            yield self._memoized("categorias", df, self.category_block, 85 if foco_gastos else 40)
+            yield self._memoized("mensal", df, self.monthly_block, 80 if "periodo" in intents else 30)
+            if "transacoes" in intents:
+                yield self.recent_block(df, 95)
+            if "periodo" in intents and ledger is not None:
+                yield self.period_block(ledger, parse_period(query), 92)
+
+        produtos = data.get("produtos_financeiros")
+        if "investimentos" in intents and produtos:
+            yield ContextBlock("produtos", produtos.prompt_text.rstrip(), 88)
+
+    def _memoized(self, nome, df, func, priority):
+        if df is not self._memo_df:
+            self._memo_df, self._memo = df, {}
+        if nome not in self._memo:
+            self._memo[nome] = func(df, priority)
+        bloco = self._memo[nome]
+        return ContextBlock(bloco.name, bloco.text, priority) if bloco is not None else None
+
+    # --- BLOCOS ---
+
+    def profile_block(self, perfil):
+        nome = perfil.get('nome', 'Usuário')
+        saldo = perfil.get('saldo_atual', 0.0)
+        txt = f"DADOS DO CLIENTE:\n- Nome: {nome}\n- Saldo Atual: R$ {saldo:.2f}"
+        if perfil.get('perfil'):
+            txt += f"\n- Perfil de Investidor: {perfil['perfil']}"
+        return ContextBlock("perfil", txt, 100, required=True)
+
+    def goals_block(self, metas, priority):
+        if not metas:
+            return None
+        alvo = np.array([_float(m.get('valor_alvo')) for m in metas])
+        guardado = np.array([_float(m.get('valor_guardado')) for m in metas])
+        progresso = np.divide(guardado, alvo, out=np.zeros_like(alvo), where=alvo > 0) * 100
+        linhas = ["OBJETIVOS FINANCEIROS (Use o ID para alterar/excluir):"]
+        for idx, m in enumerate(metas):
+            status = m.get('status', 'Em andamento')
+            prazo = m.get('data_limite', 'Indefinido')
+            linhas.append(f"[ID: {idx}] {m.get('descricao')}: Alvo R$ {m.get('valor_alvo')} | "
+                          f"Guardado R$ {guardado[idx]:.2f} ({progresso[idx]:.0f}%) | Prazo {prazo} - {status}")
+        return ContextBlock("metas", "\n".join(linhas), priority)
+
+    def projections_block(self, data, df, hipotetica, priority):
+        metas = [(str(i), m) for i, m in enumerate(data.get("objetivos_financeiros") or [])
+                 if m.get("status", "Em andamento") == "Em andamento"]
+        saldo = 0.0
+        if hipotetica:
+            # A simulação parte do que o usuário já tem: o saldo atual (se positivo)
+            saldo = max(_float((data.get("perfil_investidor") or {}).get("saldo_atual")), 0.0)
+            metas.insert(0, ("pergunta", dict(hipotetica, valor_guardado=saldo)))
+        if not metas:
+            return None
+        p = self.projector.project([m for _, m in metas], df, data.get("produtos_financeiros"),
+                                   data.get("perfil_investidor"))
+        # A simulação da pergunta primeiro, depois os prazos mais próximos
+        ordem = sorted(range(len(metas)), key=lambda g: (metas[g][0] != "pergunta", np.nan_to_num(p.meses[g], nan=1e9)))
+        linhas = ["PROJEÇÃO DAS METAS (calculada pelo sistema: use estes números, não refaça as contas):",
+                  f"Base: excedente mensal médio {_brl(p.aporte)} (±{_brl(p.aporte_desvio)}, últimos {p.historico} meses); "
+                  f"chance = % de {p.cenarios} cenários simulados em que o alvo é atingido no prazo."]
+        if hipotetica:
+            linhas.append(f"A simulação da pergunta considera o saldo atual ({_brl(saldo)}) como já guardado.")
+        for g in ordem[:self.max_projecoes]:
+            ident, m = metas[g]
+            rotulo = f"[{'Simulação' if ident == 'pergunta' else 'ID: ' + ident}] {m.get('descricao')} ({_brl(_float(m.get('valor_alvo')))})"
+            if p.falta[g] <= 0:
+                linhas.append(f"- {rotulo}: alvo já atingido.")
+                continue
+            b = p.best(g)
+            nome, taxa, _ = p.produtos[b]
+            taxa_txt = f"{taxa * 100:.1f}".replace(".", ",")
+            opcao = f"{nome} ({taxa_txt}% a.a.)" if b else "sem investir"
+            if np.isnan(p.meses[g]):
+                n = p.meses_para_atingir[g, b]
+                quando = (f"alvo em ~{int(n)} meses ({(pd.Timestamp.now() + pd.DateOffset(months=int(n))).strftime('%m/%Y')})"
+                          if np.isfinite(n) else "não atinge o alvo")
+                linhas.append(f"- {rotulo}: faltam {_brl(p.falta[g])}, sem prazo. Com o excedente atual em {opcao}: {quando}.")
+                continue
+            if p.meses[g] <= 0:
+                linhas.append(f"- {rotulo}: faltam {_brl(p.falta[g])} e o prazo ({m.get('data_limite')}) já venceu.")
+                continue
+            txt = f"- {rotulo}: faltam {_brl(p.falta[g])} em {int(p.meses[g])} meses (prazo {m.get('data_limite')}). "
+            txt += f"Sem investir: precisa {_mensal(p.necessario[g, 0])}, chance {p.chance[g, 0] * 100:.0f}%"
+            if b:
+                txt += f". Melhor opção {opcao}: precisa {_mensal(p.necessario[g, b])}, chance {p.chance[g, b] * 100:.0f}%"
+            alcance = p.no_prazo[g, b] / _float(m.get('valor_alvo')) * 100
+            txt += f"; com o excedente atual chega a {_brl(p.no_prazo[g, b])} ({alcance:.0f}% do alvo)."
+            linhas.append(txt)
+        return ContextBlock("projecoes", "\n".join(linhas), priority)
+
+    def category_block(self, df, priority):
+        valores = pd.to_numeric(df['valor'], errors='coerce').fillna(0.0)
+        gastos = valores.where(valores < 0, 0.0).abs()
+        por_categoria = gastos.groupby(df['categoria'].astype(str), observed=True).agg(['sum', 'count'])
+        por_categoria = por_categoria[por_categoria['sum'] > 0].sort_values('sum', ascending=False)
+        if por_categoria.empty:
+            return None
+        total = por_categoria['sum'].sum()
+        linhas = ["RESUMO DE GASTOS POR CATEGORIA (todo o histórico):"]
+        for cat, row in por_categoria.head(self.max_categorias).iterrows():
+            linhas.append(f"- {cat}: {_brl(row['sum'])} em {int(row['count'])} lançamentos ({row['sum'] / total * 100:.0f}%)")
+        linhas.append(f"- Total de gastos: {_brl(total)}")
+        return ContextBlock("categorias", "\n".join(linhas), priority)
+
+    def monthly_block(self, df, priority):
+        datas = df['data']
+        valores = pd.to_numeric(df['valor'], errors='coerce').fillna(0.0)
+        validos = datas.notna()
+        if not validos.any():
+            return None
+        mes = datas[validos].dt.to_period('M')
+        v = valores[validos]
+        mensal = pd.DataFrame({
+            "entradas": v.where(v > 0, 0.0),
+            "saidas": v.where(v < 0, 0.0).abs(),
+        }).groupby(mes).sum().sort_index().tail(self.max_meses)
+        mensal["liquido"] = mensal["entradas"] - mensal["saidas"]
+        mensal["variacao"] = mensal["saidas"].diff()
+        linhas = ["FLUXO MENSAL (entradas / saídas / líquido / variação dos gastos):"]
+        for periodo, row in mensal.iterrows():
+            variacao = "" if np.isnan(row["variacao"]) else f" | {'+' if row['variacao'] >= 0 else '-'}{_brl(abs(row['variacao']))}"
+            linhas.append(f"- {periodo.strftime('%m/%Y')}: {_brl(row['entradas'])} / {_brl(row['saidas'])} / {_brl(row['liquido'])}{variacao}")
+        return ContextBlock("mensal", "\n".join(linhas), priority)
+
+    def period_block(self, ledger, periodo, priority):
+        if periodo is None:
+            return None
+        inicio, fim, rotulo = periodo
+        fatia = ledger.between(inicio, fim)
+        gastos = fatia['valor'].where(fatia['valor'] < 0, 0.0).abs()
+        por_categoria = gastos.groupby(fatia['categoria'], observed=True).sum()
+        por_categoria = por_categoria[por_categoria > 0].sort_values(ascending=False)
+        entradas = fatia['valor'].where(fatia['valor'] > 0, 0.0).sum()
+        linhas = [f"MOVIMENTAÇÃO NO PERÍODO ({rotulo}, {inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}):"]
+        for cat, total in por_categoria.head(self.max_categorias).items():
+            linhas.append(f"- {cat}: {_brl(total)}")
+        linhas.append(f"- Total de gastos: {_brl(gastos.sum())} | Entradas: {_brl(entradas)} | {len(fatia)} lançamentos")
+        return ContextBlock("periodo", "\n".join(linhas), priority)
+
+    def recent_block(self, df, priority):
+        ultimas = df.tail(self.max_transacoes).reset_index()
+        ultimas['data'] = ultimas['data'].dt.strftime("%d/%m/%Y")
+        txt = "ÚLTIMAS TRANSAÇÕES (Use o ID para editar/excluir):\n"
+        txt += ultimas[['index', 'data', 'descricao', 'valor', 'categoria']].to_string(index=False)
+        return ContextBlock("transacoes", txt, priority)
+
+
+def _mensal(valor):
+    return f"{_brl(valor)}/mês" if np.isfinite(valor) else "aporte impossível"
+
+
+def _float(value):
+    try:
+        return float(value or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
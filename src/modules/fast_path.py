@@ -0,0 +1,151 @@
+import re
+from modules.intents import IntentRouter, normalize
+
+# Palavra-chave -> categoria (mesma sintaxe do vocabulário de intenções: "*" = prefixo).
+# A ordem decide o empate quando a descrição casa com mais de uma categoria.
+DEFAULT_CATEGORIAS = {
+    "Salário": ["salario", "pagamento do mes", "holerite", "13o", "decimo terceiro", "ferias"],
+    "Alimentação": [
+        "almoco", "janta*", "cafe*", "lanche*", "restaurante*", "mercado", "supermercado", "padaria",
+        "ifood", "pizza*", "comida", "feira", "acougue", "hamburguer*", "refeicao"
+    ],
+    "Transporte": [
+        "uber", "99", "taxi", "onibus", "metro", "gasolina", "combustivel", "estacionamento",
+        "pedagio", "passagem", "passagens", "trem", "bicicleta"
+    ],
+    "Moradia": ["aluguel", "condominio", "luz", "energia", "agua", "gas", "internet", "iptu", "reforma"],
+    "Saúde": ["farmacia", "remedio*", "medico*", "consulta*", "exame*", "dentista", "plano de saude", "academia"],
+    "Educação": ["curso*", "faculdade", "escola", "livro*", "mensalidade", "material escolar"],
+    "Lazer": ["cinema", "show*", "viagem", "bar", "balada", "netflix", "spotify", "streaming", "jogo*", "festa"],
+    "Vendas": ["venda", "vendi", "vendido"],
+}
+
+# Valor em reais: "50", "50,90", "1.500", "1.500,00", "R$ 50", "50 reais", "2 mil"
+_VALOR = r"(?:r\$\s*)?(?P<valor>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[,.]\d{1,2})?)(?P<mil>\s*mil)?(?:\s*(?:reais|real|conto|contos|pila))?"
+_DESC = r"(?P<desc>[a-z][a-z0-9 ]{0,40}?)"
+_FIM = r"\s*[.!]?"
+
+GASTO_RE = re.compile(
+    r"(?:eu\s+)?(?:gastei|paguei|comprei|torrei)\s+" + _VALOR +
+    r"\s+(?:no|na|nos|nas|com|em|de|do|da|pra|para|pelo|pela|num|numa|um|uma)\s+" + _DESC + _FIM)
+GASTO_ANTES_RE = re.compile(
+    r"(?:eu\s+)?(?:gastei|paguei|comprei)\s+(?:o|a|os|as|um|uma)?\s*" + _DESC + r"\s+(?:por|de)\s+" + _VALOR + _FIM)
+RECEITA_RE = re.compile(
+    r"(?:eu\s+)?(?:recebi|ganhei|vendi|entrou|entraram)\s+" + _VALOR +
+    r"\s+(?:de|do|da|dos|das|com|pelo|pela|por|no|na|em)\s+" + _DESC + _FIM)
+EXCLUIR_RE = re.compile(
+    r"(?:apague|apaga|apagar|exclua|exclui|excluir|remova|remove|remover|delete|deletar)\s+"
+    r"(?:a\s+)?transacao\s+(?:de\s+)?(?:id\s*)?(?P<id>\d+)" + _FIM)
+EDITAR_RE = re.compile(
+    r"(?:altere|altera|alterar|mude|muda|mudar|corrija|corrige|corrigir|edite|edita|editar|atualize|atualiza)\s+"
+    r"(?:o\s+valor\s+d[ae]\s+)?(?:a\s+)?transacao\s+(?:de\s+)?(?:id\s*)?(?P<id>\d+)\s+(?:para|pra)\s+(?P<neg>-\s*)?" + _VALOR + _FIM)
+
+# Palavras que tornam o pedido ambíguo para o atalho (datas, dúvidas, negação): vai para o modelo
+_AMBIGUAS = frozenset({
+    "ontem", "anteontem", "semana", "mes", "amanha", "dia", "nao", "se", "quanto", "quando",
+    "porque", "devo", "posso", "vale", "parcela", "parcelas", "parcelado", "vezes", "e", "mais"
+})
+_ESPACOS_RE = re.compile(r"\s+")
+
+
+def parse_valor(texto, mil=False):
+    """Converte '1.500,00' / '50,9' / '12.5' em float."""
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    elif re.fullmatch(r"\d{1,3}(?:\.\d{3})+", texto):
+        texto = texto.replace(".", "")
+    valor = float(texto)
+    return valor * 1000 if mil else valor
+
+
+class FastCommand:
+    """Comando reconhecido sem o modelo: mesma tag e payload que o LLM emitiria.
+
+    `keep_sign` marca uma edição de valor sem sinal explícito ("mude a
+    transação 4 para 30"): quem executa mantém o sinal do valor gravado.
+    """
+    __slots__ = ("tag", "data", "keep_sign")
+
+    def __init__(self, tag, data, keep_sign=False):
+        self.tag = tag
+        self.data = data
+        self.keep_sign = keep_sign
+
+    def __repr__(self):
+        return f"FastCommand({self.tag!r}, {self.data!r})"
+
+
+class FastPathParser:
+    """Reconhece pedidos simples e sem ambiguidade (registrar, editar, excluir).
+
+    Só casa frases inteiras da gramática acima, com um único valor; qualquer
+    outra coisa devolve None e segue para o modelo.
+    """
+
+    def __init__(self, categorias=None):
+        self.categorias = categorias or DEFAULT_CATEGORIAS
+        self._ordem = list(self.categorias)
+        self._router = IntentRouter(self.categorias)
+
+    @classmethod
+    def from_file(cls, path, base=DEFAULT_CATEGORIAS):
+        """Tabela padrão estendida pelo JSON {categoria: [termos]} em `path` (mesmo formato de intents.json)."""
+        return cls(IntentRouter.from_file(path, base=base).intents)
+
+    def category(self, descricao, padrao="Geral"):
+        encontradas = self._router.route(descricao)
+        for cat in self._ordem:
+            if cat in encontradas:
+                return cat
+        return padrao
+
+    def parse(self, query):
+        texto = _ESPACOS_RE.sub(" ", normalize(query)).strip()
+        if not texto or len(texto) > 120 or "?" in texto:
+            return None
+        m = EXCLUIR_RE.fullmatch(texto)
+        if m:
+            return FastCommand("#DELETE_TRANSACAO#", {"id": int(m["id"])})
+        m = EDITAR_RE.fullmatch(texto)
+        if m:
+            valor = parse_valor(m["valor"], bool(m["mil"]))
+            return FastCommand("#UPDATE_TRANSACAO#", {"id": int(m["id"]), "valor": -valor if m["neg"] else valor},
+                               keep_sign=not m["neg"])
+        for regex, negativo in ((GASTO_RE, True), (GASTO_ANTES_RE, True), (RECEITA_RE, False)):
+            m = regex.fullmatch(texto)
+            if m:
+                return self._registro(m, query, texto, negativo)
+        return None
+
+    def _registro(self, m, query, texto, negativo):
+        desc = m["desc"].strip()
+        palavras = desc.split()
+        if not palavras or len(palavras) > 5 or _AMBIGUAS.intersection(palavras) or any(p.isdigit() for p in palavras):
+            return None
+        valor = parse_valor(m["valor"], bool(m["mil"]))
+        if not valor:
+            return None
+        # A frase inteira entra na busca ("vendi ..." -> Vendas)
+        categoria = self.category(texto, padrao="Geral" if negativo else "Receitas")
+        return FastCommand("#SAVE_TRANSACAO#", {
+            "descricao": self._descricao_original(query, texto, m),
+            "valor": -valor if negativo else valor,
+            "categoria": categoria,
+        })
+
+    def _descricao_original(self, query, texto, m):
+        """Recupera a descrição com os acentos e a caixa que o usuário digitou.
+
+        `normalize` não cria nem remove espaços, então a descrição ocupa as
+        mesmas palavras em `texto` e na pergunta original.
+        """
+        desc = m["desc"].strip()
+        inicio = len(texto[:m.start("desc")].split())
+        palavras = query.split()[inicio:inicio + len(desc.split())]
+        original = " ".join(palavras).rstrip(".!")
+        if normalize(original) != desc:
+            original = desc
+        return original[:1].upper() + original[1:]
+
+
+default_fast_path = FastPathParser()
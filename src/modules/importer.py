@@ -0,0 +1,339 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import pandas as pd
+from modules.fast_path import DEFAULT_CATEGORIAS
+
+# Prioridade por palavra-chave; o que não casar herda a prioridade da categoria
+DEFAULT_PRIORIDADES = {
+    "Supérfluo": [
+        "ifood", "restaurante*", "lanche*", "pizza*", "hamburguer*", "delivery", "cinema", "show*", "bar",
+        "balada", "netflix", "spotify", "streaming", "jogo*", "viagem", "shopping", "presente*"
+    ],
+    "Essencial": [
+        "aluguel", "condominio", "luz", "energia", "agua", "gas", "internet", "iptu", "mercado", "supermercado",
+        "feira", "acougue", "padaria", "farmacia", "remedio*", "medico*", "consulta*", "exame*", "plano de saude",
+        "escola", "faculdade", "mensalidade", "onibus", "metro", "gasolina", "combustivel"
+    ],
+}
+PRIORIDADE_POR_CATEGORIA = {
+    "Moradia": "Essencial", "Saúde": "Essencial", "Educação": "Essencial", "Transporte": "Essencial",
+    "Alimentação": "Essencial", "Lazer": "Supérfluo",
+}
+PRIORIDADE_PADRAO = "Média"
+
+# Nomes de coluna aceitos nos extratos (normalizados: minúsculas, sem acento)
+ALIASES = {
+    "data": ("data", "date", "data lancamento", "data do lancamento", "data movimento", "dt", "dtposted"),
+    "descricao": ("descricao", "historico", "description", "memo", "lancamento", "estabelecimento", "detalhes", "name"),
+    "valor": ("valor", "amount", "value", "valor (r$)", "valor r$", "trnamt", "quantia"),
+    "debito": ("debito", "saida", "saidas", "debit"),
+    "credito": ("credito", "entrada", "entradas", "credit"),
+}
+FORMATOS_DATA = ("%d/%m/%Y", "%Y-%m-%d", "%d/%m/%y", "%d-%m-%Y", "%Y%m%d")
+
+
+def normalize_series(s):
+    """Versão vetorizada de intents.normalize: minúsculas, sem acentos, espaços colapsados."""
+    return (s.fillna("").astype(str).str.normalize("NFKD").str.encode("ascii", "ignore").str.decode("ascii")
+            .str.lower().str.replace(r"\s+", " ", regex=True).str.strip())
+
+
+def normalize_unique(s):
+    """normalize_series aplicada só aos valores distintos (extratos repetem muito os estabelecimentos)."""
+    codigos, distintos = pd.factorize(s.fillna("").astype(str))
+    normalizados = normalize_series(pd.Series(distintos, dtype=object)).to_numpy()
+    return pd.Series(normalizados[codigos], index=s.index)
+
+
+def _termo_regex(termo):
+    # Mesma sintaxe do vocabulário de intenções: "*" no fim casa por prefixo
+    termo = normalize_series(pd.Series([termo])).iat[0]
+    if termo.endswith("*"):
+        return r"\b" + re.escape(termo[:-1]) + r"\w*"
+    return r"\b" + re.escape(termo) + r"\b"
+
+
+class RuleTable:
+    """Regras de categoria e prioridade compiladas numa regex por rótulo.
+
+    A classificação de um lote é uma passada vetorizada (`str.contains`) por
+    rótulo, na ordem da tabela; a primeira regra que casa vence.
+    """
+
+    def __init__(self, categorias=None, prioridades=None):
+        self.categorias = self._compile(categorias or DEFAULT_CATEGORIAS)
+        self.prioridades = self._compile(prioridades or DEFAULT_PRIORIDADES)
+
+    @staticmethod
+    def _compile(tabela):
+        return [(rotulo, re.compile("|".join(_termo_regex(t) for t in termos))) for rotulo, termos in tabela.items()]
+
+    @staticmethod
+    def _first_match(texto, regras, padrao):
+        resultado = pd.Series(padrao, index=texto.index, dtype=object)
+        livre = pd.Series(True, index=texto.index)
+        for rotulo, regex in regras:
+            casou = livre & texto.str.contains(regex)
+            resultado[casou] = rotulo
+            livre &= ~casou
+        return resultado
+
+    def categorize(self, descricoes, valores):
+        # As regras rodam sobre as descrições distintas e o resultado volta por código
+        codigos, distintas = pd.factorize(descricoes.fillna("").astype(str))
+        texto = normalize_series(pd.Series(distintas, dtype=object))
+        por_descricao = self._first_match(texto, self.categorias, None).to_numpy()
+        categorias = pd.Series(por_descricao[codigos], index=descricoes.index)
+        padrao = pd.Series(np.where(valores > 0, "Receitas", "Geral"), index=descricoes.index)
+        categorias = categorias.where(categorias.notna(), padrao)
+        prioridades = pd.Series(self._first_match(texto, self.prioridades, None).to_numpy()[codigos],
+                                index=descricoes.index)
+        herdada = categorias.map(PRIORIDADE_POR_CATEGORIA).fillna(PRIORIDADE_PADRAO)
+        prioridades = prioridades.where(prioridades.notna(), herdada)
+        # Entradas de dinheiro não são gasto essencial nem supérfluo
+        prioridades[valores > 0] = PRIORIDADE_PADRAO
+        return categorias, prioridades
+
+
+def parse_amounts(s):
+    """'R$ 1.234,56' / '-50,00' / '(12,50)' / '99.90' / '1.500' / '10,00-' -> float (vetorizado)."""
+    if pd.api.types.is_numeric_dtype(s):
+        return s.astype("float64")
+    texto = s.fillna("").astype(str).str.strip().str.replace(r"[R$\s]", "", regex=True)
+    negativo = texto.str.startswith(("(", "-")) | texto.str.endswith("-")
+    texto = texto.str.strip("()-+")
+    # Mesma regra de fast_path.parse_valor: com vírgula, o ponto é de milhar; sem vírgula,
+    # só é de milhar em grupos de três dígitos ("1.500", "1.234.567")
+    br = texto.str.contains(",", regex=False) | texto.str.fullmatch(r"\d{1,3}(?:\.\d{3})+")
+    texto = texto.where(~br, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    valores = pd.to_numeric(texto, errors="coerce")
+    return valores.where(~negativo, -valores)
+
+
+def parse_dates(s):
+    """Datas em qualquer dos FORMATOS_DATA; cada formato só preenche o que os anteriores não leram."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    texto = s.fillna("").astype(str).str.strip().str.slice(0, 10)
+    datas = pd.Series(pd.NaT, index=s.index, dtype="datetime64[ns]")
+    for formato in FORMATOS_DATA:
+        faltando = datas.isna()
+        if not faltando.any():
+            break
+        datas[faltando] = pd.to_datetime(texto[faltando], format=formato, errors="coerce")
+    return datas
+
+
+def _map_columns(colunas):
+    normalizadas = {normalize_series(pd.Series([c])).iat[0]: c for c in colunas}
+    mapa = {}
+    for destino, nomes in ALIASES.items():
+        for nome in nomes:
+            if nome in normalizadas:
+                mapa[destino] = normalizadas[nome]
+                break
+    if "data" not in mapa or "descricao" not in mapa or not ("valor" in mapa or "debito" in mapa or "credito" in mapa):
+        raise ValueError(f"Colunas não reconhecidas no extrato: {list(colunas)}")
+    return mapa
+
+
+def normalize_chunk(bruto, mapa):
+    """Lote bruto do extrato -> DataFrame com data, descricao e valor tipados."""
+    if "valor" in mapa:
+        valores = parse_amounts(bruto[mapa["valor"]])
+    else:
+        credito = parse_amounts(bruto[mapa["credito"]]).fillna(0.0).abs() if "credito" in mapa else 0.0
+        debito = parse_amounts(bruto[mapa["debito"]]).fillna(0.0).abs() if "debito" in mapa else 0.0
+        valores = credito - debito
+    return pd.DataFrame({
+        "data": parse_dates(bruto[mapa["data"]]),
+        "descricao": bruto[mapa["descricao"]].fillna("").astype(str).str.strip(),
+        "valor": valores,
+    })
+
+
+def _sniff(path):
+    for encoding in ("utf-8-sig", "latin-1"):
+        try:
+            with open(path, "r", encoding=encoding) as f:
+                cabecalho = f.readline()
+            break
+        except UnicodeDecodeError:
+            continue
+    separador = max((";", ",", "\t"), key=cabecalho.count)
+    return encoding, separador
+
+
+def read_csv_statement(path, chunksize=20000):
+    encoding, separador = _sniff(path)
+    mapa = None
+    for bruto in pd.read_csv(path, sep=separador, dtype=str, encoding=encoding, chunksize=chunksize,
+                             skipinitialspace=True, keep_default_na=False):
+        if mapa is None:
+            mapa = _map_columns(bruto.columns)
+        yield normalize_chunk(bruto, mapa)
+
+
+# SGML (OFX 1.x) não fecha as tags: o bloco termina no próximo <STMTTRN>, no fim da lista ou no fim do trecho lido
+_OFX_TRN_RE = re.compile(r"<STMTTRN>(.*?)(?:</STMTTRN>|(?=<STMTTRN>)|(?=</BANKTRANLIST>)|\Z)", re.S | re.I)
+_OFX_TAG_RE = re.compile(r"<(DTPOSTED|TRNAMT|MEMO|NAME)>([^<\r\n]*)", re.I)
+
+
+def read_ofx_statement(path, chunksize=20000):
+    """Lê transações de OFX/QFX (SGML ou XML) em lotes, sem carregar o arquivo inteiro."""
+    with open(path, "r", encoding="latin-1") as f:
+        resto, linhas = "", []
+        while True:
+            bloco = f.read(1 << 20)
+            resto += bloco
+            # Só os blocos completos: o último pode continuar na próxima leitura
+            fim = max(resto.rfind("<STMTTRN>"), 0) if bloco else len(resto)
+            for m in _OFX_TRN_RE.finditer(resto[:fim]):
+                campos = {k.upper(): v.strip() for k, v in _OFX_TAG_RE.findall(m.group(1))}
+                linhas.append((campos.get("DTPOSTED", "")[:8], campos.get("MEMO") or campos.get("NAME", ""),
+                               campos.get("TRNAMT", "")))
+            resto = resto[fim:]
+            while len(linhas) >= chunksize or (not bloco and linhas):
+                lote, linhas = linhas[:chunksize], linhas[chunksize:]
+                bruto = pd.DataFrame(lote, columns=["dtposted", "memo", "trnamt"])
+                # TRNAMT usa ponto decimal (padrão OFX)
+                bruto["trnamt"] = pd.to_numeric(bruto["trnamt"], errors="coerce")
+                yield normalize_chunk(bruto, {"data": "dtposted", "descricao": "memo", "valor": "trnamt"})
+            if not bloco:
+                break
+
+
+def read_statement(path, chunksize=20000):
+    """Lotes normalizados (data, descricao, valor) de um extrato CSV ou OFX."""
+    if os.path.splitext(path)[1].lower() in (".ofx", ".qfx"):
+        return read_ofx_statement(path, chunksize)
+    return read_csv_statement(path, chunksize)
+
+
+class HashIndex:
+    """Índice de hashes (data, centavos, descrição normalizada, ocorrência) das transações.
+
+    A ocorrência separa lançamentos legítimos iguais no mesmo dia (dois cafés de
+    R$ 5): reimportar o mesmo extrato não duplica nada, e um terceiro café entra.
+    """
+
+    def __init__(self, frame=None):
+        self.hashes = np.empty(0, dtype=np.uint64)
+        self._ocorrencias = {}
+        if frame is not None and len(frame):
+            self.hashes = self.compute(frame, contar=False)
+
+    @staticmethod
+    def base_hashes(df):
+        chave = pd.DataFrame({
+            "dia": df["data"].to_numpy(dtype="datetime64[D]").view("int64"),
+            "centavos": (df["valor"].astype(float) * 100).round().astype("int64"),
+            "descricao": normalize_unique(df["descricao"]),
+        })
+        return pd.util.hash_pandas_object(chave, index=False).to_numpy()
+
+    def compute(self, df, contar=True):
+        base = pd.Series(self.base_hashes(df), index=df.index)
+        ocorrencia = base.groupby(base).cumcount()
+        if contar and self._ocorrencias:
+            ocorrencia = ocorrencia + base.map(self._ocorrencias).fillna(0).astype("int64")
+        if contar:
+            contagem = base.value_counts()
+            for h, n in contagem.items():
+                self._ocorrencias[h] = self._ocorrencias.get(h, 0) + int(n)
+        return pd.util.hash_pandas_object(pd.DataFrame({"h": base.to_numpy(), "n": ocorrencia.to_numpy()}),
+                                          index=False).to_numpy()
+
+    def novos(self, df):
+        """Máscara das linhas de `df` que ainda não estão no índice (e as registra)."""
+        hashes = self.compute(df)
+        mascara = ~np.isin(hashes, self.hashes, assume_unique=False)
+        self.hashes = np.concatenate([self.hashes, hashes[mascara]])
+        return mascara
+
+
+class ImportResult:
+    def __init__(self):
+        self.lidas = 0
+        self.importadas = 0
+        self.duplicadas = 0
+        self.invalidas = 0
+        self.lotes = 0
+        self.total = 0.0
+        self.segundos = 0.0
+
+    def to_dict(self):
+        return {k: round(v, 3) if isinstance(v, float) else v for k, v in vars(self).items()}
+
+
+def import_statement(retriever, path, chunksize=20000, rules=None, dry_run=False):
+    """Importa um extrato para o ledger do retriever, lote a lote.
+
+    Cada lote válido e inédito vira uma única gravação (`add_transactions`:
+    lote + ajuste de saldo numa confirmação). No fim, o journal é compactado
+    uma vez. A memória fica limitada ao lote corrente e ao índice de hashes.
+    """
+    inicio = time.perf_counter()
+    rules = rules or RuleTable()
+    resultado = ImportResult()
+    indice = HashIndex(retriever.store.frame())
+    for lote in read_statement(path, chunksize):
+        resultado.lidas += len(lote)
+        validas = lote["data"].notna() & lote["valor"].notna() & (lote["valor"] != 0)
+        resultado.invalidas += int((~validas).sum())
+        lote = lote[validas]
+        if lote.empty:
+            continue
+        novos = indice.novos(lote)
+        resultado.duplicadas += int((~novos).sum())
+        lote = lote[novos].copy()
+        if lote.empty:
+            continue
+        lote["categoria"], lote["prioridade"] = rules.categorize(lote["descricao"], lote["valor"].to_numpy())
+        if not dry_run:
+            retriever.add_transactions(lote)
+        resultado.importadas += len(lote)
+        resultado.total += float(lote["valor"].sum())
+        resultado.lotes += 1
+    if resultado.lotes and not dry_run:
+        retriever.store.compact()
+        retriever.flush()
+    resultado.segundos = time.perf_counter() - inicio
+    return resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m modules.importer", description="Importa extratos CSV/OFX para o ledger.")
+    parser.add_argument("arquivos", nargs="+", help="extratos .csv / .ofx / .qfx")
+    parser.add_argument("--data", help="pasta de dados (padrão: data/ na raiz do projeto)")
+    parser.add_argument("--chunksize", type=int, default=20000, help="linhas por lote")
+    parser.add_argument("--dry-run", action="store_true", help="só classifica e conta, sem gravar")
+    parser.add_argument("--json", action="store_true", help="saída em JSON")
+    args = parser.parse_args(argv)
+
+    from modules.retriever import FinancialRetriever
+    retriever = FinancialRetriever(data_path=os.path.abspath(args.data) if args.data else None)
+    codigo = 0
+    for arquivo in args.arquivos:
+        try:
+            resultado = import_statement(retriever, arquivo, args.chunksize, dry_run=args.dry_run)
+        except (OSError, ValueError) as e:
+            print(f"Erro ao importar {arquivo}: {e}", file=sys.stderr)
+            codigo = 1
+            continue
+        if args.json:
+            print(json.dumps({"arquivo": arquivo, **resultado.to_dict()}, ensure_ascii=False))
+        else:
+            print(f"{arquivo}: {resultado.importadas} importadas, {resultado.duplicadas} duplicadas, "
+                  f"{resultado.invalidas} inválidas em {resultado.segundos:.2f}s (total R$ {resultado.total:.2f})")
+    retriever.backend.close()
+    return codigo
+
+
+if __name__ == "__main__":
+    sys.exit(main())
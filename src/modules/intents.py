@@ -0,0 +1,123 @@
+import os
+import re
+import json
+import unicodedata
+
+# Vocabulário padrão (sem acentos, minúsculo). Um "*" no fim do termo casa por prefixo
+# ("gast*" -> gasto, gastos, gastei). Termos com espaço são frases de várias palavras.
+DEFAULT_INTENTS = {
+    "investimentos": [
+        "investir", "invisto", "investimento*", "rendimento*", "render", "rende", "aplicar", "aplicacao",
+        "onde colocar", "recomendacao", "recomenda*", "cdb", "tesouro", "lci", "lca", "poupanca",
+        "renda fixa", "renda variavel", "fundo*", "acoes", "cdi", "selic"
+    ],
+    "transacoes": [
+        "editar", "edita", "mudar", "alterar", "corrigir", "gast*", "compr*", "ganhei", "recebi",
+        "transac*", "remover", "deletar", "apagar", "excluir", "extrato", "lancamento*"
+    ],
+    "metas": [
+        "meta*", "objetivo*", "juntar", "economizar", "guardar", "poupar", "sonho", "consigo"
+    ],
+    "categorias": [
+        "categoria*", "alimentacao", "transporte", "lazer", "moradia", "saude", "educacao",
+        "mercado", "restaurante*", "essencia*", "superfluo*"
+    ],
+    "periodo": [
+        "hoje", "ontem", "semana*", "mes", "meses", "mensal", "ano", "anual", "trimestre", "semestre",
+        "janeiro", "fevereiro", "marco", "abril", "maio", "junho", "julho", "agosto", "setembro",
+        "outubro", "novembro", "dezembro", "ultimo mes", "este mes", "mes passado"
+    ]
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_FIM = "$"
+
+
+def normalize(text):
+    """Minúsculas e sem acentos ("Alimentação" -> "alimentacao")."""
+    text = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in text if not unicodedata.combining(c))
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+class IntentRouter:
+    """Roteia uma pergunta para intenções usando um trie de tokens pré-compilado.
+
+    O custo do roteamento cresce com o tamanho da pergunta, não com o tamanho
+    do vocabulário: cada token é buscado no trie por hash exato e pelos poucos
+    comprimentos de prefixo registrados naquele nó.
+    """
+
+    def __init__(self, intents=None):
+        self._root = {}
+        self._prefixos = {}  # id(nó) -> {prefixo: nó filho}
+        self._tamanhos = {}  # id(nó) -> comprimentos de prefixo existentes
+        self.intents = {}
+        for intent, termos in (intents or DEFAULT_INTENTS).items():
+            self.add_intent(intent, termos)
+
+    @classmethod
+    def from_file(cls, path, base=DEFAULT_INTENTS):
+        """Vocabulário padrão estendido pelo JSON {intenção: [termos]} em `path`."""
+        intents = {k: list(v) for k, v in base.items()}
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for intent, termos in json.load(f).items():
+                        intents.setdefault(intent, []).extend(termos)
+            except Exception as e:
+                print(f"Erro ao ler intenções: {e}")
+        return cls(intents)
+
+    def add_intent(self, intent, termos):
+        self.intents.setdefault(intent, [])
+        for termo in termos:
+            self.intents[intent].append(termo)
+            self._insert(termo, intent)
+
+    def _insert(self, termo, intent):
+        node = self._root
+        partes = normalize(termo).split()
+        for i, parte in enumerate(partes):
+            ultimo = i == len(partes) - 1
+            if ultimo and parte.endswith("*"):
+                prefixo = parte[:-1]
+                filhos = self._prefixos.setdefault(id(node), {})
+                self._tamanhos.setdefault(id(node), set()).add(len(prefixo))
+                node = filhos.setdefault(prefixo, {})
+            else:
+                node = node.setdefault(parte, {})
+        node.setdefault(_FIM, set()).add(intent)
+
+    def _children(self, node, token):
+        filho = node.get(token)
+        if filho is not None:
+            yield filho
+        prefixos = self._prefixos.get(id(node))
+        if prefixos:
+            for n in self._tamanhos[id(node)]:
+                if n <= len(token):
+                    filho = prefixos.get(token[:n])
+                    if filho is not None:
+                        yield filho
+
+    def route(self, query):
+        """Conjunto de intenções presentes na pergunta."""
+        tokens = tokenize(query)
+        encontrados = set()
+        for inicio in range(len(tokens)):
+            nivel = [self._root]
+            for token in tokens[inicio:]:
+                nivel = [filho for node in nivel for filho in self._children(node, token)]
+                if not nivel:
+                    break
+                for node in nivel:
+                    encontrados.update(node.get(_FIM, ()))
+        return encontrados
+
+
+# Roteador compartilhado com o vocabulário padrão
+default_router = IntentRouter()
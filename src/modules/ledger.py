@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+from modules.intents import normalize
+
+
+class Ledger:
+    """Visão indexada do ledger para consultas por período e categoria.
+
+    As transações ficam ordenadas por data (DatetimeIndex) e cada categoria
+    guarda as posições das suas linhas, já em ordem de data. Assim
+    `between` e `by_category` são fatias O(log n + k) via busca binária.
+    """
+
+    def __init__(self, frame):
+        df = frame.rename_axis('id').reset_index()
+        # Ordenação estável: datas inválidas (NaT) ficam no fim
+        df = df.sort_values('data', kind='mergesort', na_position='last')
+        self.frame = df.set_index('data')
+        datas = self.frame.index.values
+        # Só as datas válidas entram na busca binária (os NaT estão no fim)
+        self._datas = datas[:len(datas) - int(np.isnat(datas).sum())]
+        self._por_categoria = {str(cat): pos for cat, pos in self.frame.groupby('categoria', observed=True).indices.items()}
+        self._nomes = {normalize(cat): cat for cat in self._por_categoria}
+
+    def __len__(self):
+        return len(self.frame)
+
+    @property
+    def categories(self):
+        return list(self._por_categoria)
+
+    def _bounds(self, start=None, end=None):
+        lo = 0 if start is None else int(np.searchsorted(self._datas, np.datetime64(pd.Timestamp(start)), 'left'))
+        hi = len(self._datas) if end is None else int(np.searchsorted(self._datas, np.datetime64(pd.Timestamp(end)), 'right'))
+        return lo, hi
+
+    def between(self, start=None, end=None):
+        """Transações com data entre `start` e `end` (inclusive)."""
+        lo, hi = self._bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def resolve_category(self, categoria):
+        """Nome da categoria como está no ledger, ignorando acentos e caixa."""
+        return self._nomes.get(normalize(str(categoria)))
+
+    def by_category(self, categoria, start=None, end=None):
+        nome = self.resolve_category(categoria)
+        if nome is None:
+            return self.frame.iloc[0:0]
+        pos = self._por_categoria[nome]
+        lo, hi = self._bounds(start, end)
+        fatia = pos[np.searchsorted(pos, lo, 'left'):np.searchsorted(pos, hi, 'left')]
+        return self.frame.iloc[fatia]
+
+    def month(self, year, month):
+        inicio = pd.Timestamp(year=year, month=month, day=1)
+        return self.between(inicio, inicio + pd.offsets.MonthEnd(0))
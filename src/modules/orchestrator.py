@@ -1,16 +1,49 @@
-import json
+import time
+import asyncio
 from modules.retriever import FinancialRetriever
-from modules.providers import OllamaProvider, OpenAIProvider, GeminiProvider
+from modules.commands import CommandStreamParser
+from modules.response_cache import response_cache
+from modules.providers import ProviderError
+from modules.provider_registry import provider_registry
+from modules.fast_path import default_fast_path
+from modules.context_builder import _brl, estimate_tokens
+from modules.telemetry import telemetry
+from modules.prompting import ConversationMemory
 
 
 class FinAssistOrchestrator:
-    def __init__(self, mode="local", data=None, api_key=None):
+    def __init__(self, mode="local", data=None, api_key=None, cache=response_cache, tenant=None,
+                 api_keys=None, local_only=False, fast_path=default_fast_path,
+                 registry=provider_registry, memory=None):
         self.mode = mode
         self.api_key = api_key
+        # Chaves de todos os provedores (modo "auto") e flag de privacidade (somente modelo local)
+        self.api_keys = api_keys or {}
+        self.local_only = local_only
+        # Pedidos simples ("Gastei 50 no almoço") são executados sem chamar o modelo
+        self.fast_path = fast_path
         self.data = data
+        self.cache = cache
+        self.registry = registry
         self.provider = self._get_provider()
-        self.retriever = FinancialRetriever(data=self.data)
-        # PROMPT BASE
+        # Com tenant, as sessões do mesmo usuário dividem o retriever e o lock de escrita
+        self.tenant = tenant
+        self._retriever = None if tenant else FinancialRetriever(data=self.data)
+        self.lock = tenant.lock if tenant else asyncio.Lock()
+        # Histórico da conversa (por sessão, limitado por tokens) para perguntas de continuação
+        self.memory = memory if memory is not None else ConversationMemory()
+        # Comandos monitorados na resposta do modelo
+        self.commands = {
+            "#SAVE_TRANSACAO#": self._save_transaction_action,
+            "#SAVE_META#": self._save_goal_action,
+            "#UPDATE_TRANSACAO#": self._update_transaction_action,
+            "#UPDATE_META#": self._update_goal_action,
+            "#DELETE_TRANSACAO#": self._delete_transaction_action,
+            "#DELETE_META#": self._delete_goal_action,
+            "#SAVE#": self._save_transaction_action
+        }
+        # PROMPT BASE: prefixo fixo de todo prompt (não interpolar nada aqui, senão o
+        # cache de prefixo do modelo deixa de ser reaproveitado; ver modules.prompting)
         self.system_prompt_base = """
         Você é o FinAssist Pro, um mentor financeiro inteligente.
 
@@ -18,7 +51,7 @@ class FinAssistOrchestrator:
         1. Você é um sistema híbrido: Metade Consultor, Metade Banco de Dados.
         2. Se o usuário informar um valor numérico associado a uma ação (compra, venda, recebimento, gasto), você É OBRIGADO a registrar isso
         3. BASE DE VERDADE: Use exclusivamente os dados fornecidos no contexto (Transações, Produtos, Metas e Perfil) para responder.
-        4. PRECISÃO MATEMÁTICA: Ao realizar cálculos, descreva a fórmula utilizada. Se o cálculo for complexo, sugira que é uma simulação educacional.
+        4. PRECISÃO MATEMÁTICA: Para metas e simulações, use os números do bloco PROJEÇÃO DAS METAS (já calculados pelo sistema) e explique o que significam; não refaça as contas. Lembre que são simulações educacionais.
         5. TOM DE VOZ: Seja consultivo, encorajador e profissional. Evite termos técnicos sem explicá-los brevemente.
         6. SEGURANÇA: Nunca solicite ou aceite senhas e dados sensíveis. Reforce que você não substitui um consultor humano certificado.
 
@@ -43,68 +76,145 @@ class FinAssistOrchestrator:
         - Se o usuário disser: "Gastei X", "Recebi Y", "Comprei Z", "Vendi W".
         - AÇÃO: Gere a tag #SAVE_TRANSACAO#... silenciosamente no meio da sua resposta.
         - ERRO COMUM: Não diga apenas "Entendido, anotei". Você deve GERAR O COMANDO JSON.
-
-        CONTEXTO DO USUÁRIO:
         """
 
+    @property
+    def retriever(self):
+        return self.tenant.retriever if self.tenant else self._retriever
+
     def _get_provider(self):
-        if self.mode == "local":
-            return OllamaProvider()
-        elif self.mode == "gemini":
-            return GeminiProvider(api_key=self.api_key)
-        elif self.mode == "openai":
-            return OpenAIProvider(api_key=self.api_key)
-        return OllamaProvider()
+        # Provedores vêm do registro do processo: trocar de modo não recria clientes
+        return self.registry.for_settings(self.mode, self.api_key, self.api_keys, self.local_only)
+
+    def configure(self, mode=None, api_key=None, api_keys=None, local_only=None):
+        """Aplica novas configurações à sessão sem recriar o orquestrador."""
+        if mode is not None:
+            self.mode = mode
+        if api_key is not None:
+            self.api_key = api_key
+        if api_keys is not None:
+            self.api_keys = api_keys
+        if local_only is not None:
+            self.local_only = local_only
+        self.provider = self._get_provider()
+        return self
 
     async def run(self, user_query: str):
-        context = self.retriever.get_relevant_context(user_query)
-        full_system_prompt = f"{self.system_prompt_base}\n\n{context}"
-        # Gera a resposta com a IA
-        response = await self.provider.generate_response(full_system_prompt, user_query)
-        # Lista de comandos monitorados
-        commands = {
-            "#SAVE_TRANSACAO#": self._save_transaction_action,
-            "#SAVE_META#": self._save_goal_action,
-            "#UPDATE_TRANSACAO#": self._update_transaction_action,
-            "#UPDATE_META#": self._update_goal_action,
-            "#DELETE_TRANSACAO#": self._delete_transaction_action,
-            "#DELETE_META#": self._delete_goal_action,
-            "#SAVE#": self._save_transaction_action
-        }
+        parts = []
+        async for chunk in self.run_stream(user_query):
+            parts.append(chunk)
+        return "".join(parts).strip()
 
-        # Verifica se alguma tag está presente na resposta
-        for tag, func in commands.items():
-            if tag in response:
-                print(f"DEBUG: Comando detectado: {tag}")
-                return self._handle_action(response, tag, func)
+    async def run_stream(self, user_query: str):
+        """Gera a resposta em pedaços, executando os comandos assim que chegam."""
+        with telemetry.span("turn", provider=self.provider.provider_id) as turno:
+            async for chunk in self._run_turn(user_query, turno):
+                yield chunk
 
-        return response
+    async def _run_turn(self, user_query, turno):
+        comando = self.fast_path.parse(user_query) if self.fast_path else None
+        if comando is not None:
+            turno.set(path="fast")
+            async with self.lock:
+                resposta = await self.retriever.pool.run(self._run_fast_command, comando)
+            self.memory.add(user_query, resposta)
+            yield resposta
+            return
 
-    def _handle_action(self, response, tag, action_func):
-        """Smart Parser Blindado."""
-        try:
-            parts = response.split(tag)
-            # Procura por um JSON válido entre as tags
-            for i in range(1, len(parts)):
-                candidate = parts[i].strip()
-                if len(candidate) < 2:
-                    continue
-                candidate_clean = self._clean_json_text(candidate)
-                try:
-                    data_dict = json.loads(candidate_clean)
-                    msg_sistema = action_func(data_dict)
-                    # Reconstrói a mensagem visual para o usuário
-                    pre = tag.join(parts[:i]).strip()
-                    post = tag.join(parts[i+1:]).strip()
-                    return f"{pre}\n\n_{msg_sistema}_\n\n{post}".strip()
-                except json.JSONDecodeError:
-                    continue
-            return response
-        except Exception as e:
-            return f"{response}\n\n❌ Erro técnico: {str(e)}"
-
-    def _clean_json_text(self, text):
-        return text.replace("```json", "").replace("```", "").replace("'", '"').strip()
+        with telemetry.span("context") as etapa:
+            # Continuações ("e se eu mudar para 200?") buscam o contexto junto com a pergunta anterior
+            consulta = self.memory.resolve(user_query)
+            async with self.lock:
+                context = await self.retriever.aget_relevant_context(consulta)
+            etapa.set(context_chars=len(context), context_tokens=estimate_tokens(context))
+        with telemetry.span("prompt") as etapa:
+            prompt = self.memory.prompt(self.system_prompt_base, context)
+            etapa.set(prompt_chars=len(prompt) + len(user_query),
+                      prompt_tokens=estimate_tokens(prompt) + estimate_tokens(user_query),
+                      history_tokens=self.memory.tokens)
+        cache_key = (self.cache.key(self.provider.provider_id, context, user_query, prompt.history_text)
+                     if self.cache is not None else None)
+        cached = self.cache.get(cache_key) if cache_key else None
+        if cached is not None:
+            turno.set(path="cache")
+            self.memory.add(user_query, cached)
+            yield cached
+            return
+
+        turno.set(path="llm")
+        parser = CommandStreamParser()
+        raw = []
+        saida = []
+        parse_s = 0.0
+        with telemetry.span("provider", provider=self.provider.provider_id) as etapa:
+            try:
+                async for token in self.provider.stream_response(prompt, user_query):
+                    raw.append(token)
+                    inicio = time.perf_counter()
+                    eventos = parser.feed(token)
+                    parse_s += time.perf_counter() - inicio
+                    for event in eventos:
+                        saida.append(await self._dispatch(event))
+                        yield saida[-1]
+            except ProviderError as e:
+                print(f"Erro do provedor: {e.to_dict()}")
+                turno.set(path="error")
+                etapa.set(error_kind=e.kind)
+                yield f"\n\n{e.user_message}" if raw else e.user_message
+                return
+            finally:
+                etapa.set(chunks=len(raw), response_chars=sum(map(len, raw)))
+                telemetry.record("parse", parse_s)
+        for event in parser.close():
+            saida.append(await self._dispatch(event))
+            yield saida[-1]
+        # O histórico guarda o que o usuário viu (comandos já trocados pelo resultado)
+        self.memory.add(user_query, "".join(saida))
+        if cache_key:
+            # Respostas com comandos nunca entram no cache (ResponseCache.put recusa)
+            self.cache.put(cache_key, "".join(raw))
+
+    async def _dispatch(self, event):
+        if isinstance(event, str):
+            return event
+        # Gravações do mesmo usuário são serializadas entre sessões
+        async with self.lock:
+            # As ações gravam em disco: rodam no pool de threads do retriever
+            return await self.retriever.pool.run(self._handle_event, event)
+
+    def _handle_event(self, event):
+        if isinstance(event, str):
+            return event
+        if event.error:
+            return f"\n\n_❌ Comando {event.tag} ignorado: JSON inválido._\n\n"
+        with telemetry.span("action", action=event.tag.strip("#")):
+            try:
+                msg_sistema = self.commands[event.tag](dict(event.data))
+            except Exception as e:
+                msg_sistema = f"❌ Erro técnico: {str(e)}"
+        return f"\n\n_{msg_sistema}_\n\n"
+
+    def _run_fast_command(self, comando):
+        data = dict(comando.data)
+        with telemetry.span("action", action=comando.tag.strip("#"), path="fast"):
+            try:
+                if comando.keep_sign:
+                    data["valor"] = self._keep_sign(data["id"], data["valor"])
+                msg_sistema = self.commands[comando.tag](data)
+            except Exception as e:
+                msg_sistema = f"❌ Erro técnico: {str(e)}"
+        if comando.tag == "#SAVE_TRANSACAO#" and msg_sistema.startswith("✅"):
+            d = comando.data
+            msg_sistema = (f"✅ Registrado: **{d['descricao']}** ({d['categoria']}) {_brl(d['valor'])}. "
+                           f"Saldo atual: {_brl(self.retriever.balance.saldo)}.")
+        return msg_sistema
+
+    def _keep_sign(self, idx, valor):
+        """"Mude a transação 4 para 30": um gasto continua gasto (-30), uma receita continua receita."""
+        store = self.retriever.store
+        if idx in store and float(store.get(idx)["valor"]) < 0:
+            return -abs(valor)
+        return abs(valor)
 
     def _safe_float(self, value):
         if isinstance(value, (float, int)):
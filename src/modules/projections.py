@@ -0,0 +1,278 @@
+import re
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from modules.intents import normalize
+from modules.fast_path import parse_valor
+
+# Taxas de referência (ao ano) usadas para converter "110% do CDI", "IPCA + 6%" etc.
+TAXAS_REFERENCIA = {"cdi": 0.1065, "selic": 0.1075, "ipca": 0.045, "poupanca": 0.0617}
+# Volatilidade anual assumida por nível de risco do catálogo (cenários de Monte Carlo)
+VOLATILIDADE = {"baixo": 0.01, "medio": 0.06, "alto": 0.20}
+# Níveis de risco aceitos por perfil de investidor
+RISCOS_POR_PERFIL = {"conservador": ("baixo",), "moderado": ("baixo", "medio"), "arrojado": ("baixo", "medio", "alto")}
+MESES = ("janeiro", "fevereiro", "marco", "abril", "maio", "junho", "julho",
+         "agosto", "setembro", "outubro", "novembro", "dezembro")
+
+_NUM = r"(\d+(?:[.,]\d+)?)"
+_PCT_REF_RE = re.compile(_NUM + r"\s*%\s*(?:do\s+|da\s+)?(cdi|selic)")
+_REF_MAIS_RE = re.compile(r"(ipca|inflacao|cdi|selic)\s*\+\s*" + _NUM + r"\s*%?")
+_PCT_MES_RE = re.compile(_NUM + r"\s*%\s*(?:a\.?\s?m\.?|ao mes)")
+_PCT_RE = re.compile(_NUM + r"\s*%")
+
+# Meta hipotética na pergunta: "consigo juntar 50 mil até 2028?", "... 20.000 em 3 anos", "1,5 milhão"
+_PRAZO_ATE_RE = re.compile(r"\bate\s+(?:(?P<mes>" + "|".join(MESES) + r"|\d{1,2})\s*(?:de|/)\s*)?(?P<ano>20\d{2})\b")
+_PRAZO_EM_RE = re.compile(r"\bem\s+(?P<n>\d{1,3})\s+(?P<unidade>anos?|mes|meses)\b")
+_VALOR_META_RE = re.compile(r"(?:r\$\s*)?(?P<valor>\d{1,3}(?:\.\d{3})+(?:,\d{1,2})?|\d+(?:[,.]\d{1,2})?)(?:(?P<milhao>\s*milh(?:ao|oes)\b)|(?P<mil>\s*mil\b))?")
+
+
+def _num(texto):
+    return float(texto.replace(",", "."))
+
+
+def parse_rentabilidade(texto, taxas=TAXAS_REFERENCIA):
+    """'110% do CDI' / 'IPCA + 6%' / '12,5% a.a.' / '0,9% a.m.' / 'Poupança' -> taxa anual, ou None."""
+    if texto is None:
+        return None
+    if isinstance(texto, (int, float)):
+        return float(texto) / 100 if texto > 1 else float(texto)
+    t = normalize(str(texto))
+    m = _PCT_REF_RE.search(t)
+    if m:
+        return _num(m.group(1)) / 100 * taxas[m.group(2)]
+    m = _REF_MAIS_RE.search(t)
+    if m:
+        ref = taxas["ipca" if m.group(1) == "inflacao" else m.group(1)]
+        extra = _num(m.group(2)) / 100
+        # Índice + taxa real compõem; CDI + spread soma
+        return (1 + ref) * (1 + extra) - 1 if m.group(1) in ("ipca", "inflacao") else ref + extra
+    m = _PCT_MES_RE.search(t)
+    if m:
+        return (1 + _num(m.group(1)) / 100) ** 12 - 1
+    m = _PCT_RE.search(t)
+    if m:
+        return _num(m.group(1)) / 100
+    if "poupanca" in t:
+        return taxas["poupanca"]
+    if "cdi" in t or "selic" in t:
+        return taxas["cdi" if "cdi" in t else "selic"]
+    return None
+
+
+def months_until(data_limite, hoje):
+    """Meses inteiros de hoje até o prazo 'dd/mm/aaaa' (ou 'mm/aaaa'); NaN se indefinido."""
+    prazo = pd.to_datetime(str(data_limite or ""), format="%d/%m/%Y", errors="coerce")
+    if pd.isna(prazo):
+        prazo = pd.to_datetime(str(data_limite or ""), format="%m/%Y", errors="coerce")
+    if pd.isna(prazo):
+        return np.nan
+    return max((prazo.year - hoje.year) * 12 + prazo.month - hoje.month, 0)
+
+
+def goal_from_query(query, hoje=None):
+    """Meta hipotética citada na pergunta ({"descricao", "valor_alvo", "data_limite"}), ou None."""
+    hoje = hoje or pd.Timestamp.now()
+    texto = normalize(query)
+    m = _PRAZO_ATE_RE.search(texto)
+    if m:
+        mes = m["mes"]
+        mes = (MESES.index(mes) + 1 if mes in MESES else int(mes)) if mes else 12
+        if not 1 <= mes <= 12:
+            return None
+        limite = f"01/{mes:02d}/{m['ano']}"
+    else:
+        m = _PRAZO_EM_RE.search(texto)
+        if not m:
+            return None
+        meses = int(m["n"]) * (12 if m["unidade"].startswith("ano") else 1)
+        limite = (hoje + pd.DateOffset(months=meses)).strftime("%d/%m/%Y")
+    # O valor é procurado fora do trecho do prazo (para não confundir com o ano)
+    resto = texto[:m.start()] + " " + texto[m.end():]
+    valores = [parse_valor(v["valor"], bool(v["mil"])) * (1e6 if v["milhao"] else 1)
+               for v in _VALOR_META_RE.finditer(resto)]
+    valores = [v for v in valores if v >= 100]
+    if not valores:
+        return None
+    return {"descricao": "Simulação da pergunta", "valor_alvo": max(valores), "valor_guardado": 0.0,
+            "data_limite": limite}
+
+
+class Projection:
+    """Resultado numérico para G metas x P produtos (o produto 0 é 'sem investir')."""
+
+    def __init__(self, metas, produtos, meses, falta, necessario, no_prazo, chance, meses_para_atingir,
+                 aporte, aporte_desvio, historico, cenarios):
+        self.metas = metas
+        self.produtos = produtos
+        self.meses = meses
+        self.falta = falta
+        self.necessario = necessario
+        self.no_prazo = no_prazo
+        self.chance = chance
+        self.meses_para_atingir = meses_para_atingir
+        self.aporte = aporte
+        self.aporte_desvio = aporte_desvio
+        self.historico = historico
+        self.cenarios = cenarios
+
+    def best(self, g):
+        """Índice do melhor produto para a meta g: maior chance, depois menor aporte necessário
+        (sem prazo: o que chega ao alvo em menos meses)."""
+        if np.isnan(self.meses[g]):
+            return int(np.argmin(self.meses_para_atingir[g]))
+        chance = np.nan_to_num(self.chance[g], nan=-1.0)
+        necessario = np.nan_to_num(self.necessario[g], nan=np.inf)
+        return int(np.lexsort((necessario, -chance))[0])
+
+
+class GoalProjector:
+    """Projeções de metas calculadas localmente (NumPy), para o modelo só narrar.
+
+    Para cada meta e produto do catálogo compatível com o perfil:
+    - aporte mensal necessário para chegar ao alvo no prazo (juros compostos);
+    - valor projetado no prazo e meses até o alvo com o excedente mensal histórico;
+    - chance de chegar no prazo em `cenarios` simulações (retorno e excedente aleatórios).
+
+    Os caminhos simulados não dependem da meta (W = guardado * crescimento +
+    aportes acumulados), então todas as metas saem do mesmo lote. Resultados
+    ficam memorizados até metas, ledger, catálogo ou perfil mudarem.
+    """
+
+    def __init__(self, cenarios=500, max_meses=360, meses_historico=12, max_produtos=8, seed=7,
+                 taxas=TAXAS_REFERENCIA, max_cache=32):
+        self.cenarios = cenarios
+        self.max_meses = max_meses
+        self.meses_historico = meses_historico
+        self.max_produtos = max_produtos
+        self.seed = seed
+        self.taxas = taxas
+        self.max_cache = max_cache
+        self._cache = OrderedDict()
+        self._fluxo_df = None
+        self._fluxo = (0.0, 0.0, 0)
+        self._catalogo = None
+
+    # --- ENTRADAS ---
+
+    def cash_flow(self, df):
+        """(média, desvio, meses) do líquido mensal nos últimos meses completos do ledger."""
+        if df is None or df.empty:
+            return 0.0, 0.0, 0
+        if df is not self._fluxo_df:
+            datas = df['data']
+            validos = datas.notna()
+            mensal = pd.to_numeric(df['valor'], errors='coerce').fillna(0.0)[validos].groupby(
+                datas[validos].dt.to_period('M')).sum().sort_index()
+            # O mês corrente ainda está incompleto
+            atual = pd.Timestamp.now().to_period('M')
+            mensal = mensal[mensal.index < atual].tail(self.meses_historico)
+            if len(mensal):
+                self._fluxo = (float(mensal.mean()), float(mensal.std(ddof=0)), len(mensal))
+            else:
+                self._fluxo = (0.0, 0.0, 0)
+            self._fluxo_df = df
+        return self._fluxo
+
+    def products(self, produtos, perfil=None):
+        """[(nome, taxa anual, volatilidade anual)] compatíveis com o perfil, melhores taxas primeiro."""
+        nome_perfil = normalize(str((perfil or {}).get("perfil", "")))
+        # O catálogo é imutável (modules.catalog): basta comparar a instância
+        if self._catalogo is not None and self._catalogo[0] is produtos and self._catalogo[1] == nome_perfil:
+            return self._catalogo[2]
+        riscos = RISCOS_POR_PERFIL.get(nome_perfil, tuple(VOLATILIDADE))
+        candidatos = []
+        for p in produtos or ():
+            taxa = parse_rentabilidade(p.get("rentabilidade"), self.taxas)
+            risco = normalize(str(p.get("risco") or "baixo"))
+            if taxa is None or risco not in riscos:
+                continue
+            candidatos.append((p.get("nome"), taxa, VOLATILIDADE.get(risco, VOLATILIDADE["medio"])))
+        candidatos.sort(key=lambda c: -c[1])
+        resultado = [("Sem investir", 0.0, 0.0)] + candidatos[:self.max_produtos]
+        self._catalogo = (produtos, nome_perfil, resultado)
+        return resultado
+
+    # --- CÁLCULO ---
+
+    def project(self, metas, df=None, produtos=None, perfil=None, hoje=None):
+        hoje = (hoje or pd.Timestamp.now()).normalize()
+        aporte, desvio, historico = self.cash_flow(df)
+        catalogo = self.products(produtos, perfil)
+        chave = (tuple((m.get("descricao"), m.get("valor_alvo"), m.get("valor_guardado"), m.get("data_limite"),
+                        m.get("status")) for m in metas),
+                 round(aporte, 2), round(desvio, 2), tuple(catalogo), hoje.strftime("%Y-%m"))
+        resultado = self._cache.get(chave)
+        if resultado is None:
+            resultado = self._cache[chave] = self._compute(metas, catalogo, aporte, desvio, historico, hoje)
+            while len(self._cache) > self.max_cache:
+                self._cache.popitem(last=False)
+        self._cache.move_to_end(chave)
+        return resultado
+
+    def _compute(self, metas, catalogo, aporte, desvio, historico, hoje):
+        alvo = np.array([_float(m.get("valor_alvo")) for m in metas])
+        guardado = np.array([_float(m.get("valor_guardado")) for m in metas])
+        meses = np.array([months_until(m.get("data_limite"), hoje) for m in metas], dtype=float)
+        taxa_anual = np.array([c[1] for c in catalogo])
+        vol_anual = np.array([c[2] for c in catalogo])
+        r = (1 + taxa_anual) ** (1 / 12) - 1                      # (P,)
+        falta = np.maximum(alvo - guardado, 0.0)                  # (G,)
+
+        # Fórmulas fechadas, metas x produtos de uma vez
+        n = meses[:, None]                                        # (G, 1)
+        cresce = (1 + r)[None, :] ** np.nan_to_num(n)             # (G, P)
+        fator_aporte = np.where(r > 0, (cresce - 1) / np.where(r > 0, r, 1), np.nan_to_num(n))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            necessario = np.where(n > 0, (alvo[:, None] - guardado[:, None] * cresce) / fator_aporte,
+                                  np.where(falta[:, None] > 0, np.inf, 0.0))
+            necessario = np.maximum(necessario, 0.0)
+            necessario[np.isnan(meses)] = np.nan
+            no_prazo = guardado[:, None] * cresce + max(aporte, 0.0) * fator_aporte
+            no_prazo[np.isnan(meses)] = np.nan
+            meses_para_atingir = self._months_to_target(alvo, guardado, r, max(aporte, 0.0))
+
+        chance = self._monte_carlo(alvo, guardado, meses, r, vol_anual, aporte, desvio)
+        return Projection(metas, catalogo, meses, falta, necessario, no_prazo, chance, meses_para_atingir,
+                          aporte, desvio, historico, self.cenarios)
+
+    def _months_to_target(self, alvo, guardado, r, aporte):
+        """Meses até o alvo com aporte constante: n = ln((A + FV·r)/(A + PV·r)) / ln(1 + r)."""
+        a, pv, fv = aporte, guardado[:, None], alvo[:, None]
+        rr = r[None, :]
+        com_juros = np.log((a + fv * rr) / (a + pv * rr)) / np.log1p(np.where(rr > 0, rr, 1.0))
+        sem_juros = (fv - pv) / a if a > 0 else np.full_like(fv, np.inf)
+        meses = np.where(rr > 0, com_juros, sem_juros)
+        meses = np.where(pv >= fv, 0.0, meses)
+        return np.ceil(np.where(np.isfinite(meses) & (meses >= 0), meses, np.inf))
+
+    def _monte_carlo(self, alvo, guardado, meses, r, vol_anual, aporte, desvio):
+        """Chance (0-1) de cada meta chegar ao alvo no prazo, para cada produto."""
+        G, P = len(alvo), len(r)
+        chance = np.full((G, P), np.nan)
+        com_prazo = ~np.isnan(meses)
+        if not com_prazo.any() or not self.cenarios:
+            return chance
+        horizonte = int(min(max(meses[com_prazo].max(), 1), self.max_meses))
+        rng = np.random.default_rng(self.seed)
+        sigma = vol_anual / np.sqrt(12)
+        retornos = r[None, :, None] + sigma[None, :, None] * rng.standard_normal((self.cenarios, P, horizonte))
+        crescimento = np.cumprod(1 + np.maximum(retornos, -0.99), axis=2)          # (S, P, M)
+        # Meses com déficit não retiram da meta
+        aportes = np.maximum(aporte + desvio * rng.standard_normal((self.cenarios, 1, horizonte)), 0.0)
+        acumulado = crescimento * np.cumsum(aportes / crescimento, axis=2)        # (S, P, M)
+        # Mês do prazo de cada meta (-1 = prazo vencido ou mês corrente)
+        idx = np.clip(np.nan_to_num(meses).astype(int), 0, horizonte) - 1
+        col = np.maximum(idx, 0)
+        valor = guardado[None, None, :] * crescimento[:, :, col] + acumulado[:, :, col]   # (S, P, G)
+        chance[:] = (valor >= alvo[None, None, :]).mean(axis=0).T
+        vencidas = idx < 0
+        chance[vencidas] = (guardado[vencidas] >= alvo[vencidas]).astype(float)[:, None]
+        chance[~com_prazo] = np.nan
+        return chance
+
+
+def _float(valor):
+    try:
+        return float(valor or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
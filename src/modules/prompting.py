@@ -0,0 +1,139 @@
+import re
+from modules.intents import normalize, tokenize
+from modules.context_builder import estimate_tokens
+
+# Perguntas que só fazem sentido junto com a anterior ("e se eu mudar para 200?")
+_CONTINUACAO_RE = re.compile(r"^(e|mas|entao|agora|tambem|e se|e para|e com|e no|e na|e em)\b")
+_VALORES_RE = re.compile(r"R\$\s?-?[\d.]+(?:,\d+)?")
+_FRASE_RE = re.compile(r"(?<=[.!?])\s")
+_ESPACOS_RE = re.compile(r"\s+")
+
+CABECALHO_RESUMO = "RESUMO DA CONVERSA ANTERIOR:"
+CABECALHO_CONTEXTO = "CONTEXTO DO USUÁRIO:"
+# Evita que pedidos antigos do histórico ("Gastei 50") sejam registrados de novo
+AVISO_HISTORICO = "As mensagens anteriores já foram processadas: gere comandos apenas para a pergunta atual."
+
+
+def _compacto(texto, limite):
+    texto = _ESPACOS_RE.sub(" ", texto).strip()
+    return texto if len(texto) <= limite else texto[:limite - 1].rstrip() + "…"
+
+
+class Prompt(str):
+    """Prompt em camadas, da mais estável para a mais volátil.
+
+    O valor da string é o texto completo (o que provedores de texto único,
+    coalescência e contagens usam); as partes ficam nos atributos para quem
+    envia mensagens separadas. A ordem é o que permite reaproveitar o cache
+    de prefixo dos modelos: instruções fixas (idênticas byte a byte em todos
+    os turnos e sessões) -> resumo + histórico (só cresce no fim) -> contexto
+    e pergunta do turno.
+    """
+
+    def __new__(cls, prefix, context="", history=(), summary=""):
+        partes = [prefix.rstrip()]
+        if summary:
+            partes.append(f"{CABECALHO_RESUMO}\n{summary}")
+        if history:
+            partes.append("\n".join(f"Usuário: {p}\nAssistente: {r}" for p, r in history))
+        if summary or history:
+            partes.append(AVISO_HISTORICO)
+        partes.append(f"{CABECALHO_CONTEXTO}\n{context}")
+        prompt = super().__new__(cls, "\n\n".join(partes))
+        prompt.prefix = prefix
+        prompt.context = context
+        prompt.history = tuple(history)
+        prompt.summary = summary
+        return prompt
+
+    @property
+    def history_text(self):
+        """Resumo + histórico (entra na chave do cache de respostas)."""
+        return "\n".join([self.summary] + [f"{p}\x00{r}" for p, r in self.history]) if self.history or self.summary else ""
+
+    def messages(self, user_query):
+        """Formato de chat (OpenAI / Ollama /api/chat), mesma ordem do texto."""
+        msgs = [{"role": "system", "content": self.prefix.rstrip()}]
+        if self.summary:
+            msgs.append({"role": "system", "content": f"{CABECALHO_RESUMO}\n{self.summary}"})
+        for pergunta, resposta in self.history:
+            msgs.append({"role": "user", "content": pergunta})
+            msgs.append({"role": "assistant", "content": resposta})
+        aviso = f"{AVISO_HISTORICO}\n\n" if self.history or self.summary else ""
+        msgs.append({"role": "user",
+                     "content": f"{aviso}{CABECALHO_CONTEXTO}\n{self.context}\n\nPergunta: {user_query}"})
+        return msgs
+
+
+def as_messages(system_prompt, user_query):
+    """Mensagens de chat para um prompt em camadas ou um texto simples."""
+    if isinstance(system_prompt, Prompt):
+        return system_prompt.messages(user_query)
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_query}]
+
+
+class ConversationMemory:
+    """Histórico da sessão limitado por um orçamento de tokens.
+
+    Os turnos recentes ficam na íntegra (respostas truncadas em
+    `max_reply_chars`); quando o orçamento estoura, os mais antigos viram uma
+    linha no resumo (pergunta + primeira frase e valores da resposta), que
+    também tem orçamento próprio. Tudo local, sem chamar o modelo.
+    """
+
+    def __init__(self, token_budget=800, summary_budget=200, max_reply_chars=700):
+        self.token_budget = token_budget
+        self.summary_budget = summary_budget
+        self.max_reply_chars = max_reply_chars
+        self.turns = []
+        self.summary_lines = []
+
+    @property
+    def summary(self):
+        return "\n".join(self.summary_lines)
+
+    @property
+    def tokens(self):
+        return sum(estimate_tokens(p) + estimate_tokens(r) for p, r in self.turns) + (
+            estimate_tokens(self.summary) if self.summary_lines else 0)
+
+    @property
+    def last_query(self):
+        return self.turns[-1][0] if self.turns else None
+
+    def add(self, user_query, reply):
+        reply = _compacto(reply, self.max_reply_chars)
+        if not reply:
+            return
+        self.turns.append((_compacto(user_query, 300), reply))
+        self._fit()
+
+    def _fit(self):
+        # O turno mais recente sempre fica inteiro: é a ele que a próxima pergunta se refere
+        while len(self.turns) > 1 and self.tokens > self.token_budget:
+            self.summary_lines.append(self._summarize(*self.turns.pop(0)))
+        # Só com o turno recente sobrando, é o resumo que cede para caber no orçamento
+        while self.summary_lines and (estimate_tokens(self.summary) > self.summary_budget
+                                      or self.tokens > self.token_budget):
+            self.summary_lines.pop(0)
+
+    @staticmethod
+    def _summarize(pergunta, resposta):
+        frase = _FRASE_RE.split(resposta, 1)[0]
+        valores = [v for v in _VALORES_RE.findall(resposta) if v not in frase][:3]
+        extra = f" ({', '.join(valores)})" if valores else ""
+        return f"- {_compacto(pergunta, 100)} -> {_compacto(frase, 140)}{extra}"
+
+    def resolve(self, query):
+        """Pergunta usada para montar o contexto: continuações herdam a anterior."""
+        anterior = self.last_query
+        if anterior and (_CONTINUACAO_RE.match(normalize(query).strip()) or len(tokenize(query)) <= 2):
+            return f"{anterior} {query}"
+        return query
+
+    def prompt(self, prefix, context):
+        return Prompt(prefix, context, self.turns, self.summary)
+
+    def clear(self):
+        self.turns.clear()
+        self.summary_lines.clear()
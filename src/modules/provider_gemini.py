@@ -0,0 +1,52 @@
+import google.generativeai as genai
+from google.ai import generativelanguage as glm
+from modules.providers import LLMProvider, ProviderError
+
+
+# MODO NUVEM: GEMINI (Google)
+class GeminiProvider(LLMProvider):
+    """Gemini com a chave da própria instância.
+
+    `genai.configure` vale para o processo inteiro (o último a chamar decide a
+    chave de todos os modelos), o que não serve ao registro de provedores, que
+    guarda uma instância por chave. Por isso cada instância tem seu próprio
+    cliente gRPC, criado com `client_options={"api_key": ...}` e entregue ao
+    GenerativeModel. Limitação: o SDK não expõe esse parâmetro, então o cliente é
+    atribuído em `_async_client`; ao atualizar o google-generativeai, confira
+    se o atributo continua existindo (ver tests/test_provider_gemini.py).
+    """
+
+    def __init__(self, api_key, model_name='gemini-1.5-pro'):
+        self.api_key = api_key
+        self.model_name = model_name
+        self.model = genai.GenerativeModel(model_name) if api_key else None
+
+    def _model(self):
+        # O cliente assíncrono se prende ao event loop: é criado na primeira chamada, já dentro dele
+        if self.model._async_client is None:
+            self.model._async_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self.api_key})
+        return self.model
+
+    # Texto único: o prompt em camadas (modules.prompting) já começa pelo prefixo fixo,
+    # que é o que o cache implícito do Gemini reaproveita
+    async def generate_response(self, system_prompt, user_query):
+        if not self.model:
+            raise ProviderError("config", "Chave API do Gemini não configurada.", self.provider_id)
+        try:
+            full_prompt = f"{system_prompt}\n\nPergunta: {user_query}"
+            response = await self._model().generate_content_async(full_prompt)
+            return response.text
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
+
+    async def stream_response(self, system_prompt, user_query):
+        if not self.model:
+            raise ProviderError("config", "Chave API do Gemini não configurada.", self.provider_id)
+        try:
+            full_prompt = f"{system_prompt}\n\nPergunta: {user_query}"
+            response = await self._model().generate_content_async(full_prompt, stream=True)
+            async for chunk in response:
+                if chunk.text:
+                    yield chunk.text
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
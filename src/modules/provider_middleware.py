@@ -0,0 +1,194 @@
+import time
+import random
+import asyncio
+import hashlib
+import weakref
+from modules.providers import LLMProvider, ProviderError
+from modules.telemetry import telemetry
+
+
+class BackendLimiter:
+    """Limite de requisições simultâneas a um backend, com fila limitada.
+
+    Até `max_concurrency` chamadas rodam ao mesmo tempo; até `max_queue`
+    esperam a vez. Acima disso (ou após `queue_timeout` segundos na fila) a
+    chamada falha na hora com `ProviderError("overloaded")`, em vez de
+    esperar o timeout do modelo.
+    """
+
+    def __init__(self, max_concurrency=8, max_queue=64, queue_timeout=30.0):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.waiting = 0
+        self._semaforos = weakref.WeakKeyDictionary()
+
+    def _semaforo(self):
+        loop = asyncio.get_running_loop()
+        sem = self._semaforos.get(loop)
+        if sem is None:
+            sem = self._semaforos[loop] = asyncio.Semaphore(self.max_concurrency)
+        return sem
+
+    async def acquire(self, provider_id=None):
+        sem = self._semaforo()
+        if self.active + self.waiting >= self.max_concurrency + self.max_queue:
+            raise ProviderError("overloaded", f"fila cheia ({self.waiting} aguardando)", provider_id, transient=True)
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(sem.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            raise ProviderError("overloaded", f"sem vaga após {self.queue_timeout:.0f}s na fila", provider_id, transient=True)
+        finally:
+            self.waiting -= 1
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._semaforo().release()
+
+
+# Um limitador por backend (ex.: uma instância do Ollama), compartilhado pelo processo
+_limiters = {}
+
+
+def get_limiter(provider):
+    limiter = _limiters.get(provider.backend_key)
+    if limiter is None:
+        limiter = _limiters[provider.backend_key] = BackendLimiter(provider.max_concurrency, provider.max_queue)
+    return limiter
+
+
+# Respostas em andamento por prompt, compartilhadas entre todas as sessões
+_inflight = {}
+
+
+class _InFlight:
+    """Resposta em andamento, repassada a todos que pediram o mesmo prompt."""
+
+    def __init__(self):
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self._changed = asyncio.Condition()
+
+    async def push(self, chunk):
+        async with self._changed:
+            self.chunks.append(chunk)
+            self._changed.notify_all()
+
+    async def finish(self, error=None):
+        async with self._changed:
+            self.done = True
+            self.error = error
+            self._changed.notify_all()
+
+    async def follow(self):
+        i = 0
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or len(self.chunks) > i)
+                novos, terminou, erro = self.chunks[i:], self.done, self.error
+            for chunk in novos:
+                yield chunk
+            i += len(novos)
+            if terminou and i >= len(self.chunks):
+                if erro is not None:
+                    raise erro
+                return
+
+
+class ResilientProvider(LLMProvider):
+    """Middleware para qualquer LLMProvider: limite por backend, coalescência e retentativas.
+
+    - Pedidos idênticos em andamento (mesmo provedor, prompt e pergunta) são
+      atendidos por uma única chamada ao modelo.
+    - Falhas transitórias são repetidas com backoff exponencial com jitter,
+      mas só antes do primeiro pedaço da resposta ter sido entregue.
+    - Erros chegam sempre como `ProviderError`.
+    """
+
+    def __init__(self, inner, limiter=None, max_retries=2, base_delay=0.5, max_delay=8.0, coalesce=True):
+        self.inner = inner
+        self.limiter = limiter or get_limiter(inner)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.coalesce = coalesce
+
+    @property
+    def model_name(self):
+        return self.inner.model_name
+
+    @property
+    def provider_id(self):
+        return self.inner.provider_id
+
+    @property
+    def backend_key(self):
+        return self.inner.backend_key
+
+    @property
+    def local(self):
+        return self.inner.local
+
+    def backoff(self, tentativa):
+        # "Full jitter": espera aleatória entre 0 e o teto exponencial
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** tentativa))
+
+    def _key(self, system_prompt, user_query):
+        texto = f"{self.provider_id}\x00{system_prompt}\x00{user_query}"
+        return hashlib.sha256(texto.encode("utf-8")).hexdigest()
+
+    async def generate_response(self, system_prompt, user_query):
+        return "".join([chunk async for chunk in self.stream_response(system_prompt, user_query)])
+
+    async def stream_response(self, system_prompt, user_query):
+        key = self._key(system_prompt, user_query) if self.coalesce else None
+        andamento = _inflight.get(key) if key else None
+        if andamento is not None:
+            async for chunk in andamento.follow():
+                yield chunk
+            return
+
+        andamento = _InFlight()
+        if key:
+            _inflight[key] = andamento
+        try:
+            async for chunk in self._stream_with_retry(system_prompt, user_query, andamento):
+                yield chunk
+            await andamento.finish()
+        except BaseException as e:
+            erro = e if isinstance(e, ProviderError) else ProviderError("request", "resposta interrompida", self.provider_id)
+            await asyncio.shield(andamento.finish(erro))
+            raise
+        finally:
+            if key and _inflight.get(key) is andamento:
+                del _inflight[key]
+
+    async def _stream_with_retry(self, system_prompt, user_query, andamento):
+        tentativa = 0
+        while True:
+            await self.limiter.acquire(self.provider_id)
+            entregou = False
+            inicio = time.perf_counter()
+            try:
+                async for chunk in self.inner.stream_response(system_prompt, user_query):
+                    if not entregou:
+                        # Tempo até o primeiro pedaço, por backend (a fila do limitador não entra)
+                        telemetry.record("provider.first_token", time.perf_counter() - inicio, provider=self.provider_id)
+                    entregou = True
+                    await andamento.push(chunk)
+                    yield chunk
+                return
+            except Exception as e:
+                erro = ProviderError.from_exception(e, self.provider_id)
+                if entregou or not erro.transient or tentativa >= self.max_retries:
+                    raise erro from e
+            finally:
+                self.limiter.release()
+            espera = self.backoff(tentativa)
+            tentativa += 1
+            print(f"Aviso: {erro.kind} em {self.provider_id}; nova tentativa {tentativa} em {espera:.2f}s")
+            await asyncio.sleep(espera)
@@ -0,0 +1,85 @@
+import json
+import httpx
+from modules.providers import LLMProvider, ProviderError
+from modules.prompting import as_messages
+
+
+# CLIENTE HTTP COMPARTILHADO (keep-alive) PARA O OLLAMA
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(300.0, connect=5.0)
+_http_client = None
+
+
+def get_http_client():
+    """Um único AsyncClient com pool de conexões para todo o processo."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    return _http_client
+
+
+async def close_http_client():
+    global _http_client
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+
+
+# MODO LOCAL: OLLAMA (llama3)
+class OllamaProvider(LLMProvider):
+    # Um modelo local atende poucas requisições em paralelo
+    max_concurrency = 2
+    max_queue = 16
+    local = True
+
+    def __init__(self, model="llama3:8b", url="http://localhost:11434/api/chat", keep_alive="30m"):
+        self.model = model
+        self.model_name = model
+        self.url = url
+        # Mantém o modelo (e o cache KV do prefixo fixo do prompt) carregado entre os turnos
+        self.keep_alive = keep_alive
+        self.options = {
+            "temperature": 0.2,
+            "num_predict": 500
+        }
+
+    @property
+    def backend_key(self):
+        return f"ollama:{self.url}"
+
+    def _payload(self, system_prompt, user_query, stream):
+        # /api/chat: o prefixo fixo vai primeiro, então o Ollama reaproveita o cache KV dele
+        return {
+            "model": self.model,
+            "messages": as_messages(system_prompt, user_query),
+            "stream": stream,
+            "keep_alive": self.keep_alive,
+            "options": self.options
+        }
+
+    async def generate_response(self, system_prompt, user_query):
+        client = get_http_client()
+        try:
+            response = await client.post(self.url, json=self._payload(system_prompt, user_query, False))
+            response.raise_for_status()
+            return response.json()["message"]["content"]
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
+
+    async def stream_response(self, system_prompt, user_query):
+        # O Ollama devolve uma linha JSON por token: {"message": {"content": "..."}, "done": false}
+        client = get_http_client()
+        try:
+            async with client.stream("POST", self.url, json=self._payload(system_prompt, user_query, True)) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    texto = (chunk.get("message") or {}).get("content")
+                    if texto:
+                        yield texto
+                    if chunk.get("done"):
+                        break
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
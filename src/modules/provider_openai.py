@@ -0,0 +1,49 @@
+import openai
+from modules.providers import LLMProvider, ProviderError
+from modules.prompting import as_messages
+
+
+# MODO NUVEM: OPENAI (GPT-4o)
+class OpenAIProvider(LLMProvider):
+    def __init__(self, api_key, model_name="gpt-4o"):
+        self.model_name = model_name
+        self.client = openai.AsyncOpenAI(api_key=api_key) if api_key else None
+
+    def _messages(self, system_prompt, user_query):
+        # Prefixo fixo primeiro: o cache automático de prompt da OpenAI reaproveita o início igual
+        return as_messages(system_prompt, user_query)
+
+    async def generate_response(self, system_prompt, user_query):
+        if not self.client:
+            raise ProviderError("config", "Chave OpenAI não encontrada.", self.provider_id)
+
+        try:
+            response = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(system_prompt, user_query),
+                temperature=0.2,
+                max_tokens=500
+            )
+            return response.choices[0].message.content
+
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
+
+    async def stream_response(self, system_prompt, user_query):
+        if not self.client:
+            raise ProviderError("config", "Chave OpenAI não encontrada.", self.provider_id)
+
+        try:
+            stream = await self.client.chat.completions.create(
+                model=self.model_name,
+                messages=self._messages(system_prompt, user_query),
+                temperature=0.2,
+                max_tokens=500,
+                stream=True
+            )
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            raise ProviderError.from_exception(e, self.provider_id) from e
@@ -0,0 +1,93 @@
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from modules.providers import PROVIDERS, provider_class
+from modules.provider_middleware import ResilientProvider
+from modules.routing import RoutingProvider, Backend
+
+
+def key_hash(api_key):
+    """Hash curto da chave de API: identifica a chave no cache sem guardá-la em claro."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16] if api_key else ""
+
+
+class ProviderRegistry:
+    """Provedores compartilhados pelo processo, por (modo, modelo, hash da chave).
+
+    Criar um provedor custa caro (cliente HTTP da OpenAI, cliente gRPC do
+    Gemini); aqui cada combinação é criada uma vez e reaproveitada por todas as
+    sessões e trocas de configuração. Cada instância usa só a sua chave (o
+    Gemini não depende do `genai.configure` global, ver modules.provider_gemini).
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # Reentrante: a rota monta seus backends pelo próprio registro
+        self._lock = threading.RLock()
+        self.created = 0
+
+    def _cached(self, key, factory):
+        with self._lock:
+            provider = self._entries.get(key)
+            if provider is None:
+                provider = self._entries[key] = factory()
+                self.created += 1
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self._entries.move_to_end(key)
+            return provider
+
+    def get(self, mode, api_key=None, model=None, retries=True):
+        """Provedor de um modo ("local", "gemini", "openai") já com o middleware."""
+        if mode not in PROVIDERS or mode == "local":
+            mode, api_key = "local", None
+        key = (mode, model or "", key_hash(api_key), retries)
+        return self._cached(key, lambda: ResilientProvider(self._build(mode, api_key, model),
+                                                           max_retries=2 if retries else 0))
+
+    def _build(self, mode, api_key, model):
+        # O módulo do backend só é importado aqui, na primeira vez que o modo é usado
+        cls = provider_class(mode)
+        if mode == "local":
+            return cls(model=model) if model else cls()
+        return cls(api_key=api_key, model_name=model) if model else cls(api_key=api_key)
+
+    def routing(self, api_keys=None, local_only=False):
+        """Rota automática: modelo local rápido (opcional), local principal, nuvem."""
+        api_keys = {k: v for k, v in (api_keys or {}).items() if v}
+        modelo_rapido = os.getenv("FINASSIST_OLLAMA_FAST_MODEL")
+        key = ("auto", modelo_rapido or "", local_only, tuple(sorted((m, key_hash(k)) for m, k in api_keys.items())))
+        return self._cached(key, lambda: RoutingProvider(self._backends(api_keys, modelo_rapido), local_only=local_only))
+
+    def _backends(self, api_keys, modelo_rapido):
+        # Na rota, a troca de provedor substitui as retentativas
+        backends = []
+        if modelo_rapido:
+            backends.append(Backend(self.get("local", model=modelo_rapido, retries=False), tasks={"rapido"}))
+        backends.append(Backend(self.get("local", retries=False)))
+        for mode in PROVIDERS:
+            if mode != "local" and api_keys.get(mode):
+                backends.append(Backend(self.get(mode, api_keys[mode], retries=False)))
+        return backends
+
+    def for_settings(self, mode, api_key=None, api_keys=None, local_only=False):
+        """Provedor para as configurações da sessão (o que o orquestrador usa)."""
+        if mode == "auto" or local_only:
+            chaves = dict(api_keys or {})
+            if mode in PROVIDERS and mode != "local" and api_key:
+                chaves.setdefault(mode, api_key)
+            return self.routing(chaves, local_only)
+        return self.get(mode, api_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Registro compartilhado por todas as sessões do processo
+provider_registry = ProviderRegistry()
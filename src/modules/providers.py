@@ -1,79 +1,121 @@
-import httpx
-import openai
-import google.generativeai as genai
+import sys
+import asyncio
 from abc import ABC, abstractmethod
 
 
+class ProviderError(Exception):
+    """Falha estruturada de um provedor de LLM.
+
+    `kind` classifica a falha (config, auth, timeout, connection, rate_limit,
+    server, overloaded, invalid_response, request) e `transient` indica se
+    vale a pena tentar de novo.
+    """
+
+    MENSAGENS = {
+        "config": "Provedor não configurado. Verifique a chave de API nas configurações.",
+        "auth": "A chave de API foi recusada pelo provedor. Verifique as configurações.",
+        "timeout": "O modelo demorou demais para responder. Tente novamente em instantes.",
+        "connection": "Não foi possível conectar ao modelo. Verifique se ele está em execução.",
+        "rate_limit": "Limite de requisições do provedor atingido. Tente novamente em instantes.",
+        "server": "O provedor do modelo está instável no momento. Tente novamente em instantes.",
+        "overloaded": "Muitas conversas ao mesmo tempo. Tente novamente em instantes.",
+        "invalid_response": "O modelo devolveu uma resposta inválida.",
+    }
+
+    def __init__(self, kind, message="", provider_id=None, transient=False, status=None):
+        super().__init__(message or kind)
+        self.kind = kind
+        self.message = message
+        self.provider_id = provider_id
+        self.transient = transient
+        self.status = status
+
+    @property
+    def user_message(self):
+        return f"❌ {self.MENSAGENS.get(self.kind, 'Erro ao processar a resposta do modelo.')}"
+
+    def to_dict(self):
+        return {"kind": self.kind, "message": self.message, "provider": self.provider_id,
+                "transient": self.transient, "status": self.status}
+
+    @classmethod
+    def from_exception(cls, exc, provider_id=None):
+        """Converte exceções do httpx / OpenAI / Google numa ProviderError."""
+        if isinstance(exc, ProviderError):
+            return exc
+        nome = type(exc).__name__
+        status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+        if status is None and isinstance(getattr(exc, "code", None), int):
+            status = exc.code
+        # httpx só é importado pelo backend do Ollama; se não foi carregado, a exceção não é dele
+        httpx = sys.modules.get("httpx")
+        if (isinstance(exc, asyncio.TimeoutError) or (httpx and isinstance(exc, httpx.TimeoutException))
+                or "Timeout" in nome or "DeadlineExceeded" in nome):
+            return cls("timeout", str(exc), provider_id, transient=True, status=status)
+        if (httpx and isinstance(exc, httpx.TransportError)) or "Connection" in nome:
+            return cls("connection", str(exc), provider_id, transient=True, status=status)
+        if status == 429 or "RateLimit" in nome or "ResourceExhausted" in nome:
+            return cls("rate_limit", str(exc), provider_id, transient=True, status=status)
+        if status in (401, 403) or "Authentication" in nome or "PermissionDenied" in nome:
+            return cls("auth", str(exc), provider_id, status=status)
+        if status == 408 or (status is not None and status >= 500) or "ServiceUnavailable" in nome:
+            return cls("server", str(exc), provider_id, transient=True, status=status)
+        if isinstance(exc, (ValueError, KeyError)):
+            return cls("invalid_response", str(exc), provider_id, status=status)
+        return cls("request", str(exc), provider_id, status=status)
+
+
 class LLMProvider(ABC):
+    model_name = None
+    # Limites padrão do middleware (ver modules.provider_middleware)
+    max_concurrency = 8
+    max_queue = 64
+    # Provedores locais não enviam os dados do usuário para fora (ver modules.routing)
+    local = False
+
+    @property
+    def provider_id(self):
+        """Identifica provedor + modelo (usado nas chaves de cache)."""
+        return f"{type(self).__name__}:{self.model_name}"
+
+    @property
+    def backend_key(self):
+        """Recurso compartilhado pelas instâncias (o limite de concorrência vale por backend)."""
+        return type(self).__name__
+
     @abstractmethod
     async def generate_response(self, system_prompt: str, user_query: str):
         pass
 
+    async def stream_response(self, system_prompt: str, user_query: str):
+        """Gera a resposta em pedaços. Padrão: um único pedaço com a resposta completa."""
+        yield await self.generate_response(system_prompt, user_query)
+
+
+# BACKENDS POR MODO: cada um é importado só quando um modo o usa pela primeira vez
+# (o Gemini traz gRPC/protobuf, a OpenAI seu próprio cliente HTTP)
+PROVIDERS = {
+    "local": "modules.provider_ollama:OllamaProvider",
+    "gemini": "modules.provider_gemini:GeminiProvider",
+    "openai": "modules.provider_openai:OpenAIProvider"
+}
+
+
+def register_provider(mode, target):
+    """Registra (ou substitui) o backend de um modo: "pacote.modulo:Classe"."""
+    PROVIDERS[mode] = target
+
+
+def provider_class(mode):
+    module_name, class_name = PROVIDERS[mode].split(":")
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
 
-# MODO LOCAL: OLLAMA (llama3)
-class OllamaProvider(LLMProvider):
-    def __init__(self, model="llama3:8b"):
-        self.model = model
-        self.url = "http://localhost:11434/api/generate"
-        self.options = {
-            "temperature": 0.2,
-            "num_predict": 500
-        }
-
-    async def generate_response(self, system_prompt, user_query):
-        payload = {
-            "model": self.model,
-            "prompt": f"{system_prompt}\n\nUsuário: {user_query}",
-            "stream": False
-        }
-        async with httpx.AsyncClient() as client:
-            response = await client.post(self.url, json=payload, timeout=300.0)
-            return response.json().get("response", "Erro ao conectar ao Ollama.")
-
-
-# MODO NUVEM: GEMINI (Google)
-class GeminiProvider(LLMProvider):
-    def __init__(self, api_key):
-        self.api_key = api_key
-        if api_key:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-pro')
-        else:
-            self.model = None
-
-    async def generate_response(self, system_prompt, user_query):
-        if not self.model:
-            return "Erro: Chave API do Gemini não configurada. Verifique as configurações no navegador."
-        try:
-            full_prompt = f"{system_prompt}\n\nPergunta: {user_query}"
-            response = await self.model.generate_content_async(full_prompt)
-            return response.text
-        except Exception as e:
-            return f"Erro ao processar com Gemini: {str(e)}"
-
-
-# MODO NUVEM: OPENAI (GPT-4o)
-class OpenAIProvider(LLMProvider):
-    def __init__(self, api_key):
-        self.client = openai.AsyncOpenAI(api_key=api_key) if api_key else None
-
-
-async def generate_response(self, system_prompt, user_query):
-    if not self.client:
-        return "Erro: Chave OpenAI não encontrada. Insira-a nas configurações."
-
-    try:
-        messages = [
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_query}
-        ]
-        response = await self.client.chat.completions.create(
-            model="gpt-4o",
-            messages=messages,
-            temperature=0.2,
-            max_tokens=500
-        )
-        return response.choices[0].message.content
-
-    except Exception as e:
-        return f"Erro ao processar com OpenAI: {str(e)}"
+def __getattr__(name):
+    # Compatibilidade: `from modules.providers import OllamaProvider` continua funcionando
+    for target in PROVIDERS.values():
+        module_name, class_name = target.split(":")
+        if class_name == name:
+            return getattr(__import__(module_name, fromlist=[class_name]), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,74 @@
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from modules.intents import normalize
+from modules.commands import COMMAND_TAGS
+
+_ESPACOS_RE = re.compile(r"\s+")
+
+
+def normalize_query(query):
+    """Forma canônica da pergunta: sem acentos, minúscula, espaços e pontuação final colapsados."""
+    return _ESPACOS_RE.sub(" ", normalize(query)).strip().rstrip("?!. ")
+
+
+def _sha(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Cache LRU com TTL para respostas do modelo.
+
+    A chave combina o provedor/modelo, o hash do contexto montado pelo retriever,
+    o histórico da conversa e a pergunta normalizada; qualquer mudança nos dados
+    muda o contexto e, portanto, invalida a entrada. Respostas com tags de comando nunca são guardadas.
+    """
+
+    def __init__(self, max_entries=256, ttl=600.0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, provider_id, context, query, history=""):
+        # Sem histórico a chave é a mesma de sempre; com histórico, "e se for 200?" depende dele
+        conversa = f"\x00{_sha(history)}" if history else ""
+        return _sha(f"{provider_id}\x00{_sha(context)}{conversa}\x00{normalize_query(query)}")
+
+    def get(self, key):
+        with self._lock:
+            entrada = self._entries.get(key)
+            if entrada is None or time.monotonic() - entrada[1] > self.ttl:
+                if entrada is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entrada[0]
+
+    def put(self, key, response):
+        # Falhas dos provedores viram ProviderError e nunca chegam aqui
+        if not response or any(tag in response for tag in COMMAND_TAGS):
+            return False
+        with self._lock:
+            self._entries[key] = (response, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Cache compartilhado por todas as sessões do processo
+response_cache = ResponseCache()
@@ -1,132 +1,201 @@
 import os
-import json
 import pandas as pd
+from modules.storage import open_backend
+from modules.balance import RunningBalance
+from modules.cache import FileWatcher
+from modules.catalog import get_catalog
+from modules.intents import IntentRouter, default_router
+from modules.context_builder import ContextBuilder
+from modules.ledger import Ledger
+from modules.workers import io_pool
+from modules.telemetry import telemetry
 
 
 class FinancialRetriever:
-    def __init__(self, data=None):
+    def __init__(self, data=None, data_path=None, token_budget=1200, backend=None, catalog_path=None, pool=io_pool):
         current_dir = os.path.dirname(os.path.abspath(__file__))
-        self.data_path = os.path.abspath(os.path.join(current_dir, "..", "..", "data"))
-        self.data = data if data else self._load_all_data()
+        self.data_path = data_path or os.path.abspath(os.path.join(current_dir, "..", "..", "data"))
+        # O catálogo de produtos é comum a todos os usuários (ver modules.tenants)
+        self.catalog_path = catalog_path or os.path.join(self.data_path, "produtos_financeiros.json")
+        # Pool de threads para a API assíncrona (disco e pandas fora do event loop)
+        self.pool = pool
+        # Persistência plugável (CSV/JSON ou SQLite), ver modules.storage
+        self.backend = backend or open_backend(self.data_path)
+        self.store = self.backend.transactions
+        self.arquivos = self.backend.watched_files()
+        self.watcher = FileWatcher()
+        self._ledger = self._ledger_df = None
+        intents_path = os.path.join(self.data_path, "intents.json")
+        self.router = IntentRouter.from_file(intents_path) if os.path.exists(intents_path) else default_router
+        self.context_builder = ContextBuilder(token_budget=token_budget)
+        with telemetry.span("retriever.load") as etapa:
+            self.data = data if data else self._load_all_data()
+            etapa.set(rows=len(self.store))
+        if data:
+            self.store.load()
+            self.data.pop("transacoes", None)
+            self.data["produtos_financeiros"] = self._load_products()
+        self.balance = RunningBalance(self.data.get("perfil_investidor"), self.backend.save_profile,
+                                      flush_every=self.backend.balance_flush_every)
+        self.balance.attach(self.store.total)
+        self._mark_written(*self.arquivos)
+
+    def _paths(self, key):
+        return self.arquivos[key]
+
+    def _mark_written(self, *keys):
+        for key in keys:
+            self.watcher.mark(*self._paths(key))
 
     def _load_all_data(self):
         """Carrega a base de verdade de forma robusta e absoluta."""
         data = {}
-        paths = {
-            "perfil_investidor": os.path.join(self.data_path, "perfil_investidor.json"),
-            "transacoes": os.path.join(self.data_path, "transacoes.csv"),
-            "objetivos_financeiros": os.path.join(self.data_path, "objetivos_financeiros.json"),
-            "produtos_financeiros": os.path.join(self.data_path, "produtos_financeiros.json")
-        }
 
         # Carregar Perfil
-        if os.path.exists(paths["perfil_investidor"]):
-            try:
-                with open(paths["perfil_investidor"], 'r', encoding='utf-8') as f:
-                    data["perfil_investidor"] = json.load(f)
-            except Exception as e:
-                print(f"Erro ao ler perfil: {e}")
-
-        # Carregar Transações
-        if os.path.exists(paths["transacoes"]):
-            try:
-                data["transacoes"] = pd.read_csv(paths["transacoes"])
-            except Exception as e:
-                print(f"Erro ao ler transações: {e}")
-                data["transacoes"] = pd.DataFrame(columns=['data', 'descricao', 'valor', 'categoria', 'prioridade'])
-        else:
-            data["transacoes"] = pd.DataFrame(columns=['data', 'descricao', 'valor', 'categoria', 'prioridade'])
+        perfil = self._load_profile()
+        if perfil is not None:
+            data["perfil_investidor"] = perfil
+
+        # Carregar Transações (o DataFrame é montado sob demanda em _transactions_frame)
+        self.store.load()
 
         # Carregar Metas
-        if os.path.exists(paths["objetivos_financeiros"]):
-            try:
-                with open(paths["objetivos_financeiros"], 'r', encoding='utf-8') as f:
-                    data["objetivos_financeiros"] = json.load(f)
-            except Exception:
-                data["objetivos_financeiros"] = []
-        else:
-            data["objetivos_financeiros"] = []
+        data["objetivos_financeiros"] = self._load_goals()
         # Carregar Produtos (Somente Leitura)
-        if os.path.exists(paths["produtos_financeiros"]):
-            try:
-                with open(paths["produtos_financeiros"], 'r', encoding='utf-8') as f:
-                    data["produtos_financeiros"] = json.load(f)
-            except Exception:
-                data["produtos_financeiros"] = []
-        else:
-            data["produtos_financeiros"] = []
+        data["produtos_financeiros"] = self._load_products()
 
         return data
 
-    def _save_csv(self, df):
-        path = os.path.join(self.data_path, "transacoes.csv")
-        df.to_csv(path, index=False)
-        self.data["transacoes"] = df
+    def _load_profile(self):
+        return self.backend.load_profile()
+
+    def _load_goals(self):
+        return self.backend.load_goals()
+
+    def _load_products(self):
+        # Catálogo imutável compartilhado entre sessões (recarrega sozinho se o arquivo mudar)
+        return get_catalog(self.catalog_path)
+
+    def _refresh_if_changed(self):
+        """Recarrega apenas os arquivos alterados fora deste processo."""
+        if not self.watcher.due():
+            return
+        with telemetry.span("retriever.reload") as etapa:
+            # Cada caminho é verificado uma vez (changed() já registra a nova assinatura) e
+            # todo bloco que o usa é recarregado: no SQLite os três blocos dividem o mesmo banco
+            caminhos = dict.fromkeys(p for key in self.arquivos for p in self._paths(key))
+            mudaram = {p for p in caminhos if self.watcher.changed(p)}
+            alterados = [key for key in self.arquivos if mudaram.intersection(self._paths(key))]
+            etapa.set(files=len(alterados))
+            self._reload(alterados)
+
+    def _reload(self, alterados):
+        if "perfil_investidor" in alterados:
+            perfil = self._load_profile()
+            if perfil is not None:
+                self.data["perfil_investidor"] = perfil
+            else:
+                self.data.pop("perfil_investidor", None)
+            self.balance.perfil = perfil
+        if "transacoes" in alterados:
+            self.store.load()
+            self._refresh_transactions()
+        if "perfil_investidor" in alterados or "transacoes" in alterados:
+            self.balance.attach(self.store.total)
+            self._mark_written("perfil_investidor")
+        if "objetivos_financeiros" in alterados:
+            self.data["objetivos_financeiros"] = self._load_goals()
+        self.data["produtos_financeiros"] = self._load_products()
+
+    def _refresh_transactions(self):
+        # Apenas invalida: o DataFrame é remontado sob demanda na próxima leitura
+        self.data.pop("transacoes", None)
+        self._mark_written("transacoes")
+
+    def _transactions_frame(self):
+        if "transacoes" not in self.data:
+            self.data["transacoes"] = self.store.frame()
+        return self.data["transacoes"]
+
+    def ledger(self):
+        """Ledger indexado por data/categoria, refeito só quando as transações mudam."""
+        df = self._transactions_frame()
+        if self._ledger is None or self._ledger_df is not df:
+            self._ledger, self._ledger_df = Ledger(df), df
+        return self._ledger
+
+    def transactions_between(self, start=None, end=None):
+        return self.ledger().between(start, end)
+
+    def transactions_by_category(self, categoria, start=None, end=None):
+        return self.ledger().by_category(categoria, start, end)
 
     def _save_goals(self, goals_list):
-        path = os.path.join(self.data_path, "objetivos_financeiros.json")
-        with open(path, 'w', encoding='utf-8') as f:
-            json.dump(goals_list, f, ensure_ascii=False, indent=4)
+        with telemetry.span("retriever.write", action="save_goals", rows=len(goals_list)):
+            self.backend.save_goals(goals_list)
         self.data["objetivos_financeiros"] = goals_list
+        self._mark_written("objetivos_financeiros")
 
     def _update_balance_file(self, valor_delta):
-        path = os.path.join(self.data_path, "perfil_investidor.json")
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f:
-                perfil = json.load(f)
-            perfil["saldo_atual"] = perfil.get("saldo_atual", 0.0) + valor_delta
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(perfil, f, ensure_ascii=False, indent=4)
-            if "perfil_investidor" in self.data:
-                self.data["perfil_investidor"]["saldo_atual"] = perfil["saldo_atual"]
+        # Atualização O(1) em memória; o perfil é gravado em lote pelo RunningBalance
+        self.balance.apply(valor_delta)
+        self._mark_written("perfil_investidor")
+
+    def verify_balance(self):
+        """Retorna a divergência entre o saldo e o reconstruído pelas transações."""
+        return self.balance.verify(self.store.total)
+
+    def rebuild_balance(self):
+        self.balance.rebuild(self.store.total)
+        self._mark_written("perfil_investidor")
+        return self.balance.saldo
+
+    def flush(self):
+        with telemetry.span("retriever.write", action="flush"):
+            self.balance.flush()
+        self._mark_written("perfil_investidor")
 
     def get_relevant_context(self, query: str):
-        context = []
-        self.data["objetivos_financeiros"] = self._load_all_data().get("objetivos_financeiros", [])
+        self._refresh_if_changed()
+        with telemetry.span("retriever.context"):
+            intents = self.router.route(query)
+            ledger = self.ledger() if "periodo" in intents else None
+            return self.context_builder.build(self.data, self._transactions_frame(), intents, ledger, query)
 
-        perfil = self.data.get("perfil_investidor")
-        if perfil:
-            nome = perfil.get('nome', 'Usuário')
-            saldo = perfil.get('saldo_atual', 0.0)
-            context.append(f"DADOS DO CLIENTE:\n- Nome: {nome}\n- Saldo Atual: R$ {saldo:.2f}")
+    # --- API ASSÍNCRONA ---
+    # Mesmas operações, executadas no pool de threads. Chamadas concorrentes ao
+    # mesmo retriever devem ser serializadas por quem chama (ver Tenant.lock).
 
-        metas = self.data.get("objetivos_financeiros", [])
-        if metas:
-            txt_metas = "OBJETIVOS FINANCEIROS (Use o ID para alterar/excluir):\n"
-            for idx, m in enumerate(metas):
-                status = m.get('status', 'Em andamento')
-                txt_metas += f"[ID: {idx}] {m['descricao']}: Alvo R$ {m['valor_alvo']} - {status}\n"
-            context.append(txt_metas)
-
-        # Contexto de Investimentos
-        keywords_invest = ["investir", "rendimento", "aplicar", "onde colocar", "recomendação", "cdb", "tesouro"]
-        if any(k in query.lower() for k in keywords_invest):
-            produtos = self.data.get("produtos_financeiros", [])
-            if produtos:
-                txt_prod = "PRODUTOS FINANCEIROS DISPONÍVEIS (Apenas Leitura):\n"
-                for p in produtos:
-                    txt_prod += f"- {p.get('nome')} ({p.get('tipo')}): Rentabilidade {p.get('rentabilidade')} | Risco {p.get('risco')}\n"
-                context.append(txt_prod)
-
-        # Contexto de Transações (CRUD)
-        keywords_crud = ["editar", "mudar", "alterar", "corrigir", "gasto", "compra", "ganhei", "transação", "remover", "deletar"]
-        if any(word in query.lower() for word in keywords_crud):
-            df = self.data.get("transacoes")
-            if df is not None and not df.empty:
-                ultimas = df.tail(8).reset_index()
-                txt_transacoes = "ÚLTIMAS TRANSAÇÕES (Use o ID para editar/excluir):\n"
-                txt_transacoes += ultimas[['index', 'data', 'descricao', 'valor', 'categoria']].to_string(index=False)
-                context.append(txt_transacoes)
-
-        return "\n\n".join(context) if context else "Nenhum contexto financeiro disponível."
+    async def aget_relevant_context(self, query: str):
+        return await self.pool.run(self.get_relevant_context, query)
+
+    async def aadd_transaction(self, descricao, valor, categoria="Geral", prioridade="Média"):
+        return await self.pool.run(self.add_transaction, descricao, valor, categoria, prioridade)
+
+    async def aupdate_transaction(self, idx, **kwargs):
+        return await self.pool.run(self.update_transaction, idx, **kwargs)
+
+    async def adelete_transaction(self, transaction_index):
+        return await self.pool.run(self.delete_transaction, transaction_index)
+
+    async def aadd_goal(self, descricao, valor_alvo, data_limite=None):
+        return await self.pool.run(self.add_goal, descricao, valor_alvo, data_limite)
+
+    async def aupdate_goal(self, idx, **kwargs):
+        return await self.pool.run(self.update_goal, idx, **kwargs)
+
+    async def adelete_goal(self, goal_index):
+        return await self.pool.run(self.delete_goal, goal_index)
+
+    async def aadd_transactions(self, df):
+        return await self.pool.run(self.add_transactions, df)
+
+    async def aflush(self):
+        return await self.pool.run(self.flush)
 
     # --- CRUD OPERATIONS ---
 
     def add_transaction(self, descricao, valor, categoria="Geral", prioridade="Média"):
-        df = self.data.get("transacoes")
-        if df is None:
-            df = pd.DataFrame(columns=['data', 'descricao', 'valor', 'categoria', 'prioridade'])
-
         nova_linha = {
             "data": pd.Timestamp.now().strftime("%d/%m/%Y"),
             "descricao": str(descricao),
@@ -135,55 +204,62 @@ class FinancialRetriever:
             "prioridade": str(prioridade)
         }
         try:
-            # Concatenação segura
-            df = pd.concat([df, pd.DataFrame([nova_linha])], ignore_index=True)
-            self._save_csv(df)
-            self._update_balance_file(float(valor))
-            print(f"DEBUG: Transação salva com sucesso! Novo total de linhas: {len(df)}")
+            # Transação + saldo numa única confirmação (quando o backend suporta)
+            with telemetry.span("retriever.write", action="add_transaction", rows=1), self.backend.atomic():
+                self.store.add(nova_linha)
+                self._update_balance_file(float(valor))
+            self._refresh_transactions()
             return True
         except Exception as e:
             print(f"Erro CRÍTICO no add_transaction: {e}")
             return False
 
     def update_transaction(self, idx, **kwargs):
-        df = self.data.get("transacoes")
-        if df is None or df.empty:
-            return False
         try:
             idx = int(idx)
-            if idx not in df.index:
+            if idx not in self.store:
                 return False
-            valor_antigo = df.loc[idx, 'valor']
+            valor_antigo = self.store.get(idx)['valor']
             novo_valor = kwargs.get('valor', valor_antigo)
-            for key, val in kwargs.items():
-                if key in df.columns:
-                    df.at[idx, key] = val
-
-            self._save_csv(df)
-            if novo_valor != valor_antigo:
-                delta = float(novo_valor) - float(valor_antigo)
-                self._update_balance_file(delta)
+            with telemetry.span("retriever.write", action="update_transaction", rows=1), self.backend.atomic():
+                self.store.update(idx, kwargs)
+                if novo_valor != valor_antigo:
+                    delta = float(novo_valor) - float(valor_antigo)
+                    self._update_balance_file(delta)
+            self._refresh_transactions()
             return True
         except Exception as e:
             print(f"Erro UPDATE Transacao: {e}")
             return False
 
     def delete_transaction(self, transaction_index):
-        df = self.data.get("transacoes")
-        if df is None or df.empty:
-            return False
         try:
             idx = int(transaction_index)
-            if idx in df.index:
-                valor_removido = df.loc[idx, 'valor']
-                df = df.drop(idx)
-                self._save_csv(df)
-                self._update_balance_file(-valor_removido)
+            if idx in self.store:
+                valor_removido = float(self.store.get(idx)['valor'])
+                with telemetry.span("retriever.write", action="delete_transaction", rows=1), self.backend.atomic():
+                    self.store.delete(idx)
+                    self._update_balance_file(-valor_removido)
+                self._refresh_transactions()
                 return True
         except Exception as e:
             print(f"Erro DELETE: {e}")
         return False
 
+    def add_transactions(self, df):
+        """Lote de transações (importação): uma gravação no store e um ajuste de saldo.
+
+        Diferente das operações unitárias, erros sobem para quem chama, que
+        decide se aborta a importação.
+        """
+        if df.empty:
+            return range(0)
+        with telemetry.span("retriever.write", action="add_transactions", rows=len(df)), self.backend.atomic():
+            ids = self.store.add_many(df)
+            self._update_balance_file(float(df['valor'].sum()))
+        self._refresh_transactions()
+        return ids
+
     def add_goal(self, descricao, valor_alvo, data_limite=None):
         metas = self.data.get("objetivos_financeiros", [])
         novo_objetivo = {
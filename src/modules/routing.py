@@ -0,0 +1,193 @@
+import time
+from collections import deque
+import numpy as np
+from modules.providers import LLMProvider, ProviderError
+from modules.intents import default_router
+
+# Intenções que pedem o modelo de análise; o resto vai para o modelo rápido
+INTENTS_ANALISE = frozenset({"investimentos", "periodo", "categorias", "metas"})
+
+
+def classify_task(query, router=default_router):
+    """'analise' para perguntas que cruzam dados; 'rapido' para o resto."""
+    return "analise" if router.route(query) & INTENTS_ANALISE else "rapido"
+
+
+class LatencyTracker:
+    """Janela móvel de latência (até o primeiro pedaço) e falhas de um backend.
+
+    Após `max_failures` falhas seguidas o backend fica `cooldown` segundos
+    fora da rotação (o tempo dobra a cada nova abertura, até `max_cooldown`).
+    """
+
+    def __init__(self, window=50, max_failures=3, cooldown=15.0, max_cooldown=300.0, clock=time.monotonic):
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.clock = clock
+        self.failures = 0
+        self.open_until = 0.0
+        self.last_attempt = None
+        self._aberturas = 0
+
+    def record_success(self, latency):
+        self.last_attempt = self.clock()
+        if self._aberturas:
+            # Voltou depois de um cooldown: as falhas antigas não contam mais
+            self.outcomes.clear()
+            self._aberturas = 0
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.failures = 0
+
+    def record_failure(self):
+        self.last_attempt = self.clock()
+        self.outcomes.append(False)
+        self.failures += 1
+        if self.failures >= self.max_failures:
+            self.open_until = self.clock() + min(self.max_cooldown, self.cooldown * 2 ** self._aberturas)
+            self._aberturas += 1
+            self.failures = 0
+
+    @property
+    def available(self):
+        return self.clock() >= self.open_until
+
+    def percentile(self, p):
+        return float(np.percentile(self.latencies, p)) if self.latencies else None
+
+    @property
+    def p50(self):
+        return self.percentile(50)
+
+    @property
+    def p95(self):
+        return self.percentile(95)
+
+    def probe_due(self, interval):
+        """Backend degradado sem tentativas há `interval` segundos: vale uma sondagem."""
+        return self.last_attempt is not None and self.clock() - self.last_attempt >= interval
+
+    @property
+    def error_rate(self):
+        return self.outcomes.count(False) / len(self.outcomes) if self.outcomes else 0.0
+
+    def snapshot(self):
+        return {"p50": self.p50, "p95": self.p95, "error_rate": round(self.error_rate, 3),
+                "samples": len(self.latencies), "available": self.available}
+
+
+# Saúde de cada backend, compartilhada por todas as sessões do processo
+_trackers = {}
+
+
+def get_tracker(name):
+    tracker = _trackers.get(name)
+    if tracker is None:
+        tracker = _trackers[name] = LatencyTracker()
+    return tracker
+
+
+class Backend:
+    """Um provedor na rota: `local` marca modelos que não enviam dados para fora;
+    `tasks` restringe o tipo de pergunta atendido (None = todos)."""
+
+    def __init__(self, provider, local=None, tasks=None, tracker=None):
+        self.provider = provider
+        self.local = getattr(provider, "local", False) if local is None else local
+        self.tasks = frozenset(tasks) if tasks else None
+        self.tracker = tracker or get_tracker(provider.provider_id)
+
+    @property
+    def name(self):
+        return self.provider.provider_id
+
+    def serves(self, task):
+        return self.tasks is None or task in self.tasks
+
+
+class RoutingProvider(LLMProvider):
+    """Escolhe, a cada pedido, o backend mais saudável entre os elegíveis.
+
+    Elegíveis: atendem o tipo de pergunta, estão fora do cooldown e, com
+    `local_only`, são locais. Entre eles vale a ordem de preferência, pulando
+    quem está com p95 acima de `latency_slo` ou taxa de erro acima de
+    `max_error_rate` enquanto houver alternativa dentro dos limites (um
+    backend degradado volta a ser sondado a cada `probe_interval` segundos).
+    Se um backend falha antes do primeiro pedaço, o próximo é tentado.
+    """
+
+    def __init__(self, backends, local_only=False, latency_slo=8.0, max_error_rate=0.5, min_samples=3,
+                 probe_interval=30.0, classify=classify_task, clock=time.monotonic):
+        self.backends = [b if isinstance(b, Backend) else Backend(b) for b in backends]
+        self.local_only = local_only
+        self.latency_slo = latency_slo
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self.classify = classify
+        self.clock = clock
+        self.last_backend = None
+
+    @property
+    def model_name(self):
+        return "+".join(b.name for b in self.backends)
+
+    @property
+    def provider_id(self):
+        return f"RoutingProvider:{self.model_name}:{'local' if self.local_only else 'any'}"
+
+    def _healthy(self, backend):
+        t = backend.tracker
+        if len(t.outcomes) < self.min_samples or t.probe_due(self.probe_interval):
+            return True
+        return (t.p95 is None or t.p95 <= self.latency_slo) and t.error_rate <= self.max_error_rate
+
+    def candidates(self, task=None):
+        """Backends na ordem em que serão tentados para este tipo de pergunta."""
+        elegiveis = [b for b in self.backends
+                     if b.serves(task) and b.tracker.available and (b.local or not self.local_only)]
+        if not elegiveis:
+            # Todos em cooldown: melhor tentar do que falhar sem chamar ninguém
+            elegiveis = [b for b in self.backends if b.serves(task) and (b.local or not self.local_only)]
+        saudaveis = [b for b in elegiveis if self._healthy(b)]
+        degradados = sorted((b for b in elegiveis if not self._healthy(b)),
+                            key=lambda b: (b.tracker.error_rate, b.tracker.p95 or 0.0))
+        return saudaveis + degradados
+
+    def stats(self):
+        return {b.name: b.tracker.snapshot() for b in self.backends}
+
+    async def generate_response(self, system_prompt, user_query):
+        return "".join([chunk async for chunk in self.stream_response(system_prompt, user_query)])
+
+    async def stream_response(self, system_prompt, user_query):
+        candidatos = self.candidates(self.classify(user_query) if self.classify else None)
+        if not candidatos:
+            raise ProviderError("config", "nenhum provedor elegível (modo somente local?)", self.provider_id)
+        ultimo_erro = None
+        for backend in candidatos:
+            inicio = self.clock()
+            entregou = False
+            try:
+                async for chunk in backend.provider.stream_response(system_prompt, user_query):
+                    if not entregou:
+                        entregou = True
+                        backend.tracker.record_success(self.clock() - inicio)
+                        self.last_backend = backend.name
+                    yield chunk
+                if not entregou:
+                    backend.tracker.record_success(self.clock() - inicio)
+                    self.last_backend = backend.name
+                return
+            except Exception as e:
+                erro = ProviderError.from_exception(e, backend.name)
+                backend.tracker.record_failure()
+                if entregou:
+                    # Parte da resposta já foi entregue: trocar de modelo agora a duplicaria
+                    raise erro from e
+                print(f"Aviso: {erro.kind} em {backend.name}; tentando o próximo provedor")
+                ultimo_erro = erro
+        raise ultimo_erro
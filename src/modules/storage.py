@@ -0,0 +1,427 @@
+import os
+import sys
+import json
+import argparse
+import contextlib
+import pandas as pd
+from abc import ABC, abstractmethod
+
+COLUNAS_TRANSACOES = ['data', 'descricao', 'valor', 'categoria', 'prioridade']
+FORMATO_DATA = "%d/%m/%Y"
+# Tipos explícitos do ledger: texto só onde é texto livre
+DTYPES_CSV = {'data': str, 'descricao': str, 'valor': 'float64', 'categoria': 'category', 'prioridade': 'category'}
+
+
+def _valor(row):
+    try:
+        valor = float(row.get('valor') or 0.0)
+    except (TypeError, ValueError):
+        return 0.0
+    return 0.0 if valor != valor else valor  # NaN vindo do CSV conta como zero
+
+
+def typed_frame(df):
+    """Normaliza as colunas do ledger: datas parseadas, valor float64, categóricas."""
+    df = df.reindex(columns=COLUNAS_TRANSACOES)
+    if not pd.api.types.is_datetime64_any_dtype(df['data']):
+        df['data'] = pd.to_datetime(df['data'], format=FORMATO_DATA, errors='coerce')
+    df['descricao'] = df['descricao'].fillna("").astype(str)
+    df['valor'] = pd.to_numeric(df['valor'], errors='coerce').fillna(0.0).astype('float64')
+    for col in ('categoria', 'prioridade'):
+        df[col] = df[col].astype(str).astype('category')
+    return df
+
+
+def read_ledger_csv(path):
+    """Ledger do CSV com índice = ID (coluna `id`; CSVs antigos sem ela usam a posição)."""
+    try:
+        df = pd.read_csv(path, dtype=DTYPES_CSV)
+    except ValueError:
+        # Valor não numérico em alguma linha: lê como texto e converte com coerção
+        df = pd.read_csv(path, dtype=str)
+    if 'id' in df.columns:
+        df = df.set_index(pd.to_numeric(df.pop('id')).astype('int64'))
+        df.index.name = None
+    return typed_frame(df)
+
+
+class TransactionStore:
+    """Armazenamento das transações: snapshot CSV + journal append-only.
+
+    Cada add/update/delete grava uma única linha no journal (O(1)). Em memória,
+    o snapshot fica num DataFrame tipado e as mudanças do journal em pequenos
+    overlays; de tempos em tempos tudo é compactado de volta no `transacoes.csv`.
+    Os IDs (índice do DataFrame, coluna `id` do CSV) não mudam na compactação
+    e nunca são reaproveitados, nem o de uma transação apagada.
+    """
+
+    def __init__(self, data_path, compact_every=1000):
+        self.data_path = data_path
+        self.snapshot_path = os.path.join(data_path, "transacoes.csv")
+        self.journal_path = os.path.join(data_path, "transacoes.journal")
+        self.compact_every = compact_every
+        self.base = typed_frame(pd.DataFrame(columns=COLUNAS_TRANSACOES))
+        self.added = {}
+        self.updated = {}
+        self.deleted = set()
+        self.next_id = 0
+        self.journal_size = 0
+        # Soma corrente de `valor`, mantida em O(1) a cada operação
+        self.total = 0.0
+        self._frame = None
+        self._journal = None
+
+    # --- CARGA ---
+
+    def load(self):
+        """Lê o snapshot e reaplica o journal por cima."""
+        self.base = typed_frame(pd.DataFrame(columns=COLUNAS_TRANSACOES))
+        if os.path.exists(self.snapshot_path):
+            try:
+                self.base = read_ledger_csv(self.snapshot_path)
+            except Exception as e:
+                print(f"Erro ao ler transações: {e}")
+        self._clear_overlay()
+        self.total = float(self.base['valor'].sum())
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Última linha truncada por queda do processo: ignora
+                        print("Aviso: registro inválido no journal ignorado.")
+                        continue
+                    self._apply(record)
+                    if record.get("op") != "next_id":
+                        self.journal_size += 1
+        # Começa a sessão com o journal vazio
+        if self.journal_size:
+            self.compact()
+        return self
+
+    def _clear_overlay(self, next_id=0):
+        self.added, self.updated, self.deleted = {}, {}, set()
+        self.next_id = max(next_id, int(self.base.index.max()) + 1 if len(self.base) else 0)
+        self.journal_size = 0
+        self._frame = None
+
+    def _apply(self, record):
+        op = record.get("op")
+        idx = record.get("id")
+        if op == "next_id":
+            # Maior ID já usado, gravado pela compactação (o da última linha pode ter sido apagado)
+            self.next_id = max(self.next_id, idx)
+        elif op == "add":
+            self.added[idx] = dict(record["row"])
+            self.next_id = max(self.next_id, idx + 1)
+            self.total += _valor(record["row"])
+        elif op == "update" and idx in self:
+            self.total -= _valor(self.get(idx))
+            if idx in self.added:
+                self.added[idx].update(record["fields"])
+            else:
+                self.updated.setdefault(idx, {}).update(record["fields"])
+            self.total += _valor(self.get(idx))
+        elif op == "add_many":
+            novos = typed_frame(pd.DataFrame(record["rows"], columns=record["columns"]))
+            novos['data'] = pd.to_datetime(novos['data'], format=FORMATO_DATA, errors='coerce')
+            self.total += float(novos['valor'].sum())
+            if idx >= self.next_id and not (self.added or self.updated or self.deleted):
+                # Caso normal (add_many compacta antes): o lote entra direto no DataFrame base
+                novos.index = pd.RangeIndex(idx, idx + len(novos))
+                self.base = typed_frame(pd.concat([self.base.astype({'categoria': object, 'prioridade': object}),
+                                                   novos.astype({'categoria': object, 'prioridade': object})]))
+                self.next_id = idx + len(novos)
+            else:
+                for i, linha in enumerate(record["rows"]):
+                    self.added[idx + i] = dict(zip(record["columns"], linha))
+                self.next_id = max(self.next_id, idx + len(record["rows"]))
+        elif op == "delete" and idx in self:
+            self.total -= _valor(self.get(idx))
+            if self.added.pop(idx, None) is None:
+                self.deleted.add(idx)
+                self.updated.pop(idx, None)
+
+    # --- ESCRITA ---
+
+    def _append(self, record):
+        if self._journal is None:
+            self._journal = open(self.journal_path, 'a', encoding='utf-8')
+        self._journal.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        self.journal_size += 1
+        self._apply(record)
+        self._frame = None
+        if self.journal_size >= self.compact_every:
+            self.compact()
+
+    def add(self, row):
+        idx = self.next_id
+        self._append({"op": "add", "id": idx, "row": {c: row.get(c) for c in COLUNAS_TRANSACOES}})
+        return idx
+
+    def add_many(self, df):
+        """Acrescenta um lote inteiro com um único registro no journal (importação em massa).
+
+        Devolve o intervalo de IDs atribuídos. Quem importa vários lotes chama
+        `compact()` uma vez no fim.
+        """
+        if df.empty:
+            return range(self.next_id, self.next_id)
+        if self.added or self.updated or self.deleted:
+            self.compact()
+        df = typed_frame(df.reset_index(drop=True))
+        texto = df.astype({'categoria': str, 'prioridade': str})
+        texto['data'] = df['data'].dt.strftime(FORMATO_DATA)
+        inicio = self.next_id
+        linhas = texto.astype(object).where(texto.notna(), None).values.tolist()
+        self._append({"op": "add_many", "id": inicio, "columns": COLUNAS_TRANSACOES, "rows": linhas})
+        return range(inicio, inicio + len(linhas))
+
+    def update(self, idx, fields):
+        fields = {k: v for k, v in fields.items() if k in COLUNAS_TRANSACOES}
+        self._append({"op": "update", "id": idx, "fields": fields})
+
+    def delete(self, idx):
+        self._append({"op": "delete", "id": idx})
+
+    def compact(self):
+        """Reescreve o snapshot com o estado atual e zera o journal.
+
+        Os IDs vão junto (coluna `id`), então continuam valendo no meio da sessão.
+        """
+        self.close()
+        df = self.frame()
+        next_id = self.next_id
+        tmp_path = self.snapshot_path + ".tmp"
+        df.to_csv(tmp_path, index_label='id', date_format=FORMATO_DATA)
+        os.replace(tmp_path, self.snapshot_path)
+        # O journal só é descartado depois que o snapshot está no disco; se o maior ID
+        # usado não está mais no snapshot (foi apagado), ele fica registrado no journal
+        with open(self.journal_path, 'w', encoding='utf-8') as f:
+            if len(df) == 0 and next_id or len(df) and next_id > int(df.index.max()) + 1:
+                f.write(json.dumps({"op": "next_id", "id": next_id}) + "\n")
+        self.base = df
+        self._clear_overlay(next_id)
+
+    def reset(self):
+        """Começa uma base vazia (usado no onboarding)."""
+        return self.replace_all(pd.DataFrame(columns=COLUNAS_TRANSACOES))
+
+    def replace_all(self, df):
+        """Substitui todo o ledger (reset, migração) por `df`; o índice de `df` são os IDs."""
+        self.base = typed_frame(df.copy())
+        self._clear_overlay()
+        self.total = float(self.base['valor'].sum())
+        self.compact()
+        return self
+
+    def close(self):
+        if self._journal is not None:
+            self._journal.close()
+            self._journal = None
+
+    # --- LEITURA ---
+
+    def __contains__(self, idx):
+        if idx in self.added:
+            return True
+        return idx not in self.deleted and idx in self.base.index
+
+    def __len__(self):
+        return len(self.base) - len(self.deleted) + len(self.added)
+
+    def get(self, idx):
+        """Linha no formato do journal (data como texto dd/mm/aaaa)."""
+        if idx in self.added:
+            return self.added[idx]
+        if idx not in self:
+            return None
+        row = self.base.loc[idx]
+        data = row['data'].strftime(FORMATO_DATA) if pd.notna(row['data']) else None
+        linha = {'data': data, 'descricao': row['descricao'], 'valor': float(row['valor']),
+                 'categoria': row['categoria'], 'prioridade': row['prioridade']}
+        linha.update(self.updated.get(idx, {}))
+        return linha
+
+    def frame(self):
+        """DataFrame tipado com o estado atual (índice = ID), remontado só após mudanças."""
+        if self._frame is None:
+            if not (self.added or self.updated or self.deleted):
+                self._frame = self.base
+            else:
+                df = self.base.drop(index=list(self.deleted)) if self.deleted else self.base
+                if self.updated:
+                    df = df.astype({'categoria': object, 'prioridade': object})
+                    for idx, fields in self.updated.items():
+                        for key, val in fields.items():
+                            df.at[idx, key] = pd.to_datetime(val, format=FORMATO_DATA, errors='coerce') if key == 'data' else val
+                if self.added:
+                    novos = typed_frame(pd.DataFrame.from_dict(self.added, orient='index'))
+                    df = pd.concat([df.astype({'categoria': object, 'prioridade': object}),
+                                    novos.astype({'categoria': object, 'prioridade': object})])
+                self._frame = typed_frame(df)
+        return self._frame
+
+
+# --- BACKENDS DE ARMAZENAMENTO ---
+
+
+def _write_json_atomic(path, conteudo):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(conteudo, f, ensure_ascii=False, indent=4)
+    os.replace(tmp_path, path)
+
+
+class StorageBackend(ABC):
+    """Interface de persistência de perfil, metas e transações de um diretório de dados."""
+    name = None
+    # Quantas alterações de saldo o RunningBalance acumula antes de gravar
+    balance_flush_every = 1
+
+    def __init__(self, data_path):
+        self.data_path = data_path
+        self.transactions = None
+
+    @abstractmethod
+    def load_profile(self):
+        pass
+
+    @abstractmethod
+    def save_profile(self, perfil):
+        pass
+
+    @abstractmethod
+    def load_goals(self):
+        pass
+
+    @abstractmethod
+    def save_goals(self, metas):
+        pass
+
+    @abstractmethod
+    def watched_files(self):
+        """{bloco de dados: [caminhos]} usados para detectar mudanças externas."""
+        pass
+
+    def atomic(self):
+        """Agrupa várias gravações (ex.: transação + saldo) numa única confirmação."""
+        return contextlib.nullcontext()
+
+    def exists(self):
+        return self.load_profile() is not None
+
+    def retire(self):
+        """Chamado depois que os dados migraram para outro backend."""
+        pass
+
+    def close(self):
+        self.transactions.close()
+
+
+class CsvJsonBackend(StorageBackend):
+    """Formato original: transacoes.csv (+ journal) e arquivos JSON."""
+    name = "csv"
+    balance_flush_every = 20
+
+    def __init__(self, data_path):
+        super().__init__(data_path)
+        self.transactions = TransactionStore(data_path)
+
+    def _path(self, filename):
+        return os.path.join(self.data_path, filename)
+
+    def _load_json(self, filename, default=None):
+        path = self._path(filename)
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                print(f"Erro ao ler {filename}: {e}")
+        return default
+
+    def load_profile(self):
+        return self._load_json("perfil_investidor.json")
+
+    def save_profile(self, perfil):
+        _write_json_atomic(self._path("perfil_investidor.json"), perfil)
+
+    def load_goals(self):
+        return self._load_json("objetivos_financeiros.json", [])
+
+    def save_goals(self, metas):
+        _write_json_atomic(self._path("objetivos_financeiros.json"), metas)
+
+    def watched_files(self):
+        return {
+            "perfil_investidor": [self._path("perfil_investidor.json")],
+            "transacoes": [self.transactions.snapshot_path, self.transactions.journal_path],
+            "objetivos_financeiros": [self._path("objetivos_financeiros.json")]
+        }
+
+
+BACKENDS = {
+    "csv": "modules.storage:CsvJsonBackend",
+    "sqlite": "modules.storage_sqlite:SqliteBackend"
+}
+
+
+def _backend_class(name):
+    module_name, class_name = BACKENDS[name].split(":")
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
+
+def detect_backend(data_path):
+    """Backend em uso no diretório: FINASSIST_STORAGE, ou SQLite se o banco existir."""
+    escolhido = os.environ.get("FINASSIST_STORAGE")
+    if escolhido:
+        return escolhido
+    if os.path.exists(os.path.join(data_path, "finassist.db")):
+        return "sqlite"
+    return "csv"
+
+
+def open_backend(data_path, name=None):
+    return _backend_class(name or detect_backend(data_path))(data_path)
+
+
+def migrate(data_path, target):
+    """Copia perfil, metas e transações do backend atual para `target`."""
+    origem = open_backend(data_path)
+    if origem.name == target:
+        print(f"Os dados já estão no formato '{target}'.")
+        return origem
+    destino = _backend_class(target)(data_path)
+    df = origem.transactions.load().frame()
+    with destino.atomic():
+        perfil = origem.load_profile()
+        if perfil is not None:
+            destino.save_profile(perfil)
+        destino.save_goals(origem.load_goals())
+        destino.transactions.replace_all(df)
+    origem.close()
+    origem.retire()
+    print(f"Migração concluída: {len(df)} transações de '{origem.name}' para '{target}'.")
+    return destino
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Ferramentas de armazenamento do FinAssist Pro.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    cmd = sub.add_parser("migrate", help="Converte os dados para outro backend")
+    cmd.add_argument("--to", choices=sorted(BACKENDS), required=True)
+    cmd.add_argument("--data", default=os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "data")))
+    args = parser.parse_args(argv)
+    if args.comando == "migrate":
+        migrate(args.data, args.to)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,254 @@
+import os
+import json
+import sqlite3
+import threading
+import contextlib
+import pandas as pd
+from modules.storage import StorageBackend, COLUNAS_TRANSACOES, FORMATO_DATA, typed_frame
+
+# AUTOINCREMENT: o ID de uma transação apagada nunca é reaproveitado (o modelo e o
+# histórico da conversa podem ainda citar "[ID: 2]")
+TABELA_TRANSACOES = """
+CREATE TABLE IF NOT EXISTS {nome} (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    data TEXT,
+    descricao TEXT NOT NULL DEFAULT '',
+    valor REAL NOT NULL DEFAULT 0,
+    categoria TEXT,
+    prioridade TEXT
+);
+"""
+
+SCHEMA = TABELA_TRANSACOES.format(nome="transacoes") + """
+CREATE INDEX IF NOT EXISTS idx_transacoes_data ON transacoes(data);
+CREATE INDEX IF NOT EXISTS idx_transacoes_categoria ON transacoes(categoria, data);
+CREATE TABLE IF NOT EXISTS documentos (
+    nome TEXT PRIMARY KEY,
+    conteudo TEXT NOT NULL
+);
+"""
+
+
+def _iso(data):
+    """dd/mm/aaaa -> aaaa-mm-dd (ordenável e indexável no SQLite)."""
+    if data is None or data != data:
+        return None
+    if isinstance(data, pd.Timestamp):
+        return data.strftime("%Y-%m-%d")
+    try:
+        return pd.to_datetime(str(data), format=FORMATO_DATA).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+def _br(data):
+    return pd.Timestamp(data).strftime(FORMATO_DATA) if data else None
+
+
+class SqliteTransactionStore:
+    """Transações numa tabela SQLite com colunas tipadas e índices por data/categoria.
+
+    A carga só lê contagem e soma; o DataFrame completo é montado sob demanda.
+    Os IDs são a chave primária e não mudam entre sessões.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.total = 0.0
+        self.count = 0
+        self._frame = None
+
+    @property
+    def conn(self):
+        return self.backend.conn
+
+    def load(self):
+        row = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(valor), 0) FROM transacoes").fetchone()
+        self.count, self.total = row[0], float(row[1])
+        self._frame = None
+        return self
+
+    def add(self, row):
+        with self.backend.atomic():
+            cur = self.conn.execute(
+                "INSERT INTO transacoes (data, descricao, valor, categoria, prioridade) VALUES (?, ?, ?, ?, ?)",
+                (_iso(row.get('data')), str(row.get('descricao') or ''), float(row.get('valor') or 0.0),
+                 row.get('categoria'), row.get('prioridade')))
+        self.count += 1
+        self.total += float(row.get('valor') or 0.0)
+        self._frame = None
+        return cur.lastrowid
+
+    def add_many(self, df):
+        """Acrescenta um lote com um único executemany (dentro da transação de quem chama)."""
+        if df.empty:
+            return range(0)
+        df = typed_frame(df.reset_index(drop=True))
+        datas = df['data'].dt.strftime("%Y-%m-%d").astype(object).where(df['data'].notna(), None)
+        linhas = list(zip(datas, df['descricao'], df['valor'].astype(float),
+                          df['categoria'].astype(str), df['prioridade'].astype(str)))
+        with self.backend.atomic():
+            # Depois do maior ID já usado, mesmo que apagado (sqlite_sequence)
+            inicio = self.conn.execute(
+                "SELECT MAX(COALESCE((SELECT MAX(id) FROM transacoes), -1),"
+                " COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'transacoes'), -1)) + 1").fetchone()[0]
+            self.conn.executemany(
+                "INSERT INTO transacoes (id, data, descricao, valor, categoria, prioridade) VALUES (?, ?, ?, ?, ?, ?)",
+                [(inicio + i, *linha) for i, linha in enumerate(linhas)])
+        self.count += len(linhas)
+        self.total += float(df['valor'].sum())
+        self._frame = None
+        return range(inicio, inicio + len(linhas))
+
+    def update(self, idx, fields):
+        fields = {k: v for k, v in fields.items() if k in COLUNAS_TRANSACOES}
+        if not fields:
+            return
+        antigo = self.get(idx)
+        if 'data' in fields:
+            fields['data'] = _iso(fields['data'])
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        with self.backend.atomic():
+            self.conn.execute(f"UPDATE transacoes SET {sets} WHERE id = ?", (*fields.values(), idx))
+        if antigo is not None and 'valor' in fields:
+            self.total += float(fields['valor']) - float(antigo['valor'])
+        self._frame = None
+
+    def delete(self, idx):
+        antigo = self.get(idx)
+        with self.backend.atomic():
+            self.conn.execute("DELETE FROM transacoes WHERE id = ?", (idx,))
+        if antigo is not None:
+            self.count -= 1
+            self.total -= float(antigo['valor'])
+        self._frame = None
+
+    def replace_all(self, df):
+        # Mantém os IDs do CSV, o índice de `df` (os mesmos que o usuário já viu no chat)
+        df = typed_frame(df.copy())
+        linhas = [(int(i), None if pd.isna(d) else d.strftime("%Y-%m-%d"), desc, float(v), str(c), str(p))
+                  for i, d, desc, v, c, p in df[COLUNAS_TRANSACOES].itertuples()]
+        with self.backend.atomic():
+            self.conn.execute("DELETE FROM transacoes")
+            self.conn.executemany(
+                "INSERT INTO transacoes (id, data, descricao, valor, categoria, prioridade) VALUES (?, ?, ?, ?, ?, ?)", linhas)
+        return self.load()
+
+    def reset(self):
+        return self.replace_all(pd.DataFrame(columns=COLUNAS_TRANSACOES))
+
+    def compact(self):
+        pass
+
+    def close(self):
+        pass
+
+    def __contains__(self, idx):
+        return self.conn.execute("SELECT 1 FROM transacoes WHERE id = ?", (idx,)).fetchone() is not None
+
+    def __len__(self):
+        return self.count
+
+    def get(self, idx):
+        row = self.conn.execute(
+            "SELECT data, descricao, valor, categoria, prioridade FROM transacoes WHERE id = ?", (idx,)).fetchone()
+        if row is None:
+            return None
+        return {'data': _br(row[0]), 'descricao': row[1], 'valor': row[2], 'categoria': row[3], 'prioridade': row[4]}
+
+    def frame(self):
+        if self._frame is None:
+            df = pd.read_sql_query(
+                "SELECT id, data, descricao, valor, categoria, prioridade FROM transacoes ORDER BY id",
+                self.conn, index_col='id')
+            df['data'] = pd.to_datetime(df['data'], format="%Y-%m-%d", errors='coerce')
+            df.index.name = None
+            self._frame = typed_frame(df)
+        return self._frame
+
+
+class SqliteBackend(StorageBackend):
+    """Perfil, metas e transações num único banco SQLite (`finassist.db`).
+
+    Gravações agrupadas em `atomic()` (transação + saldo) são confirmadas num
+    único COMMIT; uma queda no meio não deixa arquivo pela metade.
+    """
+    name = "sqlite"
+    balance_flush_every = 1
+
+    def __init__(self, data_path):
+        super().__init__(data_path)
+        self.db_path = os.path.join(data_path, "finassist.db")
+        self.conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._upgrade_schema()
+        self.conn.executescript(SCHEMA)
+        self.transactions = SqliteTransactionStore(self)
+
+    def _upgrade_schema(self):
+        """Bancos criados sem AUTOINCREMENT são recriados com ele (mesmos IDs)."""
+        row = self.conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'transacoes'").fetchone()
+        if row is None or "AUTOINCREMENT" in row[0].upper():
+            return
+        colunas = "id, data, descricao, valor, categoria, prioridade"
+        with self.atomic():
+            self.conn.execute(TABELA_TRANSACOES.format(nome="transacoes_nova"))
+            self.conn.execute(f"INSERT INTO transacoes_nova ({colunas}) SELECT {colunas} FROM transacoes")
+            self.conn.execute("DROP TABLE transacoes")
+            self.conn.execute("ALTER TABLE transacoes_nova RENAME TO transacoes")
+
+    @contextlib.contextmanager
+    def atomic(self):
+        with self._lock:
+            if self._depth == 0:
+                self.conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute("ROLLBACK")
+                raise
+            self._depth -= 1
+            if self._depth == 0:
+                self.conn.execute("COMMIT")
+
+    def _load_doc(self, nome, default=None):
+        row = self.conn.execute("SELECT conteudo FROM documentos WHERE nome = ?", (nome,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _save_doc(self, nome, conteudo):
+        with self.atomic():
+            self.conn.execute("INSERT OR REPLACE INTO documentos (nome, conteudo) VALUES (?, ?)",
+                              (nome, json.dumps(conteudo, ensure_ascii=False)))
+
+    def load_profile(self):
+        return self._load_doc("perfil_investidor")
+
+    def save_profile(self, perfil):
+        self._save_doc("perfil_investidor", perfil)
+
+    def load_goals(self):
+        return self._load_doc("objetivos_financeiros", [])
+
+    def save_goals(self, metas):
+        self._save_doc("objetivos_financeiros", metas)
+
+    def watched_files(self):
+        # Com WAL, gravações de outros processos aparecem no arquivo -wal
+        arquivos = [self.db_path, self.db_path + "-wal"]
+        return {"perfil_investidor": arquivos, "transacoes": arquivos, "objetivos_financeiros": arquivos}
+
+    def close(self):
+        self.conn.close()
+
+    def retire(self):
+        self.conn.close()
+        os.replace(self.db_path, self.db_path + ".bak")
+        for sufixo in ("-wal", "-shm"):
+            if os.path.exists(self.db_path + sufixo):
+                os.remove(self.db_path + sufixo)
@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import bisect
+import itertools
+import threading
+import contextvars
+
+# Limites dos histogramas de duração (segundos), no padrão do Prometheus
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+# Atributos do span que viram rótulos das métricas
+LABELS = ("provider", "action", "path")
+# Atributos numéricos somados por span (tamanho do que passou pela etapa)
+SIZES = ("rows", "files", "chunks", "context_chars", "context_tokens", "prompt_chars", "prompt_tokens",
+         "history_tokens", "response_chars")
+
+_atual = contextvars.ContextVar("finassist_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """Etapa cronometrada de um turno. Os filhos herdam o `trace` do span aberto
+    no contexto atual (inclusive dentro do pool de threads, ver modules.workers)."""
+    __slots__ = ("telemetry", "name", "attrs", "id", "trace", "parent", "start", "duration", "error", "_token")
+
+    def __init__(self, telemetry, name, attrs):
+        self.telemetry = telemetry
+        self.name = name
+        self.attrs = attrs
+        self.id = next(_ids)
+        pai = _atual.get()
+        self.parent = pai.id if pai is not None else None
+        self.trace = pai.trace if pai is not None else self.id
+        self.start = time.time()
+        self.duration = 0.0
+        self.error = None
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    def __enter__(self):
+        self._token = _atual.set(self)
+        self.duration = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        self.duration = time.perf_counter() - self.duration
+        if tipo is not None and not issubclass(tipo, GeneratorExit):
+            self.error = tipo.__name__
+        try:
+            _atual.reset(self._token)
+        except ValueError:
+            # Gerador assíncrono retomado em outro contexto: o span já não é o atual lá
+            pass
+        self.telemetry._finish(self)
+        return False
+
+    def to_dict(self):
+        d = {"trace": self.trace, "span": self.id, "parent": self.parent, "name": self.name,
+             "start": round(self.start, 6), "ms": round(self.duration * 1000, 3)}
+        if self.error:
+            d["error"] = self.error
+        d.update(self.attrs)
+        return d
+
+
+class _NoopSpan:
+    """O que `span()` devolve com a telemetria desligada: nada é medido nem alocado."""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, exc, tb):
+        return False
+
+    def set(self, **attrs):
+        return self
+
+
+_NOOP = _NoopSpan()
+
+
+class Histogram:
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, valor):
+        self.counts[bisect.bisect_left(BUCKETS, valor)] += 1
+        self.sum += valor
+        self.count += 1
+
+
+def _escape(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _rotulos(pares):
+    texto = ",".join(f'{k}="{_escape(v)}"' for k, v in pares if v not in (None, ""))
+    return "{" + texto + "}" if texto else ""
+
+
+class JsonLinesExporter:
+    """Um JSON por span finalizado, em `path` (ou stderr): fácil de filtrar com jq por `trace`."""
+
+    def __init__(self, path=None):
+        self.path = path or os.getenv("FINASSIST_TRACE_FILE")
+        self._stream = open(self.path, "a", encoding="utf-8") if self.path else sys.stderr
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        linha = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            self._stream.write(linha + "\n")
+            self._stream.flush()
+
+    def close(self):
+        if self.path:
+            self._stream.close()
+
+
+class PrometheusExporter:
+    """Agrega os spans em histogramas por etapa/provedor/ação, no formato texto do Prometheus."""
+
+    def __init__(self, prefix="finassist"):
+        self.prefix = prefix
+        self._duracoes = {}
+        self._tamanhos = {}
+        self._erros = {}
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        # Rótulo ausente vira "" (omitido na saída): None quebraria a ordenação em render()
+        rotulos = (("span", span.name),) + tuple((k, span.attrs.get(k) or "") for k in LABELS)
+        with self._lock:
+            hist = self._duracoes.get(rotulos)
+            if hist is None:
+                hist = self._duracoes[rotulos] = Histogram()
+            hist.observe(span.duration)
+            for nome in SIZES:
+                valor = span.attrs.get(nome)
+                if valor:
+                    chave = (nome, rotulos)
+                    self._tamanhos[chave] = self._tamanhos.get(chave, 0) + valor
+            if span.error:
+                chave = rotulos + (("error", span.error),)
+                self._erros[chave] = self._erros.get(chave, 0) + 1
+
+    def render(self):
+        p = self.prefix
+        with self._lock:
+            duracoes = [(r, list(h.counts), h.sum, h.count) for r, h in self._duracoes.items()]
+            tamanhos = dict(self._tamanhos)
+            erros = dict(self._erros)
+        linhas = [f"# HELP {p}_span_seconds Duração de cada etapa do turno.", f"# TYPE {p}_span_seconds histogram"]
+        for rotulos, contagens, soma, total in sorted(duracoes, key=lambda d: str(d[0])):
+            acumulado = 0
+            for limite, n in zip(BUCKETS + (float("inf"),), contagens):
+                acumulado += n
+                le = "+Inf" if limite == float("inf") else repr(limite)
+                linhas.append(f"{p}_span_seconds_bucket{_rotulos(rotulos + (('le', le),))} {acumulado}")
+            linhas.append(f"{p}_span_seconds_sum{_rotulos(rotulos)} {soma:.6f}")
+            linhas.append(f"{p}_span_seconds_count{_rotulos(rotulos)} {total}")
+        for nome in SIZES:
+            series = sorted(((r, v) for (n, r), v in tamanhos.items() if n == nome), key=lambda s: str(s[0]))
+            if series:
+                linhas += [f"# HELP {p}_{nome}_total Soma de {nome} por etapa.", f"# TYPE {p}_{nome}_total counter"]
+                linhas += [f"{p}_{nome}_total{_rotulos(r)} {v}" for r, v in series]
+        if erros:
+            linhas += [f"# HELP {p}_span_errors_total Etapas que terminaram com exceção.",
+                       f"# TYPE {p}_span_errors_total counter"]
+            linhas += [f"{p}_span_errors_total{_rotulos(r)} {v}" for r, v in sorted(erros.items(), key=lambda e: str(e[0]))]
+        return "\n".join(linhas) + "\n"
+
+    def close(self):
+        pass
+
+
+# Exportadores disponíveis ("pacote.modulo:Classe"), ativados por FINASSIST_TELEMETRY=json,prometheus
+EXPORTERS = {
+    "json": "modules.telemetry:JsonLinesExporter",
+    "prometheus": "modules.telemetry:PrometheusExporter"
+}
+
+
+def _exporter_class(name):
+    module_name, class_name = EXPORTERS[name].split(":")
+    module = __import__(module_name, fromlist=[class_name])
+    return getattr(module, class_name)
+
+
+class Telemetry:
+    """Spans por etapa do pipeline, entregues aos exportadores configurados.
+
+    Sem exportadores, `span()` devolve um objeto vazio compartilhado: o custo
+    por etapa é uma chamada de função, então a instrumentação fica no código.
+    """
+
+    def __init__(self, exporters=()):
+        self.exporters = list(exporters)
+
+    @classmethod
+    def from_env(cls):
+        nomes = [n.strip() for n in os.getenv("FINASSIST_TELEMETRY", "").split(",") if n.strip()]
+        telemetria = cls()
+        for nome in nomes:
+            if nome not in EXPORTERS:
+                print(f"Aviso: exportador de telemetria desconhecido: {nome}")
+                continue
+            telemetria.add_exporter(_exporter_class(nome)())
+        return telemetria
+
+    @property
+    def enabled(self):
+        return bool(self.exporters)
+
+    def span(self, name, **attrs):
+        if not self.exporters:
+            return _NOOP
+        return Span(self, name, attrs)
+
+    def record(self, name, seconds, **attrs):
+        """Registra uma etapa já medida (ex.: tempo até o primeiro pedaço) como filha do span atual."""
+        if not self.exporters:
+            return
+        span = Span(self, name, attrs)
+        span.duration = seconds
+        self._finish(span)
+
+    def _finish(self, span):
+        for exporter in self.exporters:
+            try:
+                exporter.export(span)
+            except Exception as e:
+                print(f"Erro ao exportar telemetria ({type(exporter).__name__}): {e}")
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+        return exporter
+
+    def remove_exporter(self, exporter):
+        self.exporters.remove(exporter)
+        exporter.close()
+
+    def exporter(self, cls):
+        return next((e for e in self.exporters if isinstance(e, cls)), None)
+
+    def prometheus_text(self):
+        """Métricas no formato texto do Prometheus (vazio sem o exportador "prometheus")."""
+        exporter = self.exporter(PrometheusExporter)
+        return exporter.render() if exporter else ""
+
+
+# Telemetria do processo (desligada a menos que FINASSIST_TELEMETRY esteja definida)
+telemetry = Telemetry.from_env()
@@ -0,0 +1,165 @@
+import os
+import re
+import time
+import asyncio
+import hashlib
+import threading
+from collections import OrderedDict
+from modules.storage import open_backend
+from modules.intents import normalize
+from modules.workers import io_pool
+
+# Usuário sem login (modo local): continua usando a pasta data/ original
+TENANT_PADRAO = "default"
+PASTA_TENANTS = "usuarios"
+
+_NOME_RE = re.compile(r"[^a-z0-9_-]+")
+
+
+def tenant_key(identifier):
+    """Nome de pasta seguro e estável para um usuário (slug + hash curto)."""
+    if not identifier:
+        return TENANT_PADRAO
+    slug = _NOME_RE.sub("-", normalize(str(identifier))).strip("-")[:32] or "usuario"
+    return f"{slug}-{hashlib.sha256(str(identifier).encode('utf-8')).hexdigest()[:10]}"
+
+
+class Tenant:
+    """Partição de dados de um usuário: pasta própria, retriever em memória e lock de escrita.
+
+    Todas as sessões do mesmo usuário compartilham esta instância, então leem o
+    mesmo conjunto de trabalho e serializam as gravações pelo `lock`.
+    """
+
+    def __init__(self, key, data_path, catalog_path=None):
+        self.key = key
+        self.data_path = data_path
+        self.catalog_path = catalog_path
+        self.lock = asyncio.Lock()
+        self.sessions = 0
+        self.last_used = time.monotonic()
+        self._retriever = None
+
+    @property
+    def retriever(self):
+        if self._retriever is None:
+            from modules.retriever import FinancialRetriever
+            os.makedirs(self.data_path, exist_ok=True)
+            self._retriever = FinancialRetriever(data_path=self.data_path, catalog_path=self.catalog_path)
+        return self._retriever
+
+    async def open(self):
+        """Retriever do usuário, carregado fora do event loop na primeira vez."""
+        if self._retriever is None:
+            await io_pool.run(lambda: self.retriever)
+        return self._retriever
+
+    @property
+    def idle(self):
+        return self.sessions <= 0 and not self.lock.locked()
+
+    def exists(self):
+        if self._retriever is not None:
+            return self._retriever.backend.exists()
+        if not os.path.isdir(self.data_path):
+            return False
+        backend = open_backend(self.data_path)
+        try:
+            return backend.exists()
+        finally:
+            backend.close()
+
+    def setup(self, perfil):
+        """Grava a base inicial (onboarding) e descarta o conjunto de trabalho antigo."""
+        self.close()
+        os.makedirs(self.data_path, exist_ok=True)
+        backend = open_backend(self.data_path)
+        try:
+            with backend.atomic():
+                backend.save_profile(perfil)
+                backend.transactions.reset()
+                backend.save_goals([])
+        finally:
+            backend.close()
+
+    def close(self):
+        if self._retriever is None:
+            return
+        try:
+            self._retriever.flush()
+            self._retriever.backend.close()
+        except Exception as e:
+            print(f"Erro ao fechar dados do usuário {self.key}: {e}")
+        self._retriever = None
+
+
+class TenantRegistry:
+    """Partições ativas do processo, com despejo LRU dos usuários ociosos.
+
+    Um usuário está ocioso quando não tem sessão aberta nem gravação em curso;
+    ao ser despejado, o saldo pendente é gravado e os arquivos são fechados.
+    """
+
+    def __init__(self, base_path, max_tenants=64):
+        self.base_path = base_path
+        self.max_tenants = max_tenants
+        self.catalog_path = os.path.join(base_path, "produtos_financeiros.json")
+        self._tenants = OrderedDict()
+        self._lock = threading.Lock()
+
+    def path_for(self, key):
+        if key == TENANT_PADRAO:
+            return self.base_path
+        return os.path.join(self.base_path, PASTA_TENANTS, key)
+
+    def get(self, identifier=None):
+        key = tenant_key(identifier)
+        with self._lock:
+            tenant = self._tenants.get(key)
+            if tenant is None:
+                tenant = Tenant(key, self.path_for(key), self.catalog_path)
+                self._tenants[key] = tenant
+            self._tenants.move_to_end(key)
+            tenant.last_used = time.monotonic()
+            despejados = self._evict()
+        for antigo in despejados:
+            antigo.close()
+        return tenant
+
+    def acquire(self, identifier=None):
+        """Tenant para uma nova sessão de chat (não é despejado até `release`)."""
+        tenant = self.get(identifier)
+        tenant.sessions += 1
+        return tenant
+
+    def release(self, tenant):
+        tenant.sessions = max(0, tenant.sessions - 1)
+        tenant.last_used = time.monotonic()
+        with self._lock:
+            despejados = self._evict()
+        for antigo in despejados:
+            antigo.close()
+
+    def _evict(self):
+        despejados = []
+        excesso = len(self._tenants) - self.max_tenants
+        for key in list(self._tenants):
+            if excesso <= 0:
+                break
+            tenant = self._tenants[key]
+            if tenant.idle:
+                despejados.append(self._tenants.pop(key))
+                excesso -= 1
+        return despejados
+
+    def close_all(self):
+        with self._lock:
+            tenants, self._tenants = list(self._tenants.values()), OrderedDict()
+        for tenant in tenants:
+            tenant.close()
+
+    def __contains__(self, identifier):
+        return tenant_key(identifier) in self._tenants
+
+    def __len__(self):
+        return len(self._tenants)
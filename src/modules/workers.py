@@ -0,0 +1,58 @@
+import os
+import asyncio
+import weakref
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BlockingPool:
+    """Executa trabalho bloqueante (disco, pandas) fora do event loop.
+
+    Usa um pool de threads limitado; no máximo `max_pending` tarefas ficam
+    em andamento ou na fila. Acima disso quem chama espera (back-pressure)
+    em vez de empilhar trabalho sem limite.
+    """
+
+    def __init__(self, max_workers=4, max_pending=32):
+        self.max_workers = max_workers
+        self.max_pending = max(max_pending, max_workers)
+        self._executor = None
+        # Um semáforo por event loop (asyncio.Semaphore fica preso ao loop em que é usado)
+        self._semaforos = weakref.WeakKeyDictionary()
+        self.pending = 0
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="finassist-io")
+        return self._executor
+
+    def _semaforo(self, loop):
+        sem = self._semaforos.get(loop)
+        if sem is None:
+            sem = self._semaforos[loop] = asyncio.Semaphore(self.max_pending)
+        return sem
+
+    async def run(self, func, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        async with self._semaforo(loop):
+            self.pending += 1
+            try:
+                # Leva o contexto junto (como asyncio.to_thread): spans abertos no loop continuam pais
+                contexto = contextvars.copy_context()
+                return await loop.run_in_executor(self.executor, functools.partial(contexto.run, func, *args, **kwargs))
+            finally:
+                self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+
+# Pool compartilhado por todas as sessões do processo
+io_pool = BlockingPool(
+    max_workers=int(os.getenv("FINASSIST_IO_WORKERS", "4")),
+    max_pending=int(os.getenv("FINASSIST_IO_PENDING", "32")),
+)
@@ -0,0 +1,20 @@
+import os
+import sys
+
+# Os módulos são importados como `modules.*`, a partir de src/ (igual ao app)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pytest  # noqa: E402
+
+PERFIL = {"nome": "Teste", "idade": 30, "perfil": "Moderado", "renda_mensal": 5000.0,
+          "saldo_atual": 1000.0, "saldo_inicial": 1000.0}
+
+
+@pytest.fixture
+def tenant(tmp_path):
+    """Usuário com base vazia (perfil + saldo de R$ 1.000), em pasta temporária."""
+    from modules.tenants import Tenant
+    t = Tenant("teste", str(tmp_path / "dados"))
+    t.setup(dict(PERFIL))
+    yield t
+    t.close()
@@ -0,0 +1,33 @@
+import gc
+import weakref
+from modules import balance
+from modules.balance import RunningBalance
+
+
+def _saldo(gravados):
+    perfil = {"saldo_atual": 100.0, "saldo_inicial": 100.0}
+    return RunningBalance(perfil, lambda p: gravados.append(dict(p)), flush_every=1000, flush_interval=3600)
+
+
+def test_saldo_pendente_sobrevive_ao_descarte():
+    gravados = []
+    saldo = _saldo(gravados)
+    saldo.apply(-30.0)
+    del saldo
+    gc.collect()
+    assert gravados == []
+    balance._flush_all()
+    assert gravados == [{"saldo_atual": 70.0, "saldo_inicial": 100.0}]
+
+
+def test_saldo_gravado_e_liberado():
+    gravados = []
+    saldo = _saldo(gravados)
+    saldo.apply(10.0)
+    saldo.flush()
+    ref = weakref.ref(saldo)
+    del saldo
+    gc.collect()
+    # Sem nada pendente, o registro não segura a instância
+    assert ref() is None
+    assert gravados == [{"saldo_atual": 110.0, "saldo_inicial": 100.0}]
@@ -0,0 +1,49 @@
+from modules.commands import CommandStreamParser, Command, parse_commands
+
+
+def _stream(texto, tamanho=3):
+    parser = CommandStreamParser()
+    eventos = []
+    for i in range(0, len(texto), tamanho):
+        eventos += parser.feed(texto[i:i + tamanho])
+    return eventos + parser.close()
+
+
+def _resumo(eventos):
+    return [(e.tag, e.data, bool(e.error)) if isinstance(e, Command) else e for e in eventos]
+
+
+def test_bloco_completo_em_pedacos():
+    texto = 'Anotado! #SAVE_TRANSACAO#{"descricao": "Uber", "valor": -25}#SAVE_TRANSACAO# Algo mais?'
+    eventos = [e for e in _stream(texto) if not isinstance(e, str) or e.strip()]
+    comandos = [e for e in eventos if isinstance(e, Command)]
+    assert [(c.tag, c.data) for c in comandos] == [("#SAVE_TRANSACAO#", {"descricao": "Uber", "valor": -25})]
+    assert "".join(e for e in eventos if isinstance(e, str)) == "Anotado!  Algo mais?"
+
+
+def test_bloco_sem_fechamento_seguido_de_outra_tag():
+    texto = ('#SAVE_TRANSACAO#{"descricao": "Uber", "valor": -25\n'
+             '#SAVE_META#{"descricao": "Carro", "valor": 50000}#SAVE_META# Pronto.')
+    for tamanho in (1, 4, len(texto)):
+        eventos = _stream(texto, tamanho)
+        comandos = [e for e in eventos if isinstance(e, Command)]
+        assert [c.tag for c in comandos] == ["#SAVE_TRANSACAO#", "#SAVE_META#"]
+        assert comandos[0].error
+        assert comandos[1].data == {"descricao": "Carro", "valor": 50000}
+        texto_livre = "".join(e for e in eventos if isinstance(e, str))
+        assert "#" not in texto_livre and "Pronto." in texto_livre
+
+
+def test_json_completo_sem_fechamento_seguido_de_outra_tag():
+    texto = ('#SAVE_TRANSACAO#{"descricao": "Uber", "valor": -25}'
+             '#DELETE_TRANSACAO#{"id": 3}#DELETE_TRANSACAO#')
+    assert _resumo(parse_commands(texto)) == [
+        ("#SAVE_TRANSACAO#", {"descricao": "Uber", "valor": -25}, False),
+        ("#DELETE_TRANSACAO#", {"id": 3}, False),
+    ]
+
+
+def test_bloco_sem_fechamento_no_fim_do_stream():
+    eventos = _stream('Ok #SAVE_META#{"descricao": "Viagem", "valor": 3000}')
+    assert _resumo([e for e in eventos if isinstance(e, Command)]) == [
+        ("#SAVE_META#", {"descricao": "Viagem", "valor": 3000}, False)]
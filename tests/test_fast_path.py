@@ -0,0 +1,44 @@
+import asyncio
+from modules.fast_path import FastPathParser
+from modules.orchestrator import FinAssistOrchestrator
+
+
+def _orquestrador(tenant):
+    return FinAssistOrchestrator(cache=None, tenant=tenant)
+
+
+def test_descricao_preserva_acentos():
+    parser = FastPathParser()
+    assert parser.parse("comprei um tênis por 300").data["descricao"] == "Tênis"
+    assert parser.parse("Gastei 50 no almoço.").data["descricao"] == "Almoço"
+    assert parser.parse("recebi 200 do João Paulo").data["descricao"] == "João Paulo"
+
+
+def test_editar_sem_sinal_mantem_gasto(tenant):
+    orq = _orquestrador(tenant)
+    assert tenant.retriever.add_transaction("Uber", -25.0, "Transporte")
+    idx = int(tenant.retriever.store.frame().index.max())
+    resposta = asyncio.run(orq.run(f"mude a transação {idx} para 30"))
+    assert "editada" in resposta
+    assert float(tenant.retriever.store.get(idx)["valor"]) == -30.0
+    assert tenant.retriever.balance.saldo == 970.0
+
+
+def test_editar_com_sinal_explicito(tenant):
+    orq = _orquestrador(tenant)
+    tenant.retriever.add_transaction("Venda", 100.0, "Vendas")
+    idx = int(tenant.retriever.store.frame().index.max())
+    asyncio.run(orq.run(f"altere a transação {idx} para 80"))
+    assert float(tenant.retriever.store.get(idx)["valor"]) == 80.0
+    asyncio.run(orq.run(f"altere a transação {idx} para -80"))
+    assert float(tenant.retriever.store.get(idx)["valor"]) == -80.0
+
+
+def test_falha_no_atalho_nao_derruba_o_turno(tenant):
+    orq = _orquestrador(tenant)
+
+    def falha(data):
+        raise RuntimeError("disco cheio")
+    orq.commands["#SAVE_TRANSACAO#"] = falha
+    resposta = asyncio.run(orq.run("gastei 50 no almoço"))
+    assert "Erro técnico" in resposta
@@ -0,0 +1,57 @@
+from modules.importer import read_ofx_statement
+
+CABECALHO_SGML = "OFXHEADER:100\nDATA:OFXSGML\n\n<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>\n"
+RODAPE_SGML = "</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>\n"
+
+
+def _bloco_sgml(i, memo):
+    # OFX 1.x: nenhuma tag é fechada, nem a do próprio bloco
+    return (f"<STMTTRN>\n<TRNTYPE>DEBIT\n<DTPOSTED>202401{i % 28 + 1:02d}\n"
+            f"<TRNAMT>-{i + 1}.50\n<FITID>{i}\n<MEMO>{memo}\n")
+
+
+def _ler(path, **kwargs):
+    return [linha for lote in read_ofx_statement(str(path), **kwargs) for linha in lote.itertuples(index=False)]
+
+
+def test_ofx_sgml_blocos_sem_fechamento(tmp_path):
+    path = tmp_path / "extrato.ofx"
+    memos = ["MERCADO", "UBER TRIP", "FARMACIA"]
+    path.write_text(CABECALHO_SGML + "".join(_bloco_sgml(i, m) for i, m in enumerate(memos)) + RODAPE_SGML,
+                    encoding="latin-1")
+    linhas = _ler(path)
+    assert [l.descricao for l in linhas] == memos
+    assert [l.valor for l in linhas] == [-1.5, -2.5, -3.5]
+
+
+def test_ofx_sgml_atravessa_limite_de_leitura(tmp_path):
+    # ~3 MB: vários blocos ficam cortados entre uma leitura de 1 MB e a próxima
+    path = tmp_path / "grande.ofx"
+    total = 30000
+    path.write_text(CABECALHO_SGML + "".join(_bloco_sgml(i, f"COMPRA {i}") for i in range(total)) + RODAPE_SGML,
+                    encoding="latin-1")
+    assert path.stat().st_size > 2 * (1 << 20)
+    linhas = _ler(path, chunksize=7000)
+    assert len(linhas) == total
+    assert [l.descricao for l in linhas[:2]] == ["COMPRA 0", "COMPRA 1"]
+    assert linhas[-1].descricao == f"COMPRA {total - 1}"
+
+
+def test_ofx_xml_blocos_fechados(tmp_path):
+    path = tmp_path / "extrato.ofx"
+    blocos = "".join(f"<STMTTRN><DTPOSTED>2024010{i + 1}</DTPOSTED><TRNAMT>{i + 10}.00</TRNAMT>"
+                     f"<MEMO>PIX {i}</MEMO></STMTTRN>" for i in range(2))
+    path.write_text(f"<OFX><BANKTRANLIST>{blocos}</BANKTRANLIST></OFX>", encoding="latin-1")
+    linhas = _ler(path)
+    assert [(l.descricao, l.valor) for l in linhas] == [("PIX 0", 10.0), ("PIX 1", 11.0)]
+
+
+def test_parse_amounts_separador_de_milhar():
+    import pandas as pd
+    from modules.importer import parse_amounts
+    from modules.fast_path import parse_valor
+    textos = ["1.500", "R$ 1.234,56", "-50,00", "(12,50)", "99.90", "10,00-", "1.234.567", "12.5"]
+    valores = parse_amounts(pd.Series(textos)).tolist()
+    assert valores == [1500.0, 1234.56, -50.0, -12.5, 99.9, -10.0, 1234567.0, 12.5]
+    # Mesma leitura do atalho do chat para os valores sem sinal
+    assert parse_valor("1.500") == 1500.0 and parse_valor("1.234,56") == 1234.56
@@ -0,0 +1,45 @@
+from modules.context_builder import ContextBuilder
+from modules.projections import goal_from_query
+
+PERFIL = {"nome": "Teste", "perfil": "Moderado", "saldo_atual": 20000.0}
+
+
+def _bloco(perfil, pergunta="consigo juntar 50 mil até 2030?"):
+    builder = ContextBuilder()
+    data = {"perfil_investidor": perfil, "objetivos_financeiros": [], "produtos_financeiros": []}
+    bloco = builder.projections_block(data, None, goal_from_query(pergunta), 93)
+    return bloco.text
+
+
+def test_simulacao_parte_do_saldo_atual():
+    texto = _bloco(PERFIL)
+    assert "considera o saldo atual (R$ 20.000,00) como já guardado" in texto
+    assert "faltam R$ 30.000,00" in texto
+
+
+def test_saldo_negativo_nao_conta():
+    texto = _bloco(dict(PERFIL, saldo_atual=-500.0))
+    assert "saldo atual (R$ 0,00)" in texto
+    assert "faltam R$ 50.000,00" in texto
+
+
+def test_saldo_acima_do_alvo():
+    assert "alvo já atingido" in _bloco(dict(PERFIL, saldo_atual=80000.0))
+
+
+def test_valor_em_milhoes():
+    casos = {
+        "consigo juntar 1 milhão até 2040?": 1_000_000.0,
+        "quero 1,5 milhão em 20 anos": 1_500_000.0,
+        "dá para ter 2 milhões até 2045?": 2_000_000.0,
+        "consigo juntar 50 mil até 2030?": 50_000.0,
+        "preciso de 20.000 em 3 anos": 20_000.0,
+    }
+    for pergunta, alvo in casos.items():
+        assert goal_from_query(pergunta)["valor_alvo"] == alvo, pergunta
+
+
+def test_um_milhao_com_saldo_nao_e_alvo_atingido():
+    texto = _bloco(PERFIL, "consigo juntar 1 milhão até 2040?")
+    assert "alvo já atingido" not in texto
+    assert "faltam R$ 980.000,00" in texto
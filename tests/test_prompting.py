@@ -0,0 +1,60 @@
+from modules.prompting import CABECALHO_CONTEXTO, CABECALHO_RESUMO, ConversationMemory
+
+PREFIXO = "Você é o FinAssist Pro.\nUse apenas os dados do contexto.\n"
+
+
+def _conversa(memoria, turnos):
+    for i in range(turnos):
+        memoria.add(f"Quanto gastei com lazer no mês {i}?",
+                    f"Você gastou R$ {100 + i},00 com lazer no mês {i}. Isso é {i}% acima da média.")
+
+
+def test_orcamento_respeitado_apos_muitos_turnos():
+    memoria = ConversationMemory(token_budget=120, summary_budget=40)
+    for i in range(50):
+        turno = (f"Quanto gastei com lazer no mês {i}?", f"Você gastou R$ {100 + i},00 com lazer. Isso é {i}% acima.")
+        memoria.add(*turno)
+        assert memoria.tokens <= memoria.token_budget
+        assert memoria.turns[-1] == turno
+    assert memoria.summary_lines
+
+
+def test_turno_mais_recente_fica_inteiro_mesmo_acima_do_orcamento():
+    memoria = ConversationMemory(token_budget=30, summary_budget=200)
+    _conversa(memoria, 5)
+    resposta = "Resumo longo dos seus gastos. " * 15
+    memoria.add("Como estão meus gastos?", resposta)
+    assert memoria.turns == [("Como estão meus gastos?", resposta.strip())]
+    assert not memoria.summary_lines
+
+
+def test_continuacao_inclui_a_pergunta_anterior():
+    memoria = ConversationMemory()
+    memoria.add("Se eu guardar 150 por mês, quando atinjo a meta?", "Em 14 meses.")
+    consulta = memoria.resolve("e se eu mudar para 200?")
+    assert "Se eu guardar 150 por mês" in consulta
+    assert consulta.endswith("e se eu mudar para 200?")
+    assert memoria.resolve("Qual é o meu perfil de investidor?") == "Qual é o meu perfil de investidor?"
+
+
+def test_mensagens_em_camadas_com_prefixo_estavel():
+    memoria = ConversationMemory(token_budget=60, summary_budget=40)
+    prefixos = []
+    for i in range(6):
+        mensagens = memoria.prompt(PREFIXO, f"Saldo: R$ {i}").messages(f"pergunta {i}")
+        prefixos.append(mensagens[0]["content"].encode("utf-8"))
+        _conversa(memoria, 1)
+    assert len(set(prefixos)) == 1
+
+    assert memoria.summary_lines and memoria.turns
+    mensagens = memoria.prompt(PREFIXO, "Saldo: R$ 9").messages("e agora?")
+    assert [m["role"] for m in mensagens] == (["system", "system"] + ["user", "assistant"] * len(memoria.turns)
+                                              + ["user"])
+    assert mensagens[1]["content"].startswith(CABECALHO_RESUMO)
+    assert [m["content"] for m in mensagens[2:-1:2]] == [p for p, _ in memoria.turns]
+    ultima = mensagens[-1]["content"]
+    assert ultima.index(CABECALHO_CONTEXTO) < ultima.index("Saldo: R$ 9") < ultima.index("Pergunta: e agora?")
+
+    texto = str(memoria.prompt(PREFIXO, "Saldo: R$ 9"))
+    assert texto.startswith(PREFIXO.rstrip())
+    assert texto.index(CABECALHO_RESUMO) < texto.index(memoria.turns[-1][0]) < texto.index(CABECALHO_CONTEXTO)
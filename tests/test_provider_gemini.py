@@ -0,0 +1,55 @@
+import asyncio
+import pytest
+
+glm = pytest.importorskip("google.ai.generativelanguage")
+
+from modules.provider_gemini import GeminiProvider  # noqa: E402
+from modules.provider_registry import ProviderRegistry  # noqa: E402
+
+
+class ClienteFalso:
+    """Faz o papel do GenerativeServiceAsyncClient: responde com a chave que recebeu."""
+
+    def __init__(self, api_key):
+        self.api_key = api_key
+
+    def _resposta(self):
+        parte = glm.Part(text=f"chave={self.api_key}")
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(content=glm.Content(parts=[parte]),
+                                                                     finish_reason=1)])
+
+    async def generate_content(self, request, **kwargs):
+        return self._resposta()
+
+    async def stream_generate_content(self, request, **kwargs):
+        async def pedacos():
+            yield self._resposta()
+        return pedacos()
+
+
+def test_cada_instancia_usa_a_propria_chave(monkeypatch):
+    monkeypatch.setattr(glm, "GenerativeServiceAsyncClient",
+                        lambda client_options: ClienteFalso(client_options["api_key"]))
+    registro = ProviderRegistry()
+    a = registro.get("gemini", "chave-A", retries=False)
+    b = registro.get("gemini", "chave-B", retries=False)
+    assert a is not b
+
+    async def cenario():
+        # Ordem intercalada: quem foi criado por último não decide a chave dos outros
+        return [await p.generate_response("sistema", "oi") for p in (a, b, a)]
+    assert asyncio.run(cenario()) == ["chave=chave-A", "chave=chave-B", "chave=chave-A"]
+
+
+def test_cliente_real_recebe_a_chave():
+    async def cenario():
+        return [GeminiProvider(chave)._model()._async_client for chave in ("chave-A", "chave-B")]
+    clientes = asyncio.run(cenario())
+    assert [c._client._transport._credentials.token for c in clientes] == ["chave-A", "chave-B"]
+
+
+def test_sem_chave_falha_com_erro_de_configuracao():
+    from modules.providers import ProviderError
+    with pytest.raises(ProviderError) as erro:
+        asyncio.run(GeminiProvider(None).generate_response("sistema", "oi"))
+    assert erro.value.kind == "config"
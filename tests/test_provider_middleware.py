@@ -0,0 +1,129 @@
+import asyncio
+import pytest
+from modules.providers import LLMProvider, ProviderError
+from modules.provider_middleware import BackendLimiter, ResilientProvider, _inflight
+
+
+class Stub(LLMProvider):
+    """Provedor de teste: só entrega os pedaços depois de `liberar`."""
+
+    model_name = "stub"
+
+    def __init__(self, pedacos=("a", "b", "c"), falhas=0, falha_no_meio=False, trava_no_meio=False):
+        self.pedacos = pedacos
+        self.falhas = falhas
+        self.falha_no_meio = falha_no_meio
+        self.trava_no_meio = trava_no_meio
+        self.chamadas = 0
+        self.liberar = None
+
+    async def generate_response(self, system_prompt, user_query):
+        return "".join([c async for c in self.stream_response(system_prompt, user_query)])
+
+    async def stream_response(self, system_prompt, user_query):
+        self.chamadas += 1
+        if self.liberar is not None:
+            await self.liberar.wait()
+        if self.chamadas <= self.falhas:
+            raise ProviderError("connection", "stub", self.provider_id, transient=True)
+        for i, pedaco in enumerate(self.pedacos):
+            yield pedaco
+            if i == 0 and self.falha_no_meio:
+                raise ProviderError("connection", "caiu no meio", self.provider_id, transient=True)
+            if i == 0 and self.trava_no_meio:
+                await asyncio.Event().wait()
+
+
+def _resiliente(stub, **kwargs):
+    kwargs.setdefault("limiter", BackendLimiter())
+    kwargs.setdefault("base_delay", 0)
+    return ResilientProvider(stub, **kwargs)
+
+
+def test_pedidos_identicos_fazem_uma_unica_chamada():
+    stub = Stub()
+    provedor = _resiliente(stub)
+
+    async def cenario():
+        stub.liberar = asyncio.Event()
+        tarefas = [asyncio.create_task(provedor.generate_response("sistema", "oi")) for _ in range(5)]
+        await asyncio.sleep(0)
+        stub.liberar.set()
+        return await asyncio.gather(*tarefas)
+
+    assert asyncio.run(cenario()) == ["abc"] * 5
+    assert stub.chamadas == 1
+    assert not _inflight
+
+
+def test_repete_falhas_transitorias_antes_do_primeiro_pedaco():
+    stub = Stub(falhas=2)
+    assert asyncio.run(_resiliente(stub, max_retries=2).generate_response("sistema", "oi")) == "abc"
+    assert stub.chamadas == 3
+
+
+def test_desiste_apos_max_retries():
+    stub = Stub(falhas=3)
+    with pytest.raises(ProviderError) as erro:
+        asyncio.run(_resiliente(stub, max_retries=2).generate_response("sistema", "oi"))
+    assert erro.value.kind == "connection"
+    assert stub.chamadas == 3
+
+
+def test_nao_repete_depois_do_primeiro_pedaco():
+    stub = Stub(falha_no_meio=True)
+    recebidos = []
+
+    async def cenario():
+        async for pedaco in _resiliente(stub, max_retries=2).stream_response("sistema", "oi"):
+            recebidos.append(pedaco)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(cenario())
+    assert recebidos == ["a"]
+    assert stub.chamadas == 1
+
+
+def test_fila_cheia_falha_na_hora():
+    stub = Stub()
+    provedor = _resiliente(stub, limiter=BackendLimiter(max_concurrency=1, max_queue=1), coalesce=False)
+
+    async def cenario():
+        stub.liberar = asyncio.Event()
+        ocupados = [asyncio.create_task(provedor.generate_response("sistema", f"pergunta {i}")) for i in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(ProviderError) as erro:
+            await asyncio.wait_for(provedor.generate_response("sistema", "mais uma"), 1)
+        stub.liberar.set()
+        return erro.value, await asyncio.gather(*ocupados)
+
+    erro, respostas = asyncio.run(cenario())
+    assert erro.kind == "overloaded"
+    assert respostas == ["abc", "abc"]
+    assert stub.chamadas == 2
+
+
+@pytest.mark.parametrize("interrompe", ["aclose", "cancel"])
+def test_seguidor_recebe_erro_quando_o_lider_para(interrompe):
+    stub = Stub(trava_no_meio=True)
+    provedor = _resiliente(stub)
+
+    async def cenario():
+        lider = provedor.stream_response("sistema", "oi")
+        assert await lider.__anext__() == "a"
+        seguidor = asyncio.create_task(provedor.generate_response("sistema", "oi"))
+        await asyncio.sleep(0)
+        if interrompe == "aclose":
+            await lider.aclose()
+        else:
+            tarefa = asyncio.create_task(lider.__anext__())
+            await asyncio.sleep(0)
+            tarefa.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await tarefa
+        with pytest.raises(ProviderError):
+            await asyncio.wait_for(seguidor, 1)
+
+    asyncio.run(cenario())
+    assert stub.chamadas == 1
+    assert not _inflight
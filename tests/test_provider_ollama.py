@@ -0,0 +1,115 @@
+import json
+import asyncio
+import pytest
+from modules.providers import ProviderError
+from modules.provider_ollama import OllamaProvider, close_http_client
+
+
+class OllamaStub:
+    """Servidor HTTP local que imita o /api/chat do Ollama (NDJSON em chunked)."""
+
+    def __init__(self, tokens=("Olá", ", ", "tudo bem?"), status=200):
+        self.tokens = tokens
+        self.status = status
+        self.payloads = []
+        self.conexoes = 0
+        self.server = None
+
+    async def __aenter__(self):
+        self.server = await asyncio.start_server(self._atender, "127.0.0.1", 0)
+        return self
+
+    async def __aexit__(self, *exc):
+        self.server.close()
+        await self.server.wait_closed()
+
+    @property
+    def url(self):
+        porta = self.server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{porta}/api/chat"
+
+    async def _atender(self, reader, writer):
+        self.conexoes += 1
+        try:
+            # Várias requisições na mesma conexão (keep-alive)
+            while True:
+                cabecalho = await reader.readuntil(b"\r\n\r\n")
+                tamanho = next(int(linha.split(b":")[1]) for linha in cabecalho.split(b"\r\n")
+                               if linha.lower().startswith(b"content-length"))
+                payload = json.loads(await reader.readexactly(tamanho))
+                self.payloads.append(payload)
+                await self._responder(writer, payload.get("stream", True))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _responder(self, writer, stream):
+        if self.status != 200:
+            writer.write(f"HTTP/1.1 {self.status} Erro\r\nContent-Length: 0\r\n\r\n".encode())
+            await writer.drain()
+            return
+        if not stream:
+            corpo = json.dumps({"message": {"role": "assistant", "content": "".join(self.tokens)}, "done": True}).encode()
+            writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: {len(corpo)}\r\n\r\n".encode()
+                         + corpo)
+            await writer.drain()
+            return
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\n\r\n")
+        linhas = [{"message": {"role": "assistant", "content": t}, "done": False} for t in self.tokens]
+        linhas.append({"message": {"role": "assistant", "content": ""}, "done": True})
+        for linha in linhas:
+            dados = (json.dumps(linha) + "\n").encode()
+            writer.write(f"{len(dados):x}\r\n".encode() + dados + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+def _rodar(corrotina):
+    async def com_cliente():
+        try:
+            return await corrotina()
+        finally:
+            # O cliente compartilhado fica preso ao event loop de cada teste
+            await close_http_client()
+    return asyncio.run(com_cliente())
+
+
+def test_stream_token_a_token():
+    async def cenario():
+        async with OllamaStub() as stub:
+            provider = OllamaProvider(model="llama3:8b", url=stub.url)
+            tokens = [t async for t in provider.stream_response("sistema", "oi")]
+            return stub, tokens
+    stub, tokens = _rodar(cenario)
+    assert tokens == ["Olá", ", ", "tudo bem?"]
+    payload = stub.payloads[0]
+    assert payload["stream"] is True
+    assert payload["model"] == "llama3:8b"
+    assert payload["options"] == {"temperature": 0.2, "num_predict": 500}
+    assert payload["keep_alive"] == "30m"
+    assert payload["messages"] == [{"role": "system", "content": "sistema"}, {"role": "user", "content": "oi"}]
+
+
+def test_cliente_reaproveita_a_conexao():
+    async def cenario():
+        async with OllamaStub() as stub:
+            provider = OllamaProvider(url=stub.url)
+            for _ in range(3):
+                assert await provider.generate_response("sistema", "oi") == "Olá, tudo bem?"
+            return stub
+    stub = _rodar(cenario)
+    assert len(stub.payloads) == 3
+    assert stub.conexoes == 1
+
+
+def test_erro_http_vira_provider_error():
+    async def cenario():
+        async with OllamaStub(status=503) as stub:
+            provider = OllamaProvider(url=stub.url)
+            with pytest.raises(ProviderError) as erro:
+                [t async for t in provider.stream_response("sistema", "oi")]
+            return erro.value
+    erro = _rodar(cenario)
+    assert erro.kind == "server" and erro.transient
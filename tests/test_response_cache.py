@@ -0,0 +1,21 @@
+from modules.response_cache import ResponseCache
+
+
+def test_guarda_resposta_que_comeca_com_erro():
+    cache = ResponseCache()
+    chave = cache.key("stub", "contexto", "o que é erro de tracking?")
+    assert cache.put(chave, "Erro de tracking é a diferença entre o fundo e o índice.")
+    assert cache.get(chave).startswith("Erro de tracking")
+
+
+def test_nao_guarda_resposta_com_comando():
+    cache = ResponseCache()
+    chave = cache.key("stub", "contexto", "gastei 50")
+    assert not cache.put(chave, 'Ok #SAVE_TRANSACAO#{"valor": -50}#SAVE_TRANSACAO#')
+    assert cache.get(chave) is None
+
+
+def test_historico_muda_a_chave():
+    cache = ResponseCache()
+    assert cache.key("stub", "ctx", "e se for 200?") != cache.key("stub", "ctx", "e se for 200?", "pergunta anterior")
+    assert cache.key("stub", "ctx", "Quanto gastei?") == cache.key("stub", "ctx", "quanto gastei")
@@ -0,0 +1,161 @@
+import asyncio
+import pytest
+from modules.providers import LLMProvider, ProviderError
+from modules.routing import Backend, LatencyTracker, RoutingProvider
+
+
+class Relogio:
+    """Relógio manual: os stubs avançam o tempo em vez de dormir."""
+
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+class Stub(LLMProvider):
+    def __init__(self, nome, relogio, latencia=0.1, falha=None, local=False, falha_no_meio=False):
+        self.model_name = nome
+        self.relogio = relogio
+        self.latencia = latencia
+        self.falha = falha
+        self.local = local
+        self.falha_no_meio = falha_no_meio
+        self.chamadas = 0
+
+    async def generate_response(self, system_prompt, user_query):
+        return "".join([c async for c in self.stream_response(system_prompt, user_query)])
+
+    async def stream_response(self, system_prompt, user_query):
+        self.chamadas += 1
+        self.relogio.agora += self.latencia
+        if self.falha:
+            raise ProviderError(self.falha, "stub", self.provider_id, transient=True)
+        yield f"{self.model_name}:1 "
+        if self.falha_no_meio:
+            raise ProviderError("connection", "caiu no meio", self.provider_id, transient=True)
+        yield f"{self.model_name}:2"
+
+
+def _backend(stub, relogio, **kwargs):
+    return Backend(stub, tracker=LatencyTracker(clock=relogio), **kwargs)
+
+
+def _rota(stubs, relogio, **kwargs):
+    kwargs.setdefault("classify", None)
+    return RoutingProvider([_backend(s, relogio) for s in stubs], clock=relogio, **kwargs)
+
+
+def _responder(rota, pergunta="oi"):
+    return asyncio.run(rota.generate_response("sistema", pergunta))
+
+
+def test_failover_segue_a_ordem():
+    relogio = Relogio()
+    local = Stub("local", relogio, falha="connection", local=True)
+    gemini = Stub("gemini", relogio)
+    openai = Stub("openai", relogio)
+    rota = _rota([local, gemini, openai], relogio)
+    assert _responder(rota) == "gemini:1 gemini:2"
+    assert (local.chamadas, gemini.chamadas, openai.chamadas) == (1, 1, 0)
+    assert rota.last_backend == gemini.provider_id
+
+
+def test_cooldown_depois_de_falhas_seguidas():
+    relogio = Relogio()
+    local = Stub("local", relogio, falha="timeout", local=True)
+    nuvem = Stub("nuvem", relogio)
+    rota = _rota([local, nuvem], relogio)
+    for _ in range(3):
+        _responder(rota)
+    # Aberto o circuito, o local nem é tentado
+    assert [b.name for b in rota.candidates()] == [nuvem.provider_id]
+    _responder(rota)
+    assert local.chamadas == 3
+    # Passado o cooldown ele volta à rotação, mas atrás da nuvem (taxa de erro alta)
+    relogio.agora += 16.0
+    local.falha = None
+    assert [b.name for b in rota.candidates()] == [nuvem.provider_id, local.provider_id]
+    # Sem tentativas há mais que probe_interval, é sondado primeiro e, recuperado, atende
+    relogio.agora += 30.0
+    assert _responder(rota) == "local:1 local:2"
+    assert rota.backends[0].tracker.error_rate == 0.0
+
+
+def test_todos_falham_sobe_o_ultimo_erro():
+    relogio = Relogio()
+    rota = _rota([Stub("a", relogio, falha="timeout"), Stub("b", relogio, falha="rate_limit")], relogio)
+    with pytest.raises(ProviderError) as erro:
+        _responder(rota)
+    assert erro.value.kind == "rate_limit"
+
+
+def test_latencia_acima_do_slo_perde_a_vez():
+    relogio = Relogio()
+    lento = Stub("lento", relogio, latencia=12.0, local=True)
+    rapido = Stub("rapido", relogio, latencia=0.5)
+    rota = _rota([lento, rapido], relogio, latency_slo=8.0, min_samples=3, probe_interval=30.0)
+    for _ in range(3):
+        assert _responder(rota).startswith("lento")
+    # p95 de 12 s > SLO de 8 s: o segundo da ordem passa à frente
+    assert [b.name for b in rota.candidates()] == [rapido.provider_id, lento.provider_id]
+    assert _responder(rota).startswith("rapido")
+    # Sem tentativas há mais que probe_interval, o lento volta a ser sondado
+    relogio.agora += 31.0
+    assert rota.candidates()[0].name == lento.provider_id
+
+
+def test_taxa_de_erro_alta_perde_a_vez():
+    relogio = Relogio()
+    instavel = Stub("instavel", relogio)
+    estavel = Stub("estavel", relogio)
+    rota = _rota([instavel, estavel], relogio, max_error_rate=0.3, min_samples=3)
+    tracker = rota.backends[0].tracker
+    for ok in (True, False, True, False):
+        tracker.record_success(0.1) if ok else tracker.record_failure()
+    assert rota.candidates()[0].name == estavel.provider_id
+
+
+def test_local_only_nunca_chama_a_nuvem():
+    relogio = Relogio()
+    local = Stub("local", relogio, falha="connection", local=True)
+    nuvem = Stub("nuvem", relogio)
+    rota = _rota([local, nuvem], relogio, local_only=True)
+    for _ in range(5):
+        # Nem com o local em falha (ou em cooldown) a rota recorre à nuvem
+        with pytest.raises(ProviderError):
+            _responder(rota)
+    assert nuvem.chamadas == 0
+    assert all(b.local for b in rota.candidates())
+
+
+def test_local_only_sem_backend_local():
+    relogio = Relogio()
+    nuvem = Stub("nuvem", relogio)
+    rota = _rota([nuvem], relogio, local_only=True)
+    with pytest.raises(ProviderError) as erro:
+        _responder(rota)
+    assert erro.value.kind == "config"
+    assert nuvem.chamadas == 0
+
+
+def test_falha_no_meio_nao_troca_de_backend():
+    relogio = Relogio()
+    primeiro = Stub("primeiro", relogio, falha_no_meio=True)
+    segundo = Stub("segundo", relogio)
+    rota = _rota([primeiro, segundo], relogio)
+    with pytest.raises(ProviderError):
+        _responder(rota)
+    # Parte da resposta já saiu: repetir em outro modelo duplicaria o texto
+    assert segundo.chamadas == 0
+
+
+def test_modelo_rapido_so_atende_perguntas_simples():
+    relogio = Relogio()
+    rapido = Stub("rapido", relogio, local=True)
+    grande = Stub("grande", relogio, local=True)
+    rota = RoutingProvider([_backend(rapido, relogio, tasks={"rapido"}), _backend(grande, relogio)],
+                           clock=relogio)
+    assert _responder(rota, "oi, tudo bem?").startswith("rapido")
+    assert _responder(rota, "quanto gastei com alimentação este mês?").startswith("grande")
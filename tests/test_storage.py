@@ -0,0 +1,135 @@
+import sqlite3
+import pandas as pd
+from modules.storage_sqlite import SqliteBackend
+
+LINHA = {"data": "01/02/2024", "descricao": "Uber", "valor": -25.0, "categoria": "Transporte", "prioridade": "Média"}
+
+
+def test_sqlite_nao_reaproveita_id_apagado(tmp_path):
+    backend = SqliteBackend(str(tmp_path))
+    store = backend.transactions.load()
+    ids = [store.add(dict(LINHA)) for _ in range(3)]
+    store.delete(ids[-1])
+    novo = store.add(dict(LINHA))
+    assert novo not in ids
+    lote = store.add_many(pd.DataFrame([LINHA, LINHA]))
+    assert min(lote) > novo
+    backend.close()
+
+    # O maior ID usado sobrevive à reabertura
+    backend = SqliteBackend(str(tmp_path))
+    store = backend.transactions.load()
+    store.delete(max(lote))
+    assert store.add(dict(LINHA)) > max(lote)
+    backend.close()
+
+
+def test_sqlite_banco_antigo_ganha_autoincrement(tmp_path):
+    conn = sqlite3.connect(str(tmp_path / "finassist.db"))
+    conn.executescript("""
+        CREATE TABLE transacoes (id INTEGER PRIMARY KEY, data TEXT, descricao TEXT NOT NULL DEFAULT '',
+                                 valor REAL NOT NULL DEFAULT 0, categoria TEXT, prioridade TEXT);
+        INSERT INTO transacoes VALUES (0, '2024-02-01', 'A', -1, 'Lazer', 'Média'), (5, '2024-02-02', 'B', -2, 'Lazer', 'Média');
+    """)
+    conn.close()
+    backend = SqliteBackend(str(tmp_path))
+    store = backend.transactions.load()
+    assert list(store.frame().index) == [0, 5]
+    store.delete(5)
+    assert store.add(dict(LINHA)) == 6
+    backend.close()
+
+
+def _csv_store(path, **kwargs):
+    from modules.storage import TransactionStore
+    return TransactionStore(str(path), **kwargs).load()
+
+
+def test_csv_ids_estaveis_na_compactacao(tmp_path):
+    store = _csv_store(tmp_path, compact_every=3)
+    ids = [store.add(dict(LINHA, descricao=f"T{i}")) for i in range(5)]
+    store.delete(ids[1])
+    store.compact()
+    # Depois da compactação (automática ou não) o ID 3 continua sendo "T3"
+    assert store.get(ids[3])["descricao"] == "T3"
+    assert ids[1] not in store
+    store.update(ids[4], {"valor": -99.0})
+    store.add_many(pd.DataFrame([LINHA, LINHA]))
+    store.compact()
+    assert store.get(ids[4])["valor"] == -99.0
+    assert list(store.frame().index) == [0, 2, 3, 4, 5, 6]
+    store.close()
+
+    recarregado = _csv_store(tmp_path)
+    assert list(recarregado.frame().index) == [0, 2, 3, 4, 5, 6]
+    assert recarregado.get(3)["descricao"] == "T3"
+    recarregado.close()
+
+
+def test_csv_nao_reaproveita_id_apagado(tmp_path):
+    store = _csv_store(tmp_path)
+    ids = [store.add(dict(LINHA)) for _ in range(3)]
+    store.delete(ids[-1])
+    store.compact()
+    assert store.add(dict(LINHA)) == 3
+    store.delete(3)
+    store.close()
+
+    # O maior ID usado sobrevive à recarga mesmo sem estar no snapshot
+    recarregado = _csv_store(tmp_path)
+    assert recarregado.add(dict(LINHA)) == 4
+    recarregado.close()
+
+
+def test_csv_legado_sem_coluna_id(tmp_path):
+    pd.DataFrame([LINHA, dict(LINHA, descricao="B")]).to_csv(tmp_path / "transacoes.csv", index=False)
+    store = _csv_store(tmp_path)
+    assert store.get(1)["descricao"] == "B"
+    assert store.add(dict(LINHA)) == 2
+    store.close()
+
+
+def test_migracao_mantem_ids(tmp_path):
+    from modules.storage import migrate
+    store = _csv_store(tmp_path)
+    for i in range(4):
+        store.add(dict(LINHA, descricao=f"T{i}"))
+    store.delete(1)
+    store.compact()
+    store.close()
+    backend = migrate(str(tmp_path), "sqlite")
+    sqlite_store = backend.transactions.load()
+    assert list(sqlite_store.frame().index) == [0, 2, 3]
+    assert sqlite_store.get(2)["descricao"] == "T2"
+    backend.close()
+
+
+def _retriever_sqlite(path):
+    from modules.retriever import FinancialRetriever
+    from modules.storage_sqlite import SqliteBackend
+    r = FinancialRetriever(data_path=str(path), backend=SqliteBackend(str(path)))
+    r.watcher.check_interval = 0
+    return r
+
+
+def test_sqlite_dois_retrievers_veem_as_gravacoes_um_do_outro(tmp_path):
+    from modules.storage_sqlite import SqliteBackend
+    backend = SqliteBackend(str(tmp_path))
+    backend.save_profile({"nome": "Teste", "saldo_atual": 1000.0, "saldo_inicial": 1000.0})
+    backend.save_goals([])
+    backend.close()
+
+    a = _retriever_sqlite(tmp_path)
+    b = _retriever_sqlite(tmp_path)
+    assert b.add_transaction("Mercado", -100.0, "Alimentação")
+    assert b.add_goal("Viagem", 5000.0)
+    b.flush()
+
+    a.get_relevant_context("como estão minhas metas?")
+    assert a.balance.saldo == 900.0
+    assert len(a.store) == 1
+    assert [m["descricao"] for m in a.data["objetivos_financeiros"]] == ["Viagem"]
+    # O saldo gravado continua o de B (nada de "correção" com o ledger antigo)
+    assert a.backend.load_profile()["saldo_atual"] == 900.0
+    a.backend.close()
+    b.backend.close()
@@ -0,0 +1,42 @@
+from modules.telemetry import Telemetry, PrometheusExporter
+
+
+def _telemetria():
+    telemetria = Telemetry()
+    telemetria.add_exporter(PrometheusExporter())
+    return telemetria
+
+
+def test_render_com_e_sem_rotulo():
+    telemetria = _telemetria()
+    with telemetria.span("write", rows=3):
+        pass
+    with telemetria.span("write", rows=2, path="a.csv"):
+        pass
+    texto = telemetria.prometheus_text()
+    assert 'finassist_span_seconds_count{span="write"} 1' in texto
+    assert 'finassist_span_seconds_count{span="write",path="a.csv"} 1' in texto
+    assert 'finassist_rows_total{span="write"} 3' in texto
+    assert 'finassist_rows_total{span="write",path="a.csv"} 2' in texto
+
+
+def test_render_erros_com_e_sem_rotulo():
+    telemetria = _telemetria()
+    for path in (None, "llm"):
+        try:
+            with telemetria.span("turn") as turno:
+                if path:
+                    turno.set(path=path)
+                raise RuntimeError("falhou")
+        except RuntimeError:
+            pass
+    texto = telemetria.prometheus_text()
+    assert 'finassist_span_errors_total{span="turn",error="RuntimeError"} 1' in texto
+    assert 'finassist_span_errors_total{span="turn",path="llm",error="RuntimeError"} 1' in texto
+
+
+def test_desligada_nao_mede():
+    telemetria = Telemetry()
+    with telemetria.span("turn") as turno:
+        turno.set(path="fast")
+    assert telemetria.prometheus_text() == ""